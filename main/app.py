@@ -2,16 +2,25 @@
 
 Fluxo principal:
 - Gera planilha base a partir do modelo e CSV de códigos.
-- Enriquecimento com comentários internos, product group e unidade.
+- Enriquecimento com comentários internos, product group e unidade (um único join com a base TOTVS).
 - Preenchimento de colunas derivadas por narrativa: materiais, normas e size dimension.
 - Aplicação de valores fixos e ajustes em narrativas longas.
+
+As fontes (base TOTVS, dicionários) são carregadas em paralelo logo no início
+da execução; cada etapa apenas aguarda a fonte já carregada.
+Com `--tabela-enriquecimento`, a planilha é preenchida por consulta à tabela
+materializada (src/tabela_enriquecimento.py) e as etapas acima só rodam se ela
+estiver desatualizada. `--atualizar-colunas` recalcula, em uma planilha já
+gerada, só as colunas afetadas pelas fontes alteradas (src/atualizar_colunas.py).
 """
 
+import argparse
 import json
 import platform
 import sys
 import time
 import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
@@ -23,13 +32,20 @@ SRC_DIR = BASE_DIR / "src"
 PLANILHA_MODELO = BASE_DIR / "planilhas/planilha_padrao.xlsx"
 CSV_CODIGOS = BASE_DIR / "dados/dados_teste.csv"
 PLANILHA_SAIDA = BASE_DIR / "planilhas/planilha_atualizada.xlsx"
+# Arquivo único, diretório ou glob com fragmentos da base TOTVS (ver resolver_fragmentos_totvs)
 BASE_TOTVS = BASE_DIR / "planilhas/base_dados_TOTVS.xlsx"
 DICIONARIO_MATERIAIS = BASE_DIR / "dados/dicionario_materiais.csv"
 DICIONARIO_NORMAS = BASE_DIR / "dados/dicionario_normas.csv"
 DICIONARIO_SIZE_DIMENSION = BASE_DIR / "dados/dicionario_size_dimension.csv"
 DICIONARIO_TRADUCOES = BASE_DIR / "dados/dicionario.xlsx"
+# Listas de nomes canônicos de itens (um por linha), em português e em inglês
+DICIONARIO_NOMES_PT = BASE_DIR / "dados/dicionario_nome_PT.csv"
+DICIONARIO_NOMES_EN = BASE_DIR / "dados/nomedos_materiais_Ingles.csv"
 LOGS_DIR = BASE_DIR / "logs"
 RELATORIO_EXECUCAO = LOGS_DIR / "relatorio_execucao.json"
+HISTORICO_EXECUCOES = LOGS_DIR / "historico_execucoes.jsonl"
+DIRETORIO_FRAGMENTOS = BASE_DIR / "planilhas/fragmentos"
+TABELA_ENRIQUECIMENTO = BASE_DIR / "cache/tabela_enriquecimento.sqlite"
 
 # A planilha gerada tem:
 # - linha 1: header
@@ -41,16 +57,40 @@ PRIMEIRA_LINHA_ITENS_DF = 1
 if str(SRC_DIR) not in sys.path:
 	sys.path.insert(0, str(SRC_DIR))
 
+from carregar_fontes import (
+	CarregadorFontes,
+	agendar_base_totvs,
+	carregar_dicionario_traducoes,
+	resolver_fragmentos_totvs,
+)
+from progresso import Progresso
+from contadores_matchers import TOP_N_PADRAO, ContadoresMatcher
+from validar_entradas import validar_entradas
+from fragmentar_saida import MAX_ITENS_POR_ARQUIVO, fragmentar_planilha
+from planilha_trabalho import EXTENSAO_INTERMEDIARIA, gravar_planilha, intermediaria, ler_planilha
+from historico_execucoes import carregar_historico, comparar_com_baseline, registrar_execucao
 from inserir_codigos_de_itens import gerar_planilha_com_codigos
-from inserir_internal_comment import inserir_internal_coments
-from inserir_unidade import inserir_unidade
+from inserir_colunas_totvs import inserir_colunas_totvs
 from inserir_traducoes import inserir_traducoes
 from inserir_material import carregar_dicionario, encontrar_material
 from inserir_valores_fixos import inserir_valores_fixos
 from inserir_narrativas import inserir_narrativa
-from inserir_product_group import inserir_product_group
 from inserir_normas import encontrar_normas, carregar_dicionario_normas
-from inserir_size_dimension import carregar_dicionario_size_dimension, encontrar_size_dimension
+from inserir_size_dimension import carregar_dicionario_size_dimension
+from analisar_dimensoes import construir_indice_size_dimension, encontrar_size_dimension_indexado
+from normalizar_nomes import carregar_nomes, inserir_nomes_canonicos
+from colapsar_codigos import colapsar_planilha, expandir_planilha, resumo_colapso
+from juncao_externa import MEMORIA_PADRAO_MB, agendar_base_totvs_externa
+from motor_enriquecimento import MotorEnriquecimento
+from tabela_enriquecimento import TabelaEnriquecimento, impressoes_fontes, preencher_planilha
+from atualizar_colunas import (
+	fontes_necessarias,
+	gravar_manifesto,
+	grupos_invalidados,
+	ler_manifesto,
+	recalcular_colunas,
+	regravar_colunas,
+)
 
 
 def _now_iso() -> str:
@@ -74,23 +114,32 @@ def _find_col(df: pd.DataFrame, wanted: str) -> str | None:
 	return None
 
 
-def _count_nonempty_column(excel_path: Path, column_name: str, start_idx: int) -> int:
-	df = pd.read_excel(str(excel_path))
+def _sum_rows(mask: pd.Series, pesos: list[int] | None) -> int:
+	# Com o colapso de códigos, cada item vale pelas linhas originais do seu código
+	if pesos is None:
+		return int(mask.sum())
+	return int((mask.to_numpy() * pesos).sum())
+
+
+def _count_nonempty_column(excel_path: Path, column_name: str, start_idx: int, pesos: list[int] | None = None) -> int:
+	df = ler_planilha(excel_path)
 	col = _find_col(df, column_name)
 	if col is None:
 		return 0
 	serie = df.loc[start_idx:, col]
 	as_text = serie.astype(str).str.strip()
-	return int((serie.notna() & (as_text != "") & (as_text.str.lower() != "nan")).sum())
+	return _sum_rows(serie.notna() & (as_text != "") & (as_text.str.lower() != "nan"), pesos)
 
 
-def _count_equals(excel_path: Path, column_name: str, value: str, start_idx: int) -> int:
-	df = pd.read_excel(str(excel_path))
+def _count_equals(
+	excel_path: Path, column_name: str, value: str, start_idx: int, pesos: list[int] | None = None,
+) -> int:
+	df = ler_planilha(excel_path)
 	col = _find_col(df, column_name)
 	if col is None:
 		return 0
 	serie = df.loc[start_idx:, col].astype(str).str.strip()
-	return int((serie == value).sum())
+	return _sum_rows(serie == value, pesos)
 
 
 def _write_report(report: dict) -> None:
@@ -129,7 +178,13 @@ def garantir_planilha_saida(saida: Path) -> Path:
 	raise SystemExit(1)
 
 
-def atualizar_coluna_por_narrativa(df: pd.DataFrame, coluna_destino: str, linha_inicial: int, busca_fn) -> int:
+def atualizar_coluna_por_narrativa(
+	df: pd.DataFrame,
+	coluna_destino: str,
+	linha_inicial: int,
+	busca_fn,
+	progresso: Progresso | None = None,
+) -> int:
 	"""Preenche uma coluna baseada na narrativa SAP123 usando a função de busca fornecida."""
 	if "SAP123" not in df.columns:
 		print("Aviso: coluna 'SAP123' não encontrada na planilha.")
@@ -138,98 +193,473 @@ def atualizar_coluna_por_narrativa(df: pd.DataFrame, coluna_destino: str, linha_
 	if coluna_destino not in df.columns:
 		df[coluna_destino] = None
 
+	if progresso is not None:
+		progresso.fase("compute", total=len(df) - linha_inicial)
+
 	for idx in range(linha_inicial, len(df)):
 		narrativa = df.loc[idx, "SAP123"]
 		df.loc[idx, coluna_destino] = busca_fn(narrativa)
+		if progresso is not None:
+			progresso.avancar()
 
 	encontrados = df.loc[linha_inicial:, coluna_destino].notna().sum()
 	return int(encontrados)
 
 
-def processar_materiais(saida: Path) -> None:
+def processar_materiais(
+	saida: Path,
+	materiais: set[str] | tuple[str, ...] | None = None,
+	progresso: Progresso | None = None,
+	contadores: ContadoresMatcher | None = None,
+) -> None:
 	"""Preenche Coluna4 com materiais correspondentes às narrativas."""
 	print("Processando materiais (matching por narrativa)...")
-	materiais = carregar_dicionario(str(DICIONARIO_MATERIAIS))
+	if materiais is None:
+		materiais = carregar_dicionario(str(DICIONARIO_MATERIAIS))
 	print(f"Materiais carregados: {len(materiais)} entradas")
 
-	df = pd.read_excel(str(saida))
+	df = ler_planilha(saida)
 	encontrados = atualizar_coluna_por_narrativa(
 		df,
 		coluna_destino="Coluna4",
 		linha_inicial=PRIMEIRA_LINHA_ITENS_DF,
-		busca_fn=lambda narrativa: encontrar_material(narrativa, materiais),
+		progresso=progresso,
+		busca_fn=lambda narrativa: encontrar_material(narrativa, materiais, contadores),
 	)
 	print(f"Materiais encontrados: {encontrados}")
-	df.to_excel(str(saida), index=False)
+	if progresso is not None:
+		progresso.fase("write")
+	gravar_planilha(df, saida)
 	print("Coluna4 atualizada e salva na planilha.")
 
 
-def processar_normas(saida: Path) -> None:
+def processar_normas(
+	saida: Path,
+	normas: set[str] | tuple[str, ...] | None = None,
+	progresso: Progresso | None = None,
+	contadores: ContadoresMatcher | None = None,
+) -> None:
 	"""Preenche SAP17 com normas vinculadas às narrativas."""
 	print("Processando normas (matching por narrativa)...")
-	normas = carregar_dicionario_normas(str(DICIONARIO_NORMAS))
+	if normas is None:
+		normas = carregar_dicionario_normas(str(DICIONARIO_NORMAS))
 	print(f"Normas carregadas: {len(normas)} entradas")
 
-	df = pd.read_excel(str(saida))
+	df = ler_planilha(saida)
 	encontrados = atualizar_coluna_por_narrativa(
 		df,
 		coluna_destino="SAP17",
 		linha_inicial=PRIMEIRA_LINHA_ITENS_DF,
-		busca_fn=lambda narrativa: encontrar_normas(narrativa, normas),
+		progresso=progresso,
+		busca_fn=lambda narrativa: encontrar_normas(narrativa, normas, contadores),
 	)
 	print(f"Normas encontradas: {encontrados}")
-	df.to_excel(str(saida), index=False)
+	if progresso is not None:
+		progresso.fase("write")
+	gravar_planilha(df, saida)
 	print("SAP17 atualizada e salva na planilha.")
 
 
-def processar_size_dimension(saida: Path) -> None:
+def processar_size_dimension(
+	saida: Path,
+	size_dimensions: set[str] | tuple[str, ...] | None = None,
+	progresso: Progresso | None = None,
+	contadores: ContadoresMatcher | None = None,
+) -> None:
 	"""Preenche SAP15 com size dimensions encontradas por narrativa."""
 	print("Processando size dimensions (matching por narrativa)...")
-	size_dimensions = carregar_dicionario_size_dimension(str(DICIONARIO_SIZE_DIMENSION))
+	if size_dimensions is None:
+		size_dimensions = carregar_dicionario_size_dimension(str(DICIONARIO_SIZE_DIMENSION))
 	print(f"Size dimensions carregadas: {len(size_dimensions)} entradas")
+	indice = construir_indice_size_dimension(size_dimensions)
 
-	df = pd.read_excel(str(saida))
+	df = ler_planilha(saida)
 	encontrados = atualizar_coluna_por_narrativa(
 		df,
 		coluna_destino="SAP15",
 		linha_inicial=PRIMEIRA_LINHA_ITENS_DF,
-		busca_fn=lambda narrativa: encontrar_size_dimension(narrativa, size_dimensions),
+		progresso=progresso,
+		busca_fn=lambda narrativa: encontrar_size_dimension_indexado(narrativa, indice, contadores),
 	)
 	print(f"Size dimensions encontradas: {encontrados}")
-	df.to_excel(str(saida), index=False)
+	if progresso is not None:
+		progresso.fase("write")
+	gravar_planilha(df, saida)
 	print("SAP15 atualizada e salva na planilha.")
 
 
-def inserir_valores_fixos_planilha(saida: Path) -> None:
+def inserir_valores_fixos_planilha(saida: Path, progresso: Progresso | None = None) -> None:
 	"""Aplica valores fixos nas colunas SAP10 e SAP14 da planilha de trabalho."""
 	print("Aplicando valores fixos em SAP10 e SAP14...")
 	inserir_valores_fixos(
 		caminho_planilha_modelo=str(saida),
 		caminho_saida=str(saida),
+		progresso=progresso,
 	)
 
 
-def ajustar_narrativas(saida: Path) -> None:
+def ajustar_narrativas(saida: Path, progresso: Progresso | None = None) -> None:
 	"""Marca a coluna 'Narrativa' quando SAP123 excede 141 caracteres."""
 	print("Ajustando coluna 'Narrativa' para SAP123 > 141 caracteres...")
 	inserir_narrativa(
 		caminho_planilha_modelo=str(saida),
 		caminho_saida=str(saida),
+		progresso=progresso,
 	)
 	print("Atualização de 'Narrativa' concluída.")
 
 
-def processar_traducoes(saida: Path) -> None:
+def processar_traducoes(
+	saida: Path,
+	df_totvs: pd.DataFrame | None = None,
+	df_dicionario: pd.DataFrame | None = None,
+	progresso: Progresso | None = None,
+	contadores: ContadoresMatcher | None = None,
+) -> None:
 	"""Processa traduções das descrições de produtos."""
 	inserir_traducoes(
 		caminho_planilha_atualizada=str(saida),
 		caminho_base_totvs=str(BASE_TOTVS),
 		caminho_dicionario_traducoes=str(DICIONARIO_TRADUCOES),
+		df_totvs=df_totvs,
+		df_dicionario=df_dicionario,
+		progresso=progresso,
+		contadores_matcher=contadores,
+	)
+
+
+def processar_nomes(
+	saida: Path,
+	df_totvs: pd.DataFrame,
+	df_dicionario: pd.DataFrame,
+	nomes_pt,
+	nomes_en,
+	progresso: Progresso | None = None,
+	contadores: ContadoresMatcher | None = None,
+	pesos: list[int] | None = None,
+) -> dict:
+	"""Preenche SAP1/SAP2 ainda vazias com o nome canônico do item (listas de nomes PT/EN)."""
+	return inserir_nomes_canonicos(
+		caminho_planilha_atualizada=str(saida),
+		df_totvs=df_totvs,
+		df_dicionario=df_dicionario,
+		nomes_pt=nomes_pt,
+		nomes_en=nomes_en,
+		progresso=progresso,
+		contadores_matcher=contadores,
+		pesos=pesos,
+	)
+
+
+def iniciar_prefetch_fontes(
+	base_totvs: str,
+	compactar: bool = False,
+	leitor_paralelo: bool = False,
+	apenas: set[str] | None = None,
+	memoria_join_mb: float | None = None,
+	caminho_codigos: Path | None = None,
+) -> CarregadorFontes:
+	"""Agenda a carga paralela das fontes de entrada do pipeline (todas, ou só as de `apenas`).
+
+	Com a base TOTVS fragmentada (diretório/glob), cada fragmento é lido em seu
+	próprio processo e os resultados são combinados em uma única base.
+	Com `leitor_paralelo`, o parse de cada arquivo TOTVS também é dividido entre
+	processos (ver `agendar_base_totvs`).
+	Com `memoria_join_mb`, a base TOTVS não é carregada inteira: o join externo
+	(src/juncao_externa.py) entrega só as linhas dos códigos de `caminho_codigos`
+	(CSV de códigos ou planilha gerada), dentro desse orçamento de memória.
+	"""
+	fontes = CarregadorFontes(compactar=compactar)
+	if memoria_join_mb and (apenas is None or "base_totvs" in apenas):
+		agendar_base_totvs_externa(fontes, base_totvs, caminho_codigos or CSV_CODIGOS, memoria_join_mb)
+	elif apenas is None or "base_totvs" in apenas:
+		agendar_base_totvs(fontes, base_totvs, leitor_paralelo)
+	dicionarios = {
+		"dicionario_traducoes": (carregar_dicionario_traducoes, DICIONARIO_TRADUCOES),
+		"dicionario_materiais": (carregar_dicionario, DICIONARIO_MATERIAIS),
+		"dicionario_normas": (carregar_dicionario_normas, DICIONARIO_NORMAS),
+		"dicionario_size_dimension": (carregar_dicionario_size_dimension, DICIONARIO_SIZE_DIMENSION),
+		"dicionario_nomes_pt": (carregar_nomes, DICIONARIO_NOMES_PT),
+		"dicionario_nomes_en": (carregar_nomes, DICIONARIO_NOMES_EN),
+	}
+	for nome, (carregar, caminho) in dicionarios.items():
+		if apenas is None or nome in apenas:
+			fontes.agendar(nome, carregar, str(caminho))
+	return fontes
+
+
+def impressoes_fontes_pipeline(base_totvs: str) -> dict[str, str]:
+	"""Impressão digital (SHA-256) de cada fonte, nos caminhos do pipeline."""
+	return impressoes_fontes(
+		base_totvs, DICIONARIO_TRADUCOES, DICIONARIO_MATERIAIS, DICIONARIO_NORMAS, DICIONARIO_SIZE_DIMENSION,
+		DICIONARIO_NOMES_PT, DICIONARIO_NOMES_EN,
+	)
+
+
+def atualizar_colunas_planilha(
+	saida: Path,
+	base_totvs: str,
+	compactar: bool = False,
+	leitor_paralelo: bool = False,
+	memoria_join_mb: float | None = None,
+) -> int:
+	"""Recalcula só as colunas afetadas pelas fontes alteradas desde a geração de `saida`.
+
+	Retorna o código de saída (2 se não houver planilha ou manifesto das fontes).
+	"""
+	manifesto = ler_manifesto(saida)
+	if not saida.exists() or manifesto is None:
+		print(f"Erro: planilha ou manifesto de fontes inexistente para {saida}; execute o pipeline completo.")
+		return 2
+
+	impressoes = impressoes_fontes_pipeline(base_totvs)
+	grupos = grupos_invalidados(manifesto, impressoes)
+	if not grupos:
+		print("Nenhuma fonte alterada: nada a atualizar.")
+		return 0
+
+	necessarias = fontes_necessarias(grupos)
+	print(f"Atualizando colunas de: {', '.join(grupos)} (fontes carregadas: {', '.join(sorted(necessarias))})")
+	t0 = time.perf_counter()
+	fontes = iniciar_prefetch_fontes(
+		base_totvs,
+		compactar=compactar,
+		leitor_paralelo=leitor_paralelo,
+		apenas=necessarias,
+		memoria_join_mb=memoria_join_mb,
+		caminho_codigos=saida,
+	)
+	try:
+		novos = recalcular_colunas(pd.read_excel(saida), grupos, fontes.obter)
+	finally:
+		fontes.encerrar()
+	alteradas = regravar_colunas(saida, novos)
+	gravar_manifesto(saida, impressoes)
+	print(json.dumps(
+		{"grupos": grupos, "celulas_alteradas": alteradas, "duracao_seconds": round(time.perf_counter() - t0, 3)},
+		ensure_ascii=False,
+		indent=2,
+	))
+	return 0
+
+
+def preencher_por_tabela(
+	saida: Path,
+	caminho_tabela: Path,
+	base_totvs: str,
+	impressoes: dict[str, str],
+	compactar: bool = False,
+	leitor_paralelo: bool = False,
+	memoria_join_mb: float | None = None,
+	caminho_codigos: Path | None = None,
+) -> dict:
+	"""Preenche a planilha pela tabela materializada (src/tabela_enriquecimento.py).
+
+	Códigos cuja linha TOTVS mudou desde a construção são calculados ao vivo; se
+	a tabela não existir ou estiver desatualizada (dicionários, regras ou
+	modelo), a planilha não é alterada e o resultado traz `usada=False`.
+	O motor do cálculo ao vivo carrega a base TOTVS como o prefetch do pipeline:
+	com `memoria_join_mb`, só as linhas dos códigos de `caminho_codigos`.
+	"""
+	if not caminho_tabela.exists():
+		print(f"Tabela de enriquecimento inexistente ({caminho_tabela}); executando o pipeline completo.")
+		return {"usada": False, "motivos": ["tabela_inexistente"], "da_tabela": 0, "ao_vivo": 0}
+
+	tabela = TabelaEnriquecimento(caminho_tabela)
+	try:
+		resultado = preencher_planilha(
+			saida,
+			tabela,
+			impressoes,
+			lambda: MotorEnriquecimento.carregar(
+				base_totvs,
+				dicionario_traducoes=DICIONARIO_TRADUCOES,
+				dicionario_materiais=DICIONARIO_MATERIAIS,
+				dicionario_normas=DICIONARIO_NORMAS,
+				dicionario_size_dimension=DICIONARIO_SIZE_DIMENSION,
+				dicionario_nomes_pt=DICIONARIO_NOMES_PT,
+				dicionario_nomes_en=DICIONARIO_NOMES_EN,
+				modelo=PLANILHA_MODELO,
+				compactar=compactar,
+				leitor_paralelo=leitor_paralelo,
+				memoria_join_mb=memoria_join_mb,
+				caminho_codigos=caminho_codigos,
+			),
+		)
+	finally:
+		tabela.fechar()
+
+	if resultado["usada"]:
+		print(f"Planilha preenchida pela tabela: {resultado['da_tabela']} da tabela, {resultado['ao_vivo']} ao vivo")
+	else:
+		print(f"Tabela de enriquecimento desatualizada ({', '.join(resultado['motivos'])}); executando o pipeline completo.")
+	return resultado
+
+
+def comparar_historico(janela: int, tolerancia: float) -> int:
+	"""Compara a última execução do histórico com o baseline; retorna o código de saída."""
+	execucoes = carregar_historico(HISTORICO_EXECUCOES)
+	if not execucoes:
+		print(f"Erro: histórico vazio ou inexistente: {HISTORICO_EXECUCOES}")
+		return 2
+
+	resultado = comparar_com_baseline(execucoes, janela=janela, tolerancia=tolerancia)
+	print(json.dumps(resultado, ensure_ascii=False, indent=2))
+	if resultado["execucoes_baseline"] == 0:
+		print("Aviso: nenhuma execução anterior com status 'ok' para comparar.")
+	if resultado["regressoes"]:
+		print(f"Regressões detectadas: {len(resultado['regressoes'])}")
+		return 1
+	print("Nenhuma regressão detectada.")
+	return 0
+
+
+def verificar_entradas(base_totvs: str) -> dict:
+	"""Pre-flight: valida cabeçalhos e codificações de todas as entradas (sem carregá-las)."""
+	try:
+		fragmentos = resolver_fragmentos_totvs(base_totvs)
+	except FileNotFoundError:
+		fragmentos = [Path(base_totvs)]
+	resultado = validar_entradas(
+		modelo=PLANILHA_MODELO,
+		csv_codigos=CSV_CODIGOS,
+		saida=PLANILHA_SAIDA,
+		fragmentos_totvs=fragmentos,
+		dicionario_traducoes=DICIONARIO_TRADUCOES,
+		dicionarios_csv=[
+			DICIONARIO_MATERIAIS, DICIONARIO_NORMAS, DICIONARIO_SIZE_DIMENSION, DICIONARIO_NOMES_PT, DICIONARIO_NOMES_EN,
+		],
+	)
+	for problema in resultado["problemas"]:
+		print(f"[{problema['nivel']}] {problema['fonte']}: {problema['mensagem']}")
+	print(
+		f"Validação das entradas: {resultado['erros']} erro(s), {resultado['avisos']} aviso(s) "
+		f"em {resultado['duracao_seconds']}s"
+	)
+	return resultado
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+	parser = argparse.ArgumentParser(description="Pipeline de preparação de planilhas SAP/TOTVS.")
+	parser.add_argument(
+		"--check",
+		action="store_true",
+		help="Apenas valida as entradas (cabeçalhos e codificação) e sai com código != 0 se houver erro.",
+	)
+	parser.add_argument(
+		"--comparar-historico",
+		action="store_true",
+		help="Compara a última execução do histórico com o baseline e sai com código != 0 se houver regressão.",
+	)
+	parser.add_argument(
+		"--atualizar-colunas",
+		action="store_true",
+		help=(
+			"Em uma planilha já gerada, recalcula só as colunas afetadas pelas fontes alteradas desde a geração "
+			"(ex.: dicionario_normas.csv -> SAP17)."
+		),
+	)
+	parser.add_argument(
+		"--base-totvs",
+		default=str(BASE_TOTVS),
+		help="Base TOTVS: arquivo .xlsx, diretório com fragmentos .xlsx ou glob (ex.: 'planilhas/totvs_*.xlsx').",
+	)
+	parser.add_argument(
+		"--compacto",
+		action="store_true",
+		help="Mantém as fontes em representação compacta (categóricas, strings Arrow, termos em offsets + bloco UTF-8).",
+	)
+	parser.add_argument(
+		"--progresso-arquivo",
+		default=None,
+		help="Grava o progresso da etapa corrente (JSON) neste arquivo, para consulta por agendadores.",
+	)
+	parser.add_argument(
+		"--progresso-intervalo",
+		type=float,
+		default=5.0,
+		help="Intervalo (s) entre atualizações de progresso no console/arquivo (padrão: 5).",
+	)
+	parser.add_argument(
+		"--leitor-paralelo",
+		action="store_true",
+		help="Lê a base TOTVS com o parser .xlsx em faixas paralelas (um processo por núcleo).",
+	)
+	parser.add_argument(
+		"--join-externo",
+		action="store_true",
+		help=(
+			"Não carrega a base TOTVS inteira: lê em streaming e faz um join ordenado externo com os códigos "
+			"(para bases maiores que a memória)."
+		),
+	)
+	parser.add_argument(
+		"--memoria-join-mb",
+		type=float,
+		default=MEMORIA_PADRAO_MB,
+		help="Orçamento de memória (MB) do --join-externo, repartido entre os fragmentos (padrão: %(default)s).",
+	)
+	parser.add_argument(
+		"--tabela-enriquecimento",
+		nargs="?",
+		const=str(TABELA_ENRIQUECIMENTO),
+		default=None,
+		help=(
+			"Preenche a planilha pela tabela materializada (src/tabela_enriquecimento.py), calculando ao vivo "
+			"só os códigos alterados. Sem valor, usa %(const)s."
+		),
 	)
+	parser.add_argument(
+		"--sem-deduplicacao",
+		action="store_true",
+		help="Enriquece cada linha mesmo com códigos repetidos (por padrão, cada código distinto é enriquecido uma vez).",
+	)
+	parser.add_argument(
+		"--top-lentas",
+		type=int,
+		default=TOP_N_PADRAO,
+		help="Narrativas mais lentas guardadas por matcher no relatório (padrão: %(default)s).",
+	)
+	parser.add_argument(
+		"--linhas-por-arquivo",
+		type=int,
+		default=None,
+		help=(
+			"Divide a planilha final em arquivos com no máximo N itens (mais cabeçalho e linha descritiva). "
+			"Acima do limite do Excel a divisão é automática."
+		),
+	)
+	parser.add_argument(
+		"--fragmentar-por-sap6",
+		action="store_true",
+		help="Divide a planilha final em um arquivo por product group (SAP6).",
+	)
+	parser.add_argument("--janela", type=int, default=5, help="Execuções anteriores usadas como baseline (padrão: 5).")
+	parser.add_argument(
+		"--tolerancia",
+		type=float,
+		default=0.2,
+		help="Queda relativa tolerada em throughput/preenchimento (padrão: 0.2 = 20%%).",
+	)
+	return parser.parse_args(argv)
 
 
-def main() -> None:
+def main(argv: list[str] | None = None) -> None:
 	"""Orquestra o pipeline de geração, enriquecimento e ajustes da planilha."""
+	args = parse_args(argv)
+	if args.comparar_historico:
+		raise SystemExit(comparar_historico(args.janela, args.tolerancia))
+	if args.check:
+		raise SystemExit(1 if verificar_entradas(args.base_totvs)["erros"] else 0)
+	if args.atualizar_colunas:
+		raise SystemExit(atualizar_colunas_planilha(
+			PLANILHA_SAIDA,
+			args.base_totvs,
+			compactar=args.compacto,
+			leitor_paralelo=args.leitor_paralelo,
+			memoria_join_mb=args.memoria_join_mb if args.join_externo else None,
+		))
+
 	report: dict = {
 		"run_started_at": _now_iso(),
 		"environment": {
@@ -239,19 +669,49 @@ def main() -> None:
 		"paths": {
 			"modelo": str(PLANILHA_MODELO),
 			"csv_codigos": str(CSV_CODIGOS),
-			"base_totvs": str(BASE_TOTVS),
+			"base_totvs": args.base_totvs,
 			"saida": str(PLANILHA_SAIDA),
 			"relatorio": str(RELATORIO_EXECUCAO),
 		},
+		"entradas": {},
 		"steps": [],
+		"fontes": {},
 		"status": "in_progress",
 	}
 
+	report["modo_compacto"] = args.compacto
+	report["leitor_paralelo"] = args.leitor_paralelo
+	report["tabela_enriquecimento"] = args.tabela_enriquecimento
+	memoria_join_mb = args.memoria_join_mb if args.join_externo else None
+	report["join_externo_mb"] = memoria_join_mb
+	report["deduplicacao"] = {"ativa": not args.sem_deduplicacao}
+	# no join externo os códigos vêm do CSV; sem ele, da planilha de trabalho existente
+	caminho_codigos = CSV_CODIGOS if CSV_CODIGOS.exists() else PLANILHA_SAIDA
+	fontes: CarregadorFontes | None = None
+	saida: Path | None = None
+	# Códigos repetidos colapsados (src/colapsar_codigos.py) enquanto a planilha de
+	# trabalho tiver só os códigos distintos; None fora desse intervalo
+	colapso: dict | None = None
+
+	def _expandir_apos_erro() -> None:
+		"""Etapa falhou com a planilha colapsada: devolve-a a todas as linhas originais."""
+		nonlocal colapso
+		pendente, colapso = colapso, None
+		try:
+			expandir_planilha(saida, pendente)
+			report["deduplicacao"]["expandida_apos_erro"] = True
+		except Exception as erro:
+			report["deduplicacao"]["expandida_apos_erro"] = False
+			print(f"Aviso: a planilha de trabalho ficou só com os códigos distintos (expansão após o erro falhou: {erro}).")
+
 	def run_step(name: str, fn, metrics_fn=None) -> None:
+		"""Executa uma etapa; `fn` recebe o objeto de progresso da etapa."""
 		step = {"name": name, "started_at": _now_iso()}
 		t0 = time.perf_counter()
+		progresso = Progresso(name, arquivo=args.progresso_arquivo, intervalo_seconds=args.progresso_intervalo)
 		try:
-			fn()
+			fn(progresso)
+			progresso.concluir()
 			step["status"] = "ok"
 			if metrics_fn is not None:
 				step["metrics"] = metrics_fn() or {}
@@ -263,18 +723,68 @@ def main() -> None:
 				"traceback": traceback.format_exc(),
 			}
 			report["status"] = "error"
+			if colapso is not None:
+				_expandir_apos_erro()
+			if fontes is not None:
+				fontes.encerrar()
 			raise
 		finally:
 			step["duration_seconds"] = round(time.perf_counter() - t0, 3)
 			step["finished_at"] = _now_iso()
 			report["steps"].append(step)
+			report["fontes"] = fontes.metricas() if fontes is not None else {}
 			_write_report(report)
+			if report["status"] == "error":
+				registrar_execucao(report, HISTORICO_EXECUCOES)
 
-	saida: Path | None = None
+	# Pre-flight: falha rápido se faltar alguma coluna/arquivo, antes de qualquer carga pesada
+	def _step_validar_entradas(_progresso: Progresso) -> None:
+		report["validacao"] = verificar_entradas(args.base_totvs)
+		if report["validacao"]["erros"]:
+			raise ValueError(f"Validação das entradas falhou com {report['validacao']['erros']} erro(s).")
+
+	run_step(
+		"validar_entradas",
+		_step_validar_entradas,
+		metrics_fn=lambda: {
+			"erros": report["validacao"]["erros"],
+			"avisos": report["validacao"]["avisos"],
+		},
+	)
 
-	def _step_gerar_planilha_base() -> None:
-		nonlocal saida
-		saida = gerar_planilha_base(PLANILHA_MODELO, CSV_CODIGOS, PLANILHA_SAIDA)
+	# Impressões das fontes (tabela materializada e manifesto de `--atualizar-colunas`).
+	# Com a tabela, são necessárias já na consulta; sem ela, só no manifesto, então
+	# o hash roda em uma thread depois de disparada a carga das fontes, sem atrasá-la
+	impressoes: dict | None = None
+	impressoes_futuro: Future | None = None
+	if args.tabela_enriquecimento:
+		impressoes = impressoes_fontes_pipeline(args.base_totvs)
+	else:
+		# Dispara a carga das fontes antes das etapas (sobrepõe com a planilha base);
+		# com a tabela materializada, só se ela não puder ser usada
+		fontes = iniciar_prefetch_fontes(
+			args.base_totvs,
+			compactar=args.compacto,
+			leitor_paralelo=args.leitor_paralelo,
+			memoria_join_mb=memoria_join_mb,
+			caminho_codigos=caminho_codigos,
+		)
+		executor_impressoes = ThreadPoolExecutor(max_workers=1, thread_name_prefix="impressoes")
+		impressoes_futuro = executor_impressoes.submit(impressoes_fontes_pipeline, args.base_totvs)
+		executor_impressoes.shutdown(wait=False)
+
+	linhas_csv_codigos = 0
+
+	def _step_gerar_planilha_base(_progresso: Progresso) -> None:
+		nonlocal saida, linhas_csv_codigos
+		linhas_csv_codigos = int(pd.read_csv(CSV_CODIGOS, header=None).shape[0]) if CSV_CODIGOS.exists() else 0
+		# Acima do limite do Excel a planilha de trabalho é um intermediário .pkl
+		# (src/planilha_trabalho.py); só os fragmentos finais são gravados em Excel
+		planilha_trabalho = PLANILHA_SAIDA
+		if linhas_csv_codigos > MAX_ITENS_POR_ARQUIVO:
+			planilha_trabalho = PLANILHA_SAIDA.with_suffix(EXTENSAO_INTERMEDIARIA)
+			print(f"{linhas_csv_codigos} itens excedem o limite do Excel: planilha de trabalho em {planilha_trabalho}")
+		saida = gerar_planilha_base(PLANILHA_MODELO, CSV_CODIGOS, planilha_trabalho)
 		saida = garantir_planilha_saida(saida)
 
 	run_step(
@@ -282,103 +792,235 @@ def main() -> None:
 		_step_gerar_planilha_base,
 		metrics_fn=lambda: {
 			"saida_existe": bool(saida and Path(saida).exists()),
-			"linhas_csv_codigos": int(pd.read_csv(CSV_CODIGOS, header=None).shape[0]) if CSV_CODIGOS.exists() else 0,
+			"linhas_csv_codigos": linhas_csv_codigos,
 		},
 	)
 	assert saida is not None
 	# atualiza caminho de saída efetivo (caso fallback seja usado)
 	report["paths"]["saida"] = str(saida)
+	report["entradas"]["itens"] = report["steps"][-1]["metrics"]["linhas_csv_codigos"]
 	_write_report(report)
 
-	run_step(
-		"inserir_internal_comment",
-		lambda: inserir_internal_coments(
-			caminho_planilha_atualizada=str(saida),
-			caminho_base_totvs=str(BASE_TOTVS),
-		),
-		metrics_fn=lambda: {
-			"sap123_preenchidos": _count_nonempty_column(saida, "SAP123", PRIMEIRA_LINHA_ITENS_DF),
-		},
-	)
-
-	run_step(
-		"inserir_product_group",
-		lambda: inserir_product_group(
-			caminho_planilha_atualizada=str(saida),
-			caminho_base_totvs=str(BASE_TOTVS),
-		),
-		metrics_fn=lambda: {
-			"sap6_preenchidos": _count_nonempty_column(saida, "SAP6", PRIMEIRA_LINHA_ITENS_DF),
-		},
-	)
-
-	run_step(
-		"inserir_unidade",
-		lambda: inserir_unidade(
-			caminho_planilha_atualizada=str(saida),
-			caminho_base_totvs=str(BASE_TOTVS),
-		),
-		metrics_fn=lambda: {
-			"sap5_preenchidos": _count_nonempty_column(saida, "SAP5", PRIMEIRA_LINHA_ITENS_DF),
-		},
-	)
-
-	run_step(
-		"processar_materiais",
-		lambda: processar_materiais(saida),
-		metrics_fn=lambda: {
-			"coluna4_preenchidos": _count_nonempty_column(saida, "Coluna4", PRIMEIRA_LINHA_ITENS_DF),
-		},
-	)
-
-	run_step(
-		"processar_normas",
-		lambda: processar_normas(saida),
-		metrics_fn=lambda: {
-			"sap17_preenchidos": _count_nonempty_column(saida, "SAP17", PRIMEIRA_LINHA_ITENS_DF),
-		},
-	)
-
-	run_step(
-		"processar_size_dimension",
-		lambda: processar_size_dimension(saida),
-		metrics_fn=lambda: {
-			"sap15_preenchidos": _count_nonempty_column(saida, "SAP15", PRIMEIRA_LINHA_ITENS_DF),
-		},
-	)
-
-	run_step(
-		"processar_traducoes",
-		lambda: processar_traducoes(saida),
-		metrics_fn=lambda: {
-			"sap1_preenchidos": _count_nonempty_column(saida, "SAP1", PRIMEIRA_LINHA_ITENS_DF),
-			"sap2_preenchidos": _count_nonempty_column(saida, "SAP2", PRIMEIRA_LINHA_ITENS_DF),
-			"sap3_preenchidos": _count_nonempty_column(saida, "SAP3", PRIMEIRA_LINHA_ITENS_DF),
-			"coluna32_preenchidos": _count_nonempty_column(saida, "Coluna32", PRIMEIRA_LINHA_ITENS_DF),
-		},
-	)
-
-	run_step(
-		"inserir_valores_fixos",
-		lambda: inserir_valores_fixos_planilha(saida),
-		metrics_fn=lambda: {
-			"sap10_igual_10": _count_equals(saida, "SAP10", "10", PRIMEIRA_LINHA_ITENS_DF),
-			"sap14_igual_NDB": _count_equals(saida, "SAP14", "NDB", PRIMEIRA_LINHA_ITENS_DF),
-		},
-	)
-
-	run_step(
-		"ajustar_narrativas",
-		lambda: ajustar_narrativas(saida),
-		metrics_fn=lambda: {
-			"narrativa_marcada": _count_equals(
+	# Códigos repetidos: cada código distinto é enriquecido uma vez e os resultados
+	# voltam a todas as linhas originais no fim (src/colapsar_codigos.py)
+	# linhas originais por item, para as contagens das etapas refletirem a planilha final
+	pesos: list[int] | None = None
+	if not args.sem_deduplicacao:
+
+		def _step_colapsar_codigos(_progresso: Progresso) -> None:
+			nonlocal colapso, pesos
+			colapso = colapsar_planilha(saida)
+			pesos = colapso["pesos"]
+
+		run_step(
+			"colapsar_codigos",
+			_step_colapsar_codigos,
+			metrics_fn=lambda: {
+				"detalhes": {"linhas": colapso["linhas"], "codigos_distintos": colapso["codigos_distintos"]},
+			},
+		)
+	inicio_etapas_colapsadas = len(report["steps"])
+
+	tabela_usada = False
+	if args.tabela_enriquecimento:
+		resultado_tabela: dict = {}
+
+		def _step_preencher_por_tabela(_progresso: Progresso) -> None:
+			resultado_tabela.update(preencher_por_tabela(
 				saida,
-				"Narrativa",
-				"verificar internal comment",
-				PRIMEIRA_LINHA_ITENS_DF,
+				Path(args.tabela_enriquecimento),
+				args.base_totvs,
+				impressoes,
+				compactar=args.compacto,
+				leitor_paralelo=args.leitor_paralelo,
+				memoria_join_mb=memoria_join_mb,
+				caminho_codigos=caminho_codigos,
+			))
+
+		run_step("preencher_por_tabela", _step_preencher_por_tabela, metrics_fn=lambda: dict(resultado_tabela))
+		tabela_usada = resultado_tabela["usada"]
+		if not tabela_usada:
+			fontes = iniciar_prefetch_fontes(
+				args.base_totvs,
+				compactar=args.compacto,
+				leitor_paralelo=args.leitor_paralelo,
+				memoria_join_mb=memoria_join_mb,
+				caminho_codigos=caminho_codigos,
+			)
+
+	if not tabela_usada:
+		run_step(
+			"inserir_colunas_totvs",
+			lambda _progresso: inserir_colunas_totvs(
+				caminho_planilha_atualizada=str(saida),
+				caminho_base_totvs=args.base_totvs,
+				df_base_totvs=fontes.obter("base_totvs"),
 			),
-		},
-	)
+			metrics_fn=lambda: {
+				"preenchimento": {
+					"sap123_preenchidos": _count_nonempty_column(saida, "SAP123", PRIMEIRA_LINHA_ITENS_DF, pesos),
+					"sap6_preenchidos": _count_nonempty_column(saida, "SAP6", PRIMEIRA_LINHA_ITENS_DF, pesos),
+					"sap5_preenchidos": _count_nonempty_column(saida, "SAP5", PRIMEIRA_LINHA_ITENS_DF, pesos),
+				},
+			},
+		)
+
+		# Caminhos internos de cada matcher (substring, fuzzy, ...) e narrativas mais lentas
+		contadores = {
+			nome: ContadoresMatcher(nome, top_n=args.top_lentas)
+			for nome in ("material", "normas", "size_dimension", "traducao", "nome_item")
+		}
+
+		run_step(
+			"processar_materiais",
+			lambda progresso: processar_materiais(
+				saida, fontes.obter("dicionario_materiais"), progresso=progresso, contadores=contadores["material"],
+			),
+			metrics_fn=lambda: {
+				"preenchimento": {
+					"coluna4_preenchidos": _count_nonempty_column(saida, "Coluna4", PRIMEIRA_LINHA_ITENS_DF, pesos),
+				},
+				"matcher": contadores["material"].resumo(),
+			},
+		)
+
+		run_step(
+			"processar_normas",
+			lambda progresso: processar_normas(
+				saida, fontes.obter("dicionario_normas"), progresso=progresso, contadores=contadores["normas"],
+			),
+			metrics_fn=lambda: {
+				"preenchimento": {
+					"sap17_preenchidos": _count_nonempty_column(saida, "SAP17", PRIMEIRA_LINHA_ITENS_DF, pesos),
+				},
+				"matcher": contadores["normas"].resumo(),
+			},
+		)
+
+		run_step(
+			"processar_size_dimension",
+			lambda progresso: processar_size_dimension(
+				saida, fontes.obter("dicionario_size_dimension"), progresso=progresso, contadores=contadores["size_dimension"],
+			),
+			metrics_fn=lambda: {
+				"preenchimento": {
+					"sap15_preenchidos": _count_nonempty_column(saida, "SAP15", PRIMEIRA_LINHA_ITENS_DF, pesos),
+				},
+				"matcher": contadores["size_dimension"].resumo(),
+			},
+		)
+
+		run_step(
+			"processar_traducoes",
+			lambda progresso: processar_traducoes(
+				saida,
+				df_totvs=fontes.obter("base_totvs"),
+				df_dicionario=fontes.obter("dicionario_traducoes"),
+				progresso=progresso,
+				contadores=contadores["traducao"],
+			),
+			metrics_fn=lambda: {
+				"preenchimento": {
+					"sap1_preenchidos": _count_nonempty_column(saida, "SAP1", PRIMEIRA_LINHA_ITENS_DF, pesos),
+					"sap2_preenchidos": _count_nonempty_column(saida, "SAP2", PRIMEIRA_LINHA_ITENS_DF, pesos),
+					"sap3_preenchidos": _count_nonempty_column(saida, "SAP3", PRIMEIRA_LINHA_ITENS_DF, pesos),
+					"coluna32_preenchidos": _count_nonempty_column(saida, "Coluna32", PRIMEIRA_LINHA_ITENS_DF, pesos),
+				},
+				"matcher": contadores["traducao"].resumo(),
+			},
+		)
+
+		# Nome canônico do item onde a tradução não preencheu SAP1/SAP2
+		resultado_nomes: dict = {}
+
+		def _step_normalizar_nomes(progresso: Progresso) -> None:
+			resultado_nomes.update(processar_nomes(
+				saida,
+				df_totvs=fontes.obter("base_totvs"),
+				df_dicionario=fontes.obter("dicionario_traducoes"),
+				nomes_pt=fontes.obter("dicionario_nomes_pt"),
+				nomes_en=fontes.obter("dicionario_nomes_en"),
+				progresso=progresso,
+				contadores=contadores["nome_item"],
+				pesos=pesos,
+			))
+
+		run_step(
+			"normalizar_nomes",
+			_step_normalizar_nomes,
+			metrics_fn=lambda: {
+				"preenchimento": {
+					**resultado_nomes["preenchimento"],
+					"sap1_preenchidos": _count_nonempty_column(saida, "SAP1", PRIMEIRA_LINHA_ITENS_DF, pesos),
+					"sap2_preenchidos": _count_nonempty_column(saida, "SAP2", PRIMEIRA_LINHA_ITENS_DF, pesos),
+				},
+				"detalhes": resultado_nomes["detalhes"],
+				"matcher": contadores["nome_item"].resumo(),
+			},
+		)
+
+		run_step(
+			"inserir_valores_fixos",
+			lambda progresso: inserir_valores_fixos_planilha(saida, progresso),
+			metrics_fn=lambda: {
+				"preenchimento": {
+					"sap10_igual_10": _count_equals(saida, "SAP10", "10", PRIMEIRA_LINHA_ITENS_DF, pesos),
+					"sap14_igual_NDB": _count_equals(saida, "SAP14", "NDB", PRIMEIRA_LINHA_ITENS_DF, pesos),
+				},
+			},
+		)
+
+		run_step(
+			"ajustar_narrativas",
+			lambda progresso: ajustar_narrativas(saida, progresso),
+			metrics_fn=lambda: {
+				"preenchimento": {
+					"narrativa_marcada": _count_equals(
+						saida,
+						"Narrativa",
+						"verificar internal comment",
+						PRIMEIRA_LINHA_ITENS_DF,
+						pesos,
+					),
+				},
+			},
+		)
+
+	if colapso is not None:
+		segundos_colapsados = sum(float(s["duration_seconds"]) for s in report["steps"][inicio_etapas_colapsadas:])
+		# a própria expansão não é repetida se falhar
+		colapsado, colapso = colapso, None
+		run_step("expandir_codigos", lambda _progresso: expandir_planilha(saida, colapsado))
+		pesos = None
+		report["deduplicacao"].update(resumo_colapso(colapsado, segundos_colapsados))
+		_write_report(report)
+
+	if fontes is not None:
+		fontes.encerrar()
+	# Manifesto das fontes usadas, para `--atualizar-colunas` (que regrava a planilha .xlsx;
+	# o intermediário acima do limite do Excel só existe para ser fragmentado)
+	if not intermediaria(saida):
+		gravar_manifesto(saida, impressoes if impressoes is not None else impressoes_futuro.result())
+	# Fragmentação da saída: pedida explicitamente ou obrigatória acima do limite do Excel
+	if args.linhas_por_arquivo or args.fragmentar_por_sap6 or intermediaria(saida):
+		manifesto: dict = {}
+
+		def _step_fragmentar_saida(_progresso: Progresso) -> None:
+			manifesto.update(fragmentar_planilha(
+				caminho_planilha=str(saida),
+				diretorio_saida=str(DIRETORIO_FRAGMENTOS),
+				linhas_por_arquivo=args.linhas_por_arquivo or MAX_ITENS_POR_ARQUIVO,
+				agrupar_por="SAP6" if args.fragmentar_por_sap6 else None,
+			))
+
+		run_step(
+			"fragmentar_saida",
+			_step_fragmentar_saida,
+			metrics_fn=lambda: {
+				"arquivos": len(manifesto["fragmentos"]),
+				"manifesto": manifesto["manifesto"],
+			},
+		)
 
 	report["status"] = "ok"
 	report["run_finished_at"] = _now_iso()
@@ -388,6 +1030,7 @@ def main() -> None:
 		3,
 	)
 	_write_report(report)
+	registrar_execucao(report, HISTORICO_EXECUCOES)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,174 @@
+"""Busca de size dimension por chave canônica (hash), sem varrer o dicionário.
+
+`encontrar_size_dimension` testa as ~19 mil entradas do dicionário como
+substring de cada narrativa. Aqui o dicionário é indexado uma única vez e cada
+narrativa custa apenas consultas em dicionários Python:
+
+1. Substring exata (mesma regra da implementação original): as substrings da
+   narrativa com os comprimentos presentes no dicionário são consultadas num
+   hash `texto em maiúsculas -> entradas`. Vence a entrada mais longa; em
+   empate, a primeira na ordem de iteração do dicionário (como o `max`).
+2. Variantes de formatação: narrativa e entradas são quebradas em expressões
+   e reduzidas a uma chave canônica (vírgula decimal -> ponto, zeros à direita
+   removidos, `/ x` e `*` -> `X`, sem espaços). Assim `10 x 2 mm` encontra a
+   entrada `10,00 / x 2,00mm`.
+3. Sem nenhuma das duas, mantém a resposta da implementação original para
+   dicionários não vazios ("material nao informado") sem rodar o fuzzy.
+"""
+
+import re
+
+# Resposta da implementação original quando o fuzzy é acionado
+NAO_INFORMADO = "material nao informado"
+# Expressões mais longas que isso (em tokens) não são consultadas na etapa 2
+MAX_TOKENS_EXPRESSAO = 12
+
+_DECIMAL_VIRGULA = re.compile(r"(?<=\d),(?=\d)")
+_DECIMAL = re.compile(r"\d+\.\d+")
+_PONTUACAO_BORDA = ".,;:"
+
+
+def _sem_zeros(match: re.Match) -> str:
+	# 10.00 -> 10, 2.50 -> 2.5 (3.1/2 fica como está)
+	return match.group().rstrip("0").rstrip(".")
+
+
+def canonizar_token(token: str) -> str:
+	"""Forma canônica de um token (sem espaços): maiúsculas, decimal com ponto, sem zeros à direita."""
+	token = _DECIMAL_VIRGULA.sub(".", token.upper())
+	token = _DECIMAL.sub(_sem_zeros, token)
+	return token.replace("*", "X").replace("×", "X")
+
+
+def _juntar(tokens_canonicos) -> str:
+	# "10 / x 2mm" (Ø x espessura) equivale a "10x2mm"
+	return "".join(tokens_canonicos).replace("/X", "X").strip(_PONTUACAO_BORDA)
+
+
+def chave_canonica(texto: str) -> str:
+	"""Chave canônica de um texto inteiro (entrada do dicionário ou expressão da narrativa)."""
+	return _juntar(canonizar_token(t) for t in texto.split())
+
+
+def construir_indice_size_dimension(size_dimension, variantes: bool = True) -> dict:
+	"""Indexa o dicionário (set ou tupla, na ordem de iteração que a busca original usaria).
+
+	Com `variantes=False` só a etapa de substring exata é usada e as respostas
+	são idênticas às de `encontrar_size_dimension` (ver src/comparar_matchers.py).
+	"""
+	por_texto: dict[str, list[tuple[int, str]]] = {}
+	por_chave: dict[str, tuple[int, str]] = {}
+	max_tokens = 0
+
+	residuais: list[tuple[int, str]] = []
+	for posicao, entrada in enumerate(size_dimension):
+		texto = entrada.upper()
+		if len(texto) == len(entrada):
+			por_texto.setdefault(texto, []).append((posicao, entrada))
+		else:
+			# upper() mudou o comprimento (ex.: "ß" -> "SS"): fica fora do hash
+			residuais.append((posicao, entrada))
+		if not variantes:
+			continue
+		chave = chave_canonica(entrada)
+		if not chave:
+			continue
+		atual = por_chave.get(chave)
+		if atual is None or len(entrada) > len(atual[1]):
+			por_chave[chave] = (posicao, entrada)
+		max_tokens = max(max_tokens, len(entrada.split()))
+
+	por_comprimento: dict[int, set[str]] = {}
+	for texto in por_texto:
+		por_comprimento.setdefault(len(texto), set()).add(texto)
+
+	return {
+		"por_texto": por_texto,
+		# do mais longo para o mais curto: a primeira faixa com acerto decide
+		"por_comprimento": sorted(por_comprimento.items(), reverse=True),
+		"residuais": residuais,
+		"por_chave": por_chave,
+		"max_tokens": min(max_tokens, MAX_TOKENS_EXPRESSAO),
+		"vazio": not por_texto and not residuais,
+	}
+
+
+def construir_indice_size_dimension_estrito(size_dimension) -> dict:
+	"""Índice sem variantes (respostas idênticas à implementação original)."""
+	return construir_indice_size_dimension(size_dimension, variantes=False)
+
+
+def _mais_especifica(candidatas) -> str | None:
+	# mais longa primeiro; em empate, a que vem antes na ordem de iteração
+	melhor = None
+	for posicao, entrada in candidatas:
+		if melhor is None or len(entrada) > len(melhor[1]) or (
+			len(entrada) == len(melhor[1]) and posicao < melhor[0]
+		):
+			melhor = (posicao, entrada)
+	return melhor[1] if melhor else None
+
+
+def _substrings_exatas(narrativa_upper: str, indice: dict) -> list[tuple[int, str]]:
+	por_texto = indice["por_texto"]
+	n = len(narrativa_upper)
+	candidatas = [(p, e) for p, e in indice["residuais"] if e.upper() in narrativa_upper]
+	for comprimento, textos in indice["por_comprimento"]:
+		if comprimento > n:
+			continue
+		# todas as substrings com esse comprimento, fatiadas sem laço Python
+		fatias = map(narrativa_upper.__getitem__, map(slice, range(n - comprimento + 1), range(comprimento, n + 1)))
+		acertos = textos.intersection(fatias)
+		if acertos:
+			# comprimentos em ordem decrescente: nenhuma entrada mais curta pode vencer
+			for texto in acertos:
+				candidatas.extend(por_texto[texto])
+			break
+	return candidatas
+
+
+def expressoes_canonicas(narrativa: str, max_tokens: int) -> set[str]:
+	"""Chaves canônicas de todas as sequências de até `max_tokens` tokens consecutivos."""
+	tokens = [canonizar_token(t) for t in narrativa.split()]
+	chaves = set()
+	for inicio in range(len(tokens)):
+		for fim in range(inicio + 1, min(inicio + max_tokens, len(tokens)) + 1):
+			chave = _juntar(tokens[inicio:fim])
+			if chave:
+				chaves.add(chave)
+	return chaves
+
+
+def encontrar_size_dimension_indexado(narrativa, indice: dict, contadores=None):
+	"""Mesmo contrato de `encontrar_size_dimension`, usando o índice de `construir_indice_size_dimension`.
+
+	`contadores` (opcional, ver src/contadores_matchers.py) registra o caminho e o tempo da chamada.
+	"""
+	inicio = contadores.iniciar() if contadores is not None else 0.0
+	if not isinstance(narrativa, str) or not narrativa.strip():
+		if contadores is not None:
+			contadores.registrar("entrada_vazia", inicio, narrativa)
+		return None
+
+	selecionado = _mais_especifica(_substrings_exatas(narrativa.upper(), indice))
+	if selecionado is not None:
+		if contadores is not None:
+			contadores.registrar("substring", inicio, narrativa)
+		return selecionado
+
+	if indice["por_chave"]:
+		por_chave = indice["por_chave"]
+		selecionado = _mais_especifica(
+			por_chave[chave]
+			for chave in expressoes_canonicas(narrativa, indice["max_tokens"])
+			if chave in por_chave
+		)
+		if selecionado is not None:
+			if contadores is not None:
+				contadores.registrar("variante", inicio, narrativa)
+			return selecionado
+
+	# a implementação original cai no fuzzy, que sempre devolve um candidato
+	if contadores is not None:
+		contadores.registrar("nao_informado", inicio, narrativa)
+	return None if indice["vazio"] else NAO_INFORMADO
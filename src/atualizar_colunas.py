@@ -0,0 +1,189 @@
+"""Invalidação por coluna: recalcula só as colunas afetadas por uma fonte alterada.
+
+Ao final de cada execução o pipeline grava, ao lado da planilha, um manifesto
+(`<planilha>.fontes.json`) com a impressão digital de cada fonte usada (ver
+`impressoes_fontes` em src/tabela_enriquecimento.py). Na atualização, as
+impressões atuais são comparadas com as do manifesto e `GRUPOS_COLUNAS` diz
+quais colunas cada fonte alimenta; só essas colunas são recalculadas e
+regravadas na planilha existente (via openpyxl, sem tocar nas demais células).
+Só as fontes de que os grupos invalidados dependem são carregadas: uma edição
+em `dicionario_normas.csv` relê apenas esse dicionário e as narrativas
+(SAP123) que já estão na planilha.
+"""
+
+import json
+from pathlib import Path
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from analisar_dimensoes import construir_indice_size_dimension, encontrar_size_dimension_indexado
+from inserir_colunas_totvs import MAPEAMENTO_TOTVS, aplicar_mapeamento_totvs
+from inserir_material import encontrar_material
+from inserir_normas import encontrar_normas
+from inserir_traducoes import (
+	COLUNAS_TRADUCAO,
+	carregar_descricoes_totvs,
+	carregar_termos_traducao,
+	encontrar_traducao,
+	textos_para_traducao,
+)
+from normalizar_nomes import NomesCanonicos
+from tabela_enriquecimento import VERSAO_REGRAS
+
+# Grupos de colunas recalculados juntos:
+# - "fontes": entradas lidas para recalcular o grupo (chaves de `impressoes_fontes`);
+# - "depende_de": grupos cujas colunas o grupo lê da planilha (ex.: a narrativa SAP123).
+GRUPOS_COLUNAS: dict[str, dict] = {
+	"totvs": {
+		"fontes": ("base_totvs",),
+		"colunas": (*MAPEAMENTO_TOTVS, "Narrativa"),
+		"depende_de": (),
+	},
+	"material": {
+		"fontes": ("dicionario_materiais",),
+		"colunas": ("Coluna4",),
+		"depende_de": ("totvs",),
+	},
+	"normas": {
+		"fontes": ("dicionario_normas",),
+		"colunas": ("SAP17",),
+		"depende_de": ("totvs",),
+	},
+	"size_dimension": {
+		"fontes": ("dicionario_size_dimension",),
+		"colunas": ("SAP15",),
+		"depende_de": ("totvs",),
+	},
+	# as traduções também usam a Descrição da base TOTVS, que não fica na planilha;
+	# os nomes canônicos completam SAP1/SAP2 depois das traduções, por isso ficam no mesmo grupo
+	"traducoes": {
+		"fontes": ("dicionario_traducoes", "base_totvs", "dicionario_nomes_pt", "dicionario_nomes_en"),
+		"colunas": tuple(COLUNAS_TRADUCAO.values()),
+		"depende_de": ("totvs",),
+	},
+}
+
+# Primeira linha de itens no Excel (1 = cabeçalho, 2 = linha descritiva)
+PRIMEIRA_LINHA_ITENS_EXCEL = 3
+LIMITE_NARRATIVA = 141
+MARCA_NARRATIVA = "verificar internal comment"
+
+
+def caminho_manifesto(planilha: str | Path) -> Path:
+	"""Manifesto das fontes de uma planilha gerada (ex.: planilha_atualizada.fontes.json)."""
+	return Path(planilha).with_suffix(".fontes.json")
+
+
+def gravar_manifesto(planilha: str | Path, impressoes: dict[str, str]) -> Path:
+	caminho = caminho_manifesto(planilha)
+	caminho.write_text(
+		json.dumps({"versao_regras": VERSAO_REGRAS, "fontes": impressoes}, ensure_ascii=False, indent=2),
+		encoding="utf-8",
+	)
+	return caminho
+
+
+def ler_manifesto(planilha: str | Path) -> dict | None:
+	caminho = caminho_manifesto(planilha)
+	if not caminho.exists():
+		return None
+	return json.loads(caminho.read_text(encoding="utf-8"))
+
+
+def grupos_invalidados(manifesto: dict, impressoes: dict[str, str]) -> list[str]:
+	"""Grupos de `GRUPOS_COLUNAS` afetados pelas fontes que mudaram (com os dependentes)."""
+	if manifesto.get("versao_regras") != VERSAO_REGRAS:
+		return list(GRUPOS_COLUNAS)
+	anteriores = manifesto.get("fontes", {})
+	alteradas = {fonte for fonte, valor in impressoes.items() if anteriores.get(fonte) != valor}
+	grupos = {nome for nome, grupo in GRUPOS_COLUNAS.items() if alteradas.intersection(grupo["fontes"])}
+	while True:
+		novos = {nome for nome, grupo in GRUPOS_COLUNAS.items() if grupos.intersection(grupo["depende_de"])} - grupos
+		if not novos:
+			break
+		grupos |= novos
+	return [nome for nome in GRUPOS_COLUNAS if nome in grupos]
+
+
+def fontes_necessarias(grupos: list[str]) -> set[str]:
+	return {fonte for nome in grupos for fonte in GRUPOS_COLUNAS[nome]["fontes"]}
+
+
+def _vazio(valor: object) -> bool:
+	return valor is None or (isinstance(valor, float) and pd.isna(valor))
+
+
+def recalcular_colunas(df: pd.DataFrame, grupos: list[str], obter) -> dict[str, list]:
+	"""Novos valores (itens, na ordem da planilha) das colunas dos `grupos`.
+
+	`df` é a planilha lida com `pd.read_excel` (índice 0 = linha descritiva);
+	`obter(fonte)` devolve a fonte carregada (nomes de `CarregadorFontes`).
+	"""
+	codigos = df.iloc[1:, 0]
+	narrativas = df.loc[1:, "SAP123"].tolist() if "SAP123" in df.columns else [None] * len(codigos)
+	novos: dict[str, list] = {}
+
+	if "totvs" in grupos:
+		valores = aplicar_mapeamento_totvs(codigos, obter("base_totvs"))
+		replicas: dict[str, list] = {}
+		for destino, regra in MAPEAMENTO_TOTVS.items():
+			novos[destino] = valores[destino].tolist()
+			replicas[destino] = [c for c in df.columns if str(c).strip().lower() in regra.get("replicar_em", ())]
+			for coluna in replicas[destino]:
+				novos[coluna] = valores[destino].tolist()
+		narrativas = novos["SAP123"]
+		# coluna Narrativa (réplica de SAP123) marcada como em src/inserir_narrativas.py
+		for coluna in replicas["SAP123"]:
+			novos[coluna] = [
+				MARCA_NARRATIVA if isinstance(n, str) and len(n) > LIMITE_NARRATIVA else valor
+				for n, valor in zip(narrativas, novos[coluna])
+			]
+
+	if "material" in grupos:
+		materiais = obter("dicionario_materiais")
+		novos["Coluna4"] = [encontrar_material(n, materiais) for n in narrativas]
+	if "normas" in grupos:
+		normas = obter("dicionario_normas")
+		novos["SAP17"] = [encontrar_normas(n, normas) for n in narrativas]
+	if "size_dimension" in grupos:
+		indice = construir_indice_size_dimension(obter("dicionario_size_dimension"))
+		novos["SAP15"] = [encontrar_size_dimension_indexado(n, indice) for n in narrativas]
+
+	if "traducoes" in grupos:
+		descricoes = carregar_descricoes_totvs(obter("base_totvs"))
+		termos = carregar_termos_traducao(obter("dicionario_traducoes"))
+		nomes = NomesCanonicos(obter("dicionario_nomes_pt"), obter("dicionario_nomes_en"), obter("dicionario_traducoes"))
+		linhas = []
+		for codigo, narrativa in zip(codigos, narrativas):
+			textos = textos_para_traducao(codigo, descricoes, narrativa)
+			traducao = encontrar_traducao(textos, termos) if textos else None
+			linha = {coluna: traducao.get(idioma) if traducao else None for idioma, coluna in COLUNAS_TRADUCAO.items()}
+			nomes.completar(linha, textos)
+			linhas.append(linha)
+		for coluna in COLUNAS_TRADUCAO.values():
+			novos[coluna] = [linha[coluna] for linha in linhas]
+
+	return novos
+
+
+def regravar_colunas(planilha: str | Path, novos: dict[str, list]) -> dict[str, int]:
+	"""Regrava só as colunas de `novos` na planilha existente; retorna as células alteradas por coluna."""
+	wb = load_workbook(planilha)
+	ws = wb.active
+	posicoes = {celula.value: celula.column for celula in ws[1] if celula.value is not None}
+
+	alteradas: dict[str, int] = {}
+	for coluna, valores in novos.items():
+		if coluna not in posicoes:
+			continue
+		alteradas[coluna] = 0
+		for deslocamento, valor in enumerate(valores):
+			celula = ws.cell(row=PRIMEIRA_LINHA_ITENS_EXCEL + deslocamento, column=posicoes[coluna])
+			valor = None if _vazio(valor) else valor
+			anterior = None if celula.value == "" else celula.value
+			if anterior != valor:
+				celula.value = valor
+				alteradas[coluna] += 1
+	wb.save(planilha)
+	return alteradas
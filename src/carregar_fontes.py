@@ -0,0 +1,314 @@
+"""Carga antecipada (prefetch) das fontes de entrada do pipeline.
+
+Todas as fontes (base TOTVS, dicionário de traduções e dicionários CSV) são
+agendadas no início da execução e carregadas em paralelo, enquanto a planilha
+base é gerada. Cada etapa apenas aguarda o resultado já carregado.
+
+No modo compacto, as fontes são convertidas após a carga para representações
+mais econômicas em memória (colunas categóricas, strings Arrow e dicionários
+como `offsets` + `blob` UTF-8, ver `TermosCompactos`).
+"""
+
+import glob
+import importlib.util
+import os
+import sys
+import time
+from collections.abc import Sequence
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from inserir_colunas_totvs import encontrar_coluna_item
+from leitor_xlsx_paralelo import ler_planilha_paralela
+
+
+def carregar_base_totvs(caminho_base_totvs: str, paralelo: bool = False, max_workers: int | None = None) -> pd.DataFrame:
+	"""Lê a base TOTVS (cabeçalho real na linha 5 do Excel).
+
+	Com `paralelo=True` usa o leitor em faixas de src/leitor_xlsx_paralelo.py
+	(mesmo DataFrame, com o parse dividido entre `max_workers` processos).
+	"""
+	if paralelo:
+		return ler_planilha_paralela(caminho_base_totvs, header=4, max_workers=max_workers)
+	return pd.read_excel(caminho_base_totvs, header=4)
+
+
+def resolver_fragmentos_totvs(caminho_base_totvs: str) -> list[Path]:
+	"""Resolve a base TOTVS em uma lista ordenada de arquivos (fragmentos).
+
+	Aceita um arquivo único, um diretório (todos os .xlsx dentro dele) ou um
+	padrão glob (ex.: `planilhas/totvs_*.xlsx`). A ordem (por nome) define a
+	precedência na combinação: em códigos repetidos, vale o primeiro fragmento.
+	"""
+	caminho = Path(caminho_base_totvs)
+	if caminho.is_dir():
+		arquivos = sorted(caminho.glob("*.xlsx"))
+	elif glob.has_magic(caminho_base_totvs):
+		arquivos = sorted(Path(p) for p in glob.glob(caminho_base_totvs))
+	else:
+		return [caminho]
+	# ignora arquivos temporários de lock do Excel (~$arquivo.xlsx)
+	arquivos = [a for a in arquivos if not a.name.startswith("~$")]
+	if not arquivos:
+		raise FileNotFoundError(f"Nenhum arquivo da base TOTVS encontrado em: {caminho_base_totvs}")
+	return arquivos
+
+
+def _coluna_item(df: pd.DataFrame):
+	for c in df.columns:
+		if str(c).strip().lower() == "item":
+			return c
+	return df.columns[0]
+
+
+def combinar_fragmentos_totvs(partes: list[pd.DataFrame]) -> tuple[pd.DataFrame, dict]:
+	"""Concatena os fragmentos e remove códigos repetidos (vale o primeiro fragmento).
+
+	O código é normalizado (texto sem espaços nas pontas) apenas para a
+	deduplicação; os valores originais das colunas são preservados.
+	"""
+	base = pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+	col_item = _coluna_item(base)
+	chave = base[col_item].astype(str).str.strip()
+	duplicados = chave.duplicated(keep="first")
+
+	# conflito: código repetido cujo conteúdo difere da linha que prevaleceu
+	conflitos = 0
+	if duplicados.any():
+		repetidas = chave.duplicated(keep=False)
+		linhas = base.loc[repetidas].astype(str)
+		linhas[col_item] = chave[repetidas]
+		distintas = linhas.drop_duplicates()
+		conflitos = int(distintas[col_item].duplicated().groupby(distintas[col_item]).any().sum())
+
+	combinada = base.loc[~duplicados].reset_index(drop=True)
+	info = {
+		"registros_antes_dedup": int(len(base)),
+		"codigos_duplicados": int(duplicados.sum()),
+		"codigos_em_conflito": conflitos,
+		"precedencia": "primeiro fragmento (ordem por nome de arquivo)",
+	}
+	return combinada, info
+
+
+def carregar_dicionario_traducoes(caminho_dicionario_traducoes: str) -> pd.DataFrame:
+	"""Lê o dicionário de traduções (PORTUGUÊS/INGLÊS/ESPANHOL/ALEMÂO)."""
+	return pd.read_excel(caminho_dicionario_traducoes)
+
+
+# pyarrow é opcional: sem ele, colunas de texto de alta cardinalidade ficam como estão
+STRING_ARROW_DISPONIVEL = importlib.util.find_spec("pyarrow") is not None
+
+
+def compactar_dataframe(df: pd.DataFrame, limite_cardinalidade: float = 0.5) -> pd.DataFrame:
+	"""Converte colunas de texto para categóricas (baixa cardinalidade) ou strings Arrow.
+
+	Uma coluna é considerada de baixa cardinalidade quando a razão valores
+	distintos / linhas não passa de `limite_cardinalidade` (ex.: UN, Fam Coml).
+	Nenhum valor muda de tipo: a coluna de código (`encontrar_coluna_item`) fica
+	como está, por ser a chave dos joins, e só colunas inteiramente de texto
+	viram strings Arrow (códigos mistos int/str convertidos para texto mudariam
+	os casamentos).
+	"""
+	df = df.copy()
+	coluna_item = encontrar_coluna_item(df) if len(df.columns) else None
+	for col in df.columns:
+		if col == coluna_item:
+			continue
+		serie = df[col]
+		if not (pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie)):
+			continue
+		if isinstance(serie.dtype, pd.CategoricalDtype):
+			continue
+		nao_nulos = serie.notna().sum()
+		if nao_nulos and serie.nunique(dropna=True) / nao_nulos <= limite_cardinalidade:
+			df[col] = serie.astype("category")
+		elif STRING_ARROW_DISPONIVEL and pd.api.types.infer_dtype(serie, skipna=True) == "string":
+			df[col] = serie.astype("string[pyarrow]")
+	return df
+
+
+class TermosCompactos(Sequence):
+	"""Dicionário de termos como `offsets` (int64, n + 1) + `blob` (UTF-8).
+
+	Mesmo layout das listas de textos de src/estruturas_compartilhadas.py: dois
+	objetos por dicionário, em vez de um `str` (com ~50 bytes de cabeçalho) por
+	termo. Cada termo é decodificado ao ser acessado, na ordem em que o
+	dicionário foi carregado, então os desempates dos matchers não mudam.
+	"""
+
+	__slots__ = ("_offsets", "_blob")
+	BLOCO_ITERACAO = 4096
+
+	def __init__(self, termos):
+		codificados = [str(t).encode("utf-8") for t in termos]
+		self._offsets = np.zeros(len(codificados) + 1, dtype=np.int64)
+		np.cumsum([len(c) for c in codificados], out=self._offsets[1:])
+		self._blob = b"".join(codificados)
+
+	@classmethod
+	def de_secoes(cls, offsets: np.ndarray, blob) -> "TermosCompactos":
+		"""Visão sobre `offsets`/`blob` já gravados (ex.: seções mapeadas em memória), sem copiar."""
+		termos = cls.__new__(cls)
+		termos._offsets = offsets
+		termos._blob = blob
+		return termos
+
+	def __len__(self) -> int:
+		return len(self._offsets) - 1
+
+	def __getitem__(self, indice):
+		if isinstance(indice, slice):
+			return [self[i] for i in range(*indice.indices(len(self)))]
+		posicao = range(len(self))[indice]
+		return str(self._blob[int(self._offsets[posicao]) : int(self._offsets[posicao + 1])], "utf-8")
+
+	def __iter__(self):
+		# offsets convertidos em blocos: a iteração não materializa a lista inteira
+		blob = self._blob
+		for bloco in range(0, len(self), self.BLOCO_ITERACAO):
+			offsets = self._offsets[bloco : bloco + self.BLOCO_ITERACAO + 1].tolist()
+			for inicio, fim in zip(offsets, offsets[1:]):
+				yield str(blob[inicio:fim], "utf-8")
+
+	@property
+	def nbytes(self) -> int:
+		"""Memória ocupada (objeto, array de offsets e blob)."""
+		return sys.getsizeof(self) + sys.getsizeof(self._offsets) + sys.getsizeof(self._blob)
+
+
+def compactar_fonte(fonte):
+	"""Aplica a representação compacta adequada ao tipo da fonte carregada."""
+	if isinstance(fonte, pd.DataFrame):
+		return compactar_dataframe(fonte)
+	if isinstance(fonte, (set, frozenset, list, tuple)):
+		return TermosCompactos(fonte)
+	return fonte
+
+
+def medir_memoria(fonte) -> int | None:
+	"""Estimativa (bytes) da memória ocupada pela fonte, incluindo os objetos referenciados."""
+	if isinstance(fonte, pd.DataFrame):
+		return int(fonte.memory_usage(deep=True).sum())
+	if isinstance(fonte, TermosCompactos):
+		return fonte.nbytes
+	if isinstance(fonte, (set, frozenset, list, tuple)):
+		# objetos repetidos (ex.: strings internadas) são contados uma vez só
+		unicos = {id(t): t for t in fonte}
+		return sys.getsizeof(fonte) + sum(sys.getsizeof(t) for t in unicos.values())
+	return None
+
+
+def _carregar_cronometrado(fn, *args):
+	# Executa no worker: mede apenas o tempo de carga, sem a espera na fila
+	t0 = time.perf_counter()
+	resultado = fn(*args)
+	return resultado, time.perf_counter() - t0
+
+
+class CarregadorFontes:
+	"""Agenda a carga das fontes em paralelo e entrega os resultados sob demanda.
+
+	- `agendar(nome, fn, *args)`: dispara a carga em background.
+	- `agendar_fragmentos(nome, fn, argumentos, rotulos, combinar)`: uma carga por
+	  fragmento (cada uma no seu worker), combinadas em um único resultado.
+	- `obter(nome)`: bloqueia até a fonte estar pronta e registra o tempo de espera.
+	- `metricas()`: tempo de carga e de espera por fonte (para o relatório).
+
+	Com `usar_processos=True` (padrão) cada carga roda em um processo separado,
+	evitando que o parse das planilhas dispute o GIL com a etapa em andamento.
+	Com `compactar=True`, cada fonte é compactada ao ser obtida pela primeira vez
+	e as métricas trazem a memória antes/depois.
+	"""
+
+	def __init__(self, usar_processos: bool = True, max_workers: int | None = None, compactar: bool = False):
+		executor_cls = ProcessPoolExecutor if usar_processos else ThreadPoolExecutor
+		self._executor = executor_cls(max_workers=max_workers)
+		self._compactar = compactar
+		self._futuros: dict[str, list[Future]] = {}
+		self._fragmentos: dict[str, tuple[list[str], object]] = {}
+		self._resultados: dict[str, object] = {}
+		self._metricas: dict[str, dict] = {}
+		self._agendado_em: dict[str, float] = {}
+
+	def agendar(self, nome: str, fn, *args) -> None:
+		self._agendado_em[nome] = time.perf_counter()
+		self._futuros[nome] = [self._executor.submit(_carregar_cronometrado, fn, *args)]
+
+	def agendar_fragmentos(self, nome: str, fn, argumentos: list[tuple], rotulos: list[str], combinar) -> None:
+		"""Agenda `fn(*args)` para cada fragmento; `combinar(partes)` deve retornar (resultado, info)."""
+		self._agendado_em[nome] = time.perf_counter()
+		self._futuros[nome] = [self._executor.submit(_carregar_cronometrado, fn, *args) for args in argumentos]
+		self._fragmentos[nome] = (rotulos, combinar)
+
+	def obter(self, nome: str):
+		if nome in self._resultados:
+			return self._resultados[nome]
+
+		futuros = self._futuros[nome]
+		pronto = all(f.done() for f in futuros)
+		t0 = time.perf_counter()
+		partes = [f.result() for f in futuros]
+		espera = time.perf_counter() - t0
+		metricas = {
+			# fragmentos carregam em paralelo: a carga efetiva é a do mais lento
+			"carga_seconds": round(max(duracao for _, duracao in partes), 3),
+			"espera_seconds": round(espera, 3),
+			"pronto_ao_solicitar": pronto,
+			"solicitado_apos_seconds": round(t0 - self._agendado_em[nome], 3),
+		}
+		if nome in self._fragmentos:
+			rotulos, combinar = self._fragmentos[nome]
+			metricas["fragmentos"] = [
+				{
+					"arquivo": rotulo,
+					"carga_seconds": round(duracao, 3),
+					"registros": len(parte),
+				}
+				for rotulo, (parte, duracao) in zip(rotulos, partes)
+			]
+			t1 = time.perf_counter()
+			resultado, info = combinar([parte for parte, _ in partes])
+			metricas["combinacao_seconds"] = round(time.perf_counter() - t1, 3)
+			metricas.update(info)
+		else:
+			resultado = partes[0][0]
+		metricas["registros"] = len(resultado) if hasattr(resultado, "__len__") else None
+		metricas["memoria_bytes"] = medir_memoria(resultado)
+		if self._compactar:
+			t1 = time.perf_counter()
+			resultado = compactar_fonte(resultado)
+			metricas["compactacao_seconds"] = round(time.perf_counter() - t1, 3)
+			metricas["memoria_bytes_compacta"] = medir_memoria(resultado)
+		self._metricas[nome] = metricas
+		self._resultados[nome] = resultado
+		return resultado
+
+	def metricas(self) -> dict:
+		return dict(self._metricas)
+
+	def encerrar(self) -> None:
+		self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def agendar_base_totvs(fontes: CarregadorFontes, base_totvs: str, leitor_paralelo: bool = False) -> None:
+	"""Agenda a base TOTVS em `fontes` (arquivo único ou fragmentos combinados em uma base).
+
+	Com `leitor_paralelo`, o parse de cada arquivo também é dividido entre
+	processos (os núcleos são repartidos entre os fragmentos).
+	"""
+	fragmentos = resolver_fragmentos_totvs(base_totvs)
+	processos_por_arquivo = max(1, (os.cpu_count() or 1) // len(fragmentos))
+	if len(fragmentos) == 1:
+		fontes.agendar("base_totvs", carregar_base_totvs, str(fragmentos[0]), leitor_paralelo, processos_por_arquivo)
+	else:
+		fontes.agendar_fragmentos(
+			"base_totvs",
+			carregar_base_totvs,
+			argumentos=[(str(f), leitor_paralelo, processos_por_arquivo) for f in fragmentos],
+			rotulos=[str(f) for f in fragmentos],
+			combinar=combinar_fragmentos_totvs,
+		)
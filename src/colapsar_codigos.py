@@ -0,0 +1,98 @@
+"""Colapso de códigos repetidos: cada código distinto é enriquecido uma única vez.
+
+As listas de códigos costumam repetir o mesmo item (uma linha por planta
+solicitante) e `gerar_planilha_com_codigos` mantém todas as repetições. Antes
+das etapas de enriquecimento, `colapsar_planilha` regrava a planilha de
+trabalho com uma linha por código distinto (primeira ocorrência, na ordem
+original) e guarda, para cada linha original, a linha do seu código. Ao final,
+`expandir_planilha` devolve os resultados a todas as linhas originais, na ordem
+original, com o código de cada linha exatamente como estava.
+
+Os códigos são comparados pela mesma chave do join com a base TOTVS
+(`chave_codigo`: o valor lido da planilha, com o tipo). Todas as etapas dão o
+mesmo resultado para linhas com a mesma chave, então a planilha expandida é
+idêntica à do pipeline sem colapso.
+"""
+
+from pathlib import Path
+
+from planilha_trabalho import gravar_planilha, ler_planilha
+from tabela_enriquecimento import chave_codigo
+
+# Planilha gerada: df index 0 = linha descritiva; itens a partir do índice 1
+PRIMEIRA_LINHA_ITENS_DF = 1
+
+
+def colapsar_planilha(caminho_planilha: str | Path) -> dict:
+	"""Regrava a planilha com um item por código distinto; retorna o mapeamento para `expandir_planilha`.
+
+	O resultado traz `linhas`, `codigos_distintos`, `codigos` (valores
+	originais da primeira coluna), `posicoes` (linha distinta de cada linha
+	original) e `pesos` (linhas originais de cada código distinto, para as
+	contagens do relatório). Sem códigos repetidos a planilha não é regravada.
+	"""
+	df = ler_planilha(caminho_planilha)
+	codigos = df.iloc[PRIMEIRA_LINHA_ITENS_DF:, 0].tolist()
+
+	distintos: dict[str, int] = {}
+	primeiras: list[int] = []
+	posicoes: list[int] = []
+	pesos: list[int] = []
+	for deslocamento, codigo in enumerate(codigos):
+		chave = chave_codigo(codigo)
+		if chave not in distintos:
+			distintos[chave] = len(primeiras)
+			primeiras.append(PRIMEIRA_LINHA_ITENS_DF + deslocamento)
+			pesos.append(0)
+		posicoes.append(distintos[chave])
+		pesos[distintos[chave]] += 1
+
+	colapso = {
+		"linhas": len(codigos),
+		"codigos_distintos": len(primeiras),
+		"codigos": codigos,
+		"posicoes": posicoes,
+		"pesos": pesos,
+	}
+	if len(primeiras) < len(codigos):
+		gravar_planilha(df.iloc[[*range(PRIMEIRA_LINHA_ITENS_DF), *primeiras]], caminho_planilha)
+	print(f"Códigos: {colapso['linhas']} linhas, {colapso['codigos_distintos']} distintos")
+	return colapso
+
+
+def expandir_planilha(caminho_planilha: str | Path, colapso: dict) -> None:
+	"""Devolve cada linha enriquecida a todas as posições originais do seu código (na ordem original)."""
+	if colapso["codigos_distintos"] == colapso["linhas"]:
+		return
+	df = ler_planilha(caminho_planilha)
+	if len(df) - PRIMEIRA_LINHA_ITENS_DF != colapso["codigos_distintos"]:
+		raise ValueError(
+			f"A planilha colapsada tem {len(df) - PRIMEIRA_LINHA_ITENS_DF} itens; "
+			f"esperados {colapso['codigos_distintos']} códigos distintos."
+		)
+	linhas = [*range(PRIMEIRA_LINHA_ITENS_DF), *(PRIMEIRA_LINHA_ITENS_DF + p for p in colapso["posicoes"])]
+	expandida = df.iloc[linhas].reset_index(drop=True)
+	coluna_codigo = expandida.columns[0]
+	expandida[coluna_codigo] = expandida[coluna_codigo].astype(object)
+	expandida.loc[PRIMEIRA_LINHA_ITENS_DF:, coluna_codigo] = colapso["codigos"]
+	gravar_planilha(expandida, caminho_planilha)
+	print(f"Resultados expandidos para {colapso['linhas']} linhas")
+
+
+def resumo_colapso(colapso: dict, segundos_etapas: float) -> dict:
+	"""Razão de deduplicação e trabalho poupado, para o relatório de execução.
+
+	`segundos_etapas`: duração das etapas que rodaram sobre os códigos
+	distintos; o tempo poupado é estimado proporcionalmente às linhas repetidas.
+	"""
+	linhas = colapso["linhas"]
+	distintos = colapso["codigos_distintos"]
+	repetidas = linhas - distintos
+	return {
+		"linhas": linhas,
+		"codigos_distintos": distintos,
+		"linhas_repetidas": repetidas,
+		"razao_dedup": round(linhas / distintos, 3) if distintos else 1.0,
+		"segundos_etapas": round(segundos_etapas, 3),
+		"segundos_poupados_estimados": round(segundos_etapas * repetidas / distintos, 3) if distintos else 0.0,
+	}
@@ -0,0 +1,222 @@
+"""Harness diferencial (corretude + velocidade) para os matchers por narrativa.
+
+Roda a implementação de referência congelada (src/matchers_referencia.py) e um
+matcher candidato sobre o mesmo corpus — narrativas reais de SAP123 mais
+variantes geradas — e reporta, linha a linha, toda resposta divergente, além
+dos percentis de latência de cada um e do speedup.
+
+Uso (a partir da raiz do projeto):
+
+    python src/comparar_matchers.py --matcher size_dimension \\
+        --candidato meu_modulo:encontrar_size_dimension_rapido \\
+        --preparar meu_modulo:construir_indice
+
+Sem `--candidato`, compara a função em produção com a referência.
+Sai com código 1 se houver qualquer divergência.
+"""
+
+import argparse
+import importlib
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from inserir_colunas_totvs import resolver_colunas_totvs
+from inserir_material import carregar_dicionario, encontrar_material
+from inserir_normas import carregar_dicionario_normas, encontrar_normas
+from inserir_size_dimension import carregar_dicionario_size_dimension, encontrar_size_dimension
+from inserir_traducoes import carregar_termos_traducao, encontrar_traducao
+from matchers_referencia import (
+	referencia_encontrar_material,
+	referencia_encontrar_normas,
+	referencia_encontrar_size_dimension,
+	referencia_encontrar_traducao,
+)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# matcher -> (referência, função em produção, carregador do dicionário, dicionário padrão)
+MATCHERS = {
+	"material": (
+		referencia_encontrar_material,
+		encontrar_material,
+		carregar_dicionario,
+		BASE_DIR / "dados/dicionario_materiais.csv",
+	),
+	"normas": (
+		referencia_encontrar_normas,
+		encontrar_normas,
+		carregar_dicionario_normas,
+		BASE_DIR / "dados/dicionario_normas.csv",
+	),
+	"size_dimension": (
+		referencia_encontrar_size_dimension,
+		encontrar_size_dimension,
+		carregar_dicionario_size_dimension,
+		BASE_DIR / "dados/dicionario_size_dimension.csv",
+	),
+	"traducao": (
+		referencia_encontrar_traducao,
+		encontrar_traducao,
+		lambda caminho: carregar_termos_traducao(pd.read_excel(caminho)),
+		BASE_DIR / "dados/dicionario.xlsx",
+	),
+}
+
+
+def importar_funcao(especificacao: str):
+	"""Importa `modulo:funcao` (módulos de src/ ou qualquer módulo no sys.path)."""
+	modulo, _, nome = especificacao.partition(":")
+	if not nome:
+		raise ValueError(f"Especificação inválida (use modulo:funcao): {especificacao}")
+	return getattr(importlib.import_module(modulo), nome)
+
+
+def carregar_narrativas(caminho_planilha: str | None, caminho_base_totvs: str | None) -> list[str]:
+	"""Narrativas reais: SAP123 da planilha atualizada e/ou a coluna de narrativa da base TOTVS."""
+	narrativas: list[str] = []
+	if caminho_planilha:
+		df = pd.read_excel(caminho_planilha)
+		if "SAP123" in df.columns:
+			narrativas.extend(v for v in df.loc[1:, "SAP123"] if isinstance(v, str))
+	if caminho_base_totvs:
+		df = pd.read_excel(caminho_base_totvs, header=4)
+		col = resolver_colunas_totvs(df, {"SAP123": {"descricao": "narrativa", "contem": ("narrativa",)}})["SAP123"]
+		narrativas.extend(v for v in df[col] if isinstance(v, str))
+	return list(dict.fromkeys(narrativas))
+
+
+# Variações de formatação que aparecem em narrativas digitadas à mão
+VARIACOES = (
+	lambda t, rnd: t.lower(),
+	lambda t, rnd: t.title(),
+	lambda t, rnd: re.sub(r"\s+", "  ", t),
+	lambda t, rnd: re.sub(r"[,;:]", " ", t),
+	lambda t, rnd: t.replace(",", "."),
+	lambda t, rnd: t[: max(1, len(t) // 2)],
+	lambda t, rnd: " ".join(rnd.sample(t.split(), len(t.split()))),
+	lambda t, rnd: f"REF {rnd.randint(100, 999)} " + t,
+)
+CASOS_BORDA = [None, "", "   ", float("nan"), "X", "-"]
+
+
+def gerar_corpus(narrativas: list[str], variantes_por_narrativa: int, semente: int) -> list[object]:
+	rnd = random.Random(semente)
+	corpus: list[object] = list(CASOS_BORDA) + list(narrativas)
+	for narrativa in narrativas:
+		for variacao in rnd.sample(VARIACOES, min(variantes_por_narrativa, len(VARIACOES))):
+			corpus.append(variacao(narrativa, rnd))
+	return corpus
+
+
+def _percentis(amostras_ns: list[int]) -> dict:
+	ordenadas = sorted(amostras_ns)
+	n = len(ordenadas)
+
+	def p(q: float) -> float:
+		return round(ordenadas[min(n - 1, int(q * (n - 1) + 0.5))] / 1e6, 4) if n else 0.0
+
+	return {
+		"p50_ms": p(0.50),
+		"p90_ms": p(0.90),
+		"p99_ms": p(0.99),
+		"max_ms": p(1.0),
+		"total_ms": round(sum(ordenadas) / 1e6, 2),
+	}
+
+
+def _iguais(a, b) -> bool:
+	# NaN (células vazias do dicionário de traduções) conta como igual a NaN
+	if isinstance(a, dict) and isinstance(b, dict):
+		return a.keys() == b.keys() and all(_iguais(a[k], b[k]) for k in a)
+	if isinstance(a, float) and isinstance(b, float) and a != a and b != b:
+		return True
+	return a == b
+
+
+def comparar(matcher: str, referencia, candidato, dicionario, dicionario_candidato, corpus: list[object]) -> dict:
+	"""Executa referência e candidato em cada entrada; retorna divergências e latências."""
+	divergencias: list[dict] = []
+	tempos_ref: list[int] = []
+	tempos_cand: list[int] = []
+
+	for indice, entrada in enumerate(corpus):
+		# o matcher de tradução recebe a lista de textos candidatos
+		argumento = [entrada] if matcher == "traducao" else entrada
+
+		t0 = time.perf_counter_ns()
+		esperado = referencia(argumento, dicionario)
+		t1 = time.perf_counter_ns()
+		obtido = candidato(argumento, dicionario_candidato)
+		t2 = time.perf_counter_ns()
+		tempos_ref.append(t1 - t0)
+		tempos_cand.append(t2 - t1)
+
+		if not _iguais(esperado, obtido):
+			divergencias.append({
+				"indice": indice,
+				"entrada": entrada if isinstance(entrada, str) else repr(entrada),
+				"referencia": esperado,
+				"candidato": obtido,
+			})
+
+	latencia_ref = _percentis(tempos_ref)
+	latencia_cand = _percentis(tempos_cand)
+	return {
+		"matcher": matcher,
+		"entradas": len(corpus),
+		"divergencias": len(divergencias),
+		"latencia_referencia": latencia_ref,
+		"latencia_candidato": latencia_cand,
+		"speedup_total": round(sum(tempos_ref) / max(sum(tempos_cand), 1), 2),
+		"speedup_p50": round(latencia_ref["p50_ms"] / latencia_cand["p50_ms"], 2) if latencia_cand["p50_ms"] else None,
+		"detalhes_divergencias": divergencias,
+	}
+
+
+def main(argv: list[str] | None = None) -> int:
+	parser = argparse.ArgumentParser(description="Compara um matcher candidato com a implementação de referência.")
+	parser.add_argument("--matcher", choices=sorted(MATCHERS), required=True)
+	parser.add_argument("--candidato", help="modulo:funcao do candidato (padrão: função em produção).")
+	parser.add_argument(
+		"--preparar",
+		help="modulo:funcao que recebe o dicionário carregado e devolve a estrutura usada pelo candidato.",
+	)
+	parser.add_argument("--dicionario", help="Caminho do dicionário (padrão: o mesmo do pipeline).")
+	parser.add_argument("--planilha", default=str(BASE_DIR / "planilhas/planilha_atualizada.xlsx"))
+	parser.add_argument("--base-totvs", default=None, help="Também usa as narrativas da base TOTVS.")
+	parser.add_argument("--variantes", type=int, default=3, help="Variantes geradas por narrativa (padrão: 3).")
+	parser.add_argument("--semente", type=int, default=42)
+	parser.add_argument("--mostrar", type=int, default=20, help="Divergências impressas no console (padrão: 20).")
+	parser.add_argument("--saida", help="Grava o resultado completo (JSON) neste arquivo.")
+	args = parser.parse_args(argv)
+
+	referencia, em_producao, carregar, dicionario_padrao = MATCHERS[args.matcher]
+	candidato = importar_funcao(args.candidato) if args.candidato else em_producao
+	dicionario = carregar(str(args.dicionario or dicionario_padrao))
+	dicionario_candidato = importar_funcao(args.preparar)(dicionario) if args.preparar else dicionario
+
+	narrativas = carregar_narrativas(args.planilha, args.base_totvs)
+	corpus = gerar_corpus(narrativas, args.variantes, args.semente)
+	print(f"Corpus: {len(narrativas)} narrativas reais, {len(corpus)} entradas no total")
+
+	resultado = comparar(args.matcher, referencia, candidato, dicionario, dicionario_candidato, corpus)
+
+	for d in resultado["detalhes_divergencias"][: args.mostrar]:
+		print(f"#{d['indice']}: {d['entrada']!r}\n    referência={d['referencia']!r}\n    candidato ={d['candidato']!r}")
+	resumo = {k: v for k, v in resultado.items() if k != "detalhes_divergencias"}
+	print(json.dumps(resumo, ensure_ascii=False, indent=2))
+
+	if args.saida:
+		Path(args.saida).write_text(json.dumps(resultado, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+
+	return 1 if resultado["divergencias"] else 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,71 @@
+"""Contadores dos caminhos internos dos matchers por narrativa.
+
+Cada matcher recebe opcionalmente um `ContadoresMatcher` e, ao retornar,
+registra por qual caminho saiu (substring, fuzzy aceito/rejeitado, variante,
+...) e o tempo gasto na chamada. Também mantém as N narrativas mais lentas,
+para que uma execução lenta possa ser reproduzida isoladamente. O resumo vai
+para as métricas da etapa no relatório de execução.
+"""
+
+import heapq
+import time
+
+# Narrativas mais lentas guardadas por matcher
+TOP_N_PADRAO = 10
+# Narrativas guardadas são truncadas (o relatório não deve crescer com o texto)
+MAX_CARACTERES_NARRATIVA = 300
+
+
+class ContadoresMatcher:
+	"""Chamadas e tempo por caminho, contadores avulsos e top-N entradas mais lentas."""
+
+	def __init__(self, matcher: str, top_n: int = TOP_N_PADRAO):
+		self.matcher = matcher
+		self.top_n = top_n
+		self.caminhos: dict[str, dict] = {}
+		self.contadores: dict[str, int] = {}
+		self._mais_lentas: list[tuple[float, int, str, str]] = []
+		self._sequencia = 0
+
+	@staticmethod
+	def iniciar() -> float:
+		"""Marca o início de uma chamada (passar o valor para `registrar`)."""
+		return time.perf_counter()
+
+	def registrar(self, caminho: str, inicio: float, entrada: object) -> None:
+		"""Contabiliza uma chamada encerrada pelo `caminho`, iniciada em `inicio`."""
+		segundos = time.perf_counter() - inicio
+		estatisticas = self.caminhos.setdefault(caminho, {"chamadas": 0, "segundos": 0.0, "max_ms": 0.0})
+		estatisticas["chamadas"] += 1
+		estatisticas["segundos"] += segundos
+		estatisticas["max_ms"] = max(estatisticas["max_ms"], segundos * 1000)
+
+		self._sequencia += 1
+		item = (segundos, self._sequencia, caminho, str(entrada)[:MAX_CARACTERES_NARRATIVA])
+		if len(self._mais_lentas) < self.top_n:
+			heapq.heappush(self._mais_lentas, item)
+		elif segundos > self._mais_lentas[0][0]:
+			heapq.heapreplace(self._mais_lentas, item)
+
+	def incrementar(self, contador: str, n: int = 1) -> None:
+		self.contadores[contador] = self.contadores.get(contador, 0) + n
+
+	def resumo(self) -> dict:
+		return {
+			"chamadas": sum(c["chamadas"] for c in self.caminhos.values()),
+			"segundos": round(sum(c["segundos"] for c in self.caminhos.values()), 4),
+			"caminhos": {
+				nome: {
+					"chamadas": c["chamadas"],
+					"segundos": round(c["segundos"], 4),
+					"media_ms": round(c["segundos"] * 1000 / c["chamadas"], 4),
+					"max_ms": round(c["max_ms"], 4),
+				}
+				for nome, c in sorted(self.caminhos.items())
+			},
+			"contadores": dict(sorted(self.contadores.items())),
+			"mais_lentas": [
+				{"narrativa": entrada, "caminho": caminho, "ms": round(segundos * 1000, 4)}
+				for segundos, _, caminho, entrada in sorted(self._mais_lentas, reverse=True)
+			],
+		}
@@ -0,0 +1,396 @@
+"""Estruturas dos matchers em um arquivo plano, mapeado em memória por vários processos.
+
+Com vários workers de enriquecimento na mesma máquina, cada um carregaria sua
+própria cópia dos dicionários (materiais, normas, size dimension e traduções)
+e dos índices construídos sobre eles. Aqui um processo pai grava tudo uma vez
+em um arquivo binário plano; os workers o abrem com `mmap` somente leitura.
+As páginas ficam no cache do sistema operacional e são compartilhadas: a
+memória não cresce com o número de workers e anexar custa só ler o cabeçalho.
+
+Layout: `MAGICO`, tamanho do cabeçalho (uint64), cabeçalho JSON (seção ->
+offset, dtype, quantidade) e as seções, alinhadas em 8 bytes. Cada lista de
+textos vira `offsets` (int64, n + 1) + `blob` (UTF-8). A busca por substring
+usa um hash polinomial (mod 2^64) das chaves em UTF-8, guardado ordenado:
+para cada comprimento de chave, os hashes de todas as fatias do texto são
+calculados de uma vez com numpy e procurados por `searchsorted`; os acertos
+são conferidos byte a byte. Como UTF-8 é auto-sincronizante, "substring em
+bytes" equivale a "substring em caracteres".
+
+Os matchers `encontrar_*_compartilhado` dão as mesmas respostas dos matchers
+em processo (inclusive desempates e o "material nao informado").
+
+O arquivo traz também as listas de nomes canônicos e a tradução PT -> EN de
+cada nome já resolvida (`NomesCanonicos.pares_en`): o worker reconstrói as
+árvores de nomes a partir delas, sem ler as listas nem o dicionário de
+traduções (`nomes_canonicos`).
+
+Uso (a partir da raiz do projeto):
+
+    python src/estruturas_compartilhadas.py --saida cache/estruturas_matchers.bin
+"""
+
+import argparse
+import json
+import math
+import mmap
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from thefuzz import fuzz, process
+
+from analisar_dimensoes import MAX_TOKENS_EXPRESSAO, NAO_INFORMADO, chave_canonica, expressoes_canonicas
+from carregar_fontes import TermosCompactos
+from normalizar_nomes import NomesCanonicos
+
+# Versão do layout/conteúdo no próprio mágico: arquivos antigos são recusados e precisam ser regerados
+MAGICO = b"ENRQMAP3"
+# Primo do FNV-64 (ímpar, logo invertível mod 2^64)
+_BASE_HASH = 0x100000001B3
+_BASE_HASH_INV = pow(_BASE_HASH, -1, 2**64)
+MATERIAIS_BLOQUEADOS = {"MOTOR", "SPECIAL"}
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+ESTRUTURAS_PADRAO = BASE_DIR / "cache/estruturas_matchers.bin"
+
+# Potências da base (e da inversa) mod 2^64, ampliadas sob demanda em cada processo
+_potencias = np.ones(1, dtype=np.uint64)
+_potencias_inv = np.ones(1, dtype=np.uint64)
+
+
+def _garantir_potencias(n: int) -> None:
+	global _potencias, _potencias_inv
+	if len(_potencias) > n:
+		return
+	tamanho = max(n + 1, 2 * len(_potencias))
+	um = np.ones(1, dtype=np.uint64)
+	with np.errstate(over="ignore"):
+		_potencias = np.concatenate([um, np.cumprod(np.full(tamanho - 1, _BASE_HASH, dtype=np.uint64), dtype=np.uint64)])
+		_potencias_inv = np.concatenate(
+			[um, np.cumprod(np.full(tamanho - 1, _BASE_HASH_INV, dtype=np.uint64), dtype=np.uint64)],
+		)
+
+
+def _prefixos(dados: np.ndarray) -> np.ndarray:
+	"""prefixo[j] = soma(dados[k] * B^k, k < j) mod 2^64."""
+	_garantir_potencias(len(dados))
+	prefixo = np.zeros(len(dados) + 1, dtype=np.uint64)
+	with np.errstate(over="ignore"):
+		np.cumsum(dados.astype(np.uint64) * _potencias[: len(dados)], out=prefixo[1:])
+	return prefixo
+
+
+def _hashes_fatias(prefixo: np.ndarray, inicios: np.ndarray, comprimentos: np.ndarray) -> np.ndarray:
+	"""Hash de dados[i:i + c] = (prefixo[i + c] - prefixo[i]) * B^-i (igual para qualquer posição)."""
+	with np.errstate(over="ignore"):
+		return (prefixo[inicios + comprimentos] - prefixo[inicios]) * _potencias_inv[inicios]
+
+
+def _hash_chaves(chaves: list[bytes]) -> np.ndarray:
+	blob = np.frombuffer(b"".join(chaves), dtype=np.uint8)
+	comprimentos = np.array([len(c) for c in chaves], dtype=np.int64)
+	inicios = np.concatenate([[0], np.cumsum(comprimentos)[:-1]]).astype(np.int64)
+	return _hashes_fatias(_prefixos(blob), inicios, comprimentos)
+
+
+def _secao_textos(textos: list[str]) -> tuple[np.ndarray, np.ndarray]:
+	codificados = [t.encode("utf-8") for t in textos]
+	offsets = np.zeros(len(codificados) + 1, dtype=np.int64)
+	np.cumsum([len(c) for c in codificados], out=offsets[1:])
+	return offsets, np.frombuffer(b"".join(codificados), dtype=np.uint8)
+
+
+def _secoes_busca(prefixo: str, chaves: list[bytes], ids: list[int]) -> dict[str, np.ndarray]:
+	"""Tabela hash ordenada: chave (bytes) -> id da entrada, com os bytes para conferência."""
+	hashes = _hash_chaves(chaves) if chaves else np.zeros(0, dtype=np.uint64)
+	ordem = np.argsort(hashes, kind="stable")
+	offsets, blob = _secao_textos([c.decode("utf-8") for c in chaves])
+	return {
+		f"{prefixo}.hashes": hashes[ordem],
+		f"{prefixo}.ids": np.asarray(ids, dtype=np.int64)[ordem],
+		f"{prefixo}.chave_offsets": offsets[:-1][ordem],
+		f"{prefixo}.chave_comprimentos": np.diff(offsets)[ordem],
+		f"{prefixo}.chave_blob": blob,
+		f"{prefixo}.comprimentos": np.array(sorted({len(c) for c in chaves}), dtype=np.int64),
+	}
+
+
+def _secoes_dicionario(prefixo: str, termos) -> dict[str, np.ndarray]:
+	"""Entradas na ordem de iteração (a mesma que o matcher original percorre) + busca por maiúsculas."""
+	entradas = list(termos)
+	offsets, blob = _secao_textos(entradas)
+	secoes = {
+		f"{prefixo}.offsets": offsets,
+		f"{prefixo}.blob": blob,
+		f"{prefixo}.caracteres": np.array([len(e) for e in entradas], dtype=np.int64),
+	}
+	secoes.update(_secoes_busca(f"{prefixo}.busca", [e.upper().encode("utf-8") for e in entradas], list(range(len(entradas)))))
+	return secoes
+
+
+def construir_estruturas(
+	caminho: str | Path, materiais, normas, size_dimensions, termos_traducao, nomes: NomesCanonicos,
+) -> dict:
+	"""Grava o arquivo plano com os quatro matchers e os nomes canônicos; retorna um resumo (tamanho, entradas, tempo)."""
+	t0 = time.perf_counter()
+	secoes: dict[str, np.ndarray] = {}
+
+	secoes.update(_secoes_dicionario("material", materiais))
+	entradas_material = list(materiais)
+	secoes["material.bloqueado"] = np.array(
+		[e.upper() in MATERIAIS_BLOQUEADOS for e in entradas_material], dtype=np.uint8,
+	)
+	secoes.update(_secoes_dicionario("normas", normas))
+
+	entradas_size = list(size_dimensions)
+	secoes.update(_secoes_dicionario("size_dimension", entradas_size))
+	canonicas = [(chave_canonica(e), i) for i, e in enumerate(entradas_size)]
+	canonicas = [(c, i) for c, i in canonicas if c]
+	secoes.update(_secoes_busca(
+		"size_dimension.canonica", [c.encode("utf-8") for c, _ in canonicas], [i for _, i in canonicas],
+	))
+
+	# traduções: só termos com mais de 5 caracteres participam (regra de encontrar_traducao)
+	termos = [(i, pt, tr) for i, (pt, tr) in enumerate(termos_traducao) if len(pt) > 5]
+	offsets, blob = _secao_textos([json.dumps(tr, ensure_ascii=False, default=str) for _, _, tr in termos])
+	secoes["traducao.offsets"] = offsets
+	secoes["traducao.blob"] = blob
+	secoes.update(_secoes_busca("traducao.busca", [pt.encode("utf-8") for _, pt, _ in termos], list(range(len(termos)))))
+
+	# nomes canônicos: listas como lidas e pares PT/EN intercalados
+	pares_en = nomes.pares_en()
+	for prefixo, textos in (
+		("nomes_pt", nomes.nomes_pt),
+		("nomes_en", nomes.nomes_en),
+		("nomes_en_por_pt", [texto for par in pares_en.items() for texto in par]),
+	):
+		secoes[f"{prefixo}.offsets"], secoes[f"{prefixo}.blob"] = _secao_textos(textos)
+
+	max_tokens = max((len(e.split()) for e in entradas_size if chave_canonica(e)), default=0)
+	cabecalho = {
+		"meta": {
+			"entradas": {
+				"material": len(entradas_material),
+				"normas": int(len(secoes["normas.caracteres"])),
+				"size_dimension": len(entradas_size),
+				"traducao": len(termos),
+				"nomes_pt": len(nomes.nomes_pt),
+				"nomes_en": len(nomes.nomes_en),
+				"nomes_en_por_pt": len(pares_en),
+			},
+			"max_tokens": min(max_tokens, MAX_TOKENS_EXPRESSAO),
+		},
+		"secoes": {},
+	}
+	posicao = 0
+	for nome, arr in secoes.items():
+		cabecalho["secoes"][nome] = [posicao, arr.dtype.str, int(arr.size)]
+		posicao += math.ceil(arr.nbytes / 8) * 8
+
+	cabecalho_bytes = json.dumps(cabecalho).encode("utf-8")
+	inicio_dados = math.ceil((len(MAGICO) + 8 + len(cabecalho_bytes)) / 8) * 8
+	destino = Path(caminho)
+	destino.parent.mkdir(parents=True, exist_ok=True)
+	temporario = destino.with_suffix(destino.suffix + ".tmp")
+	with open(temporario, "wb") as arquivo:
+		arquivo.write(MAGICO)
+		arquivo.write(np.uint64(len(cabecalho_bytes)).tobytes())
+		arquivo.write(cabecalho_bytes)
+		arquivo.write(b"\0" * (inicio_dados - arquivo.tell()))
+		for arr in secoes.values():
+			dados = arr.tobytes()
+			arquivo.write(dados)
+			arquivo.write(b"\0" * (math.ceil(len(dados) / 8) * 8 - len(dados)))
+	# troca atômica: workers já anexados continuam com o arquivo antigo
+	temporario.replace(destino)
+
+	return {
+		"arquivo": str(destino),
+		"bytes": destino.stat().st_size,
+		"entradas": cabecalho["meta"]["entradas"],
+		"duracao_seconds": round(time.perf_counter() - t0, 3),
+	}
+
+
+class EstruturasCompartilhadas:
+	"""Visão somente leitura (numpy sobre `mmap`) do arquivo gravado por `construir_estruturas`."""
+
+	def __init__(self, caminho: str | Path = ESTRUTURAS_PADRAO):
+		self.caminho = Path(caminho)
+		with open(self.caminho, "rb") as arquivo:
+			self._mmap = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+		if self._mmap[: len(MAGICO)] != MAGICO:
+			raise ValueError(f"Arquivo de estruturas inválido ou de versão anterior (regere com {Path(__file__).name}): {self.caminho}")
+		tamanho = int(np.frombuffer(self._mmap, dtype=np.uint64, count=1, offset=len(MAGICO))[0])
+		cabecalho = json.loads(self._mmap[len(MAGICO) + 8 : len(MAGICO) + 8 + tamanho])
+		inicio_dados = math.ceil((len(MAGICO) + 8 + tamanho) / 8) * 8
+		self.meta = cabecalho["meta"]
+		self._secoes = {
+			nome: np.frombuffer(self._mmap, dtype=np.dtype(dtype), count=quantidade, offset=inicio_dados + offset)
+			for nome, (offset, dtype, quantidade) in cabecalho["secoes"].items()
+		}
+
+	def secao(self, nome: str) -> np.ndarray:
+		return self._secoes[nome]
+
+	def texto(self, prefixo: str, indice: int) -> str:
+		offsets = self._secoes[f"{prefixo}.offsets"]
+		return self._secoes[f"{prefixo}.blob"][int(offsets[indice]) : int(offsets[indice + 1])].tobytes().decode("utf-8")
+
+	def textos(self, prefixo: str) -> TermosCompactos:
+		"""Todas as entradas de `prefixo`, como sequência sobre as próprias seções mapeadas.
+
+		Nada é copiado: cada entrada é decodificada ao ser lida (ex.: pelo fallback
+		fuzzy de materiais), então a memória do worker não cresce com o dicionário.
+		"""
+		return TermosCompactos.de_secoes(self._secoes[f"{prefixo}.offsets"], self._secoes[f"{prefixo}.blob"])
+
+	def nomes_canonicos(self) -> NomesCanonicos:
+		"""Índices de nomes canônicos reconstruídos das listas gravadas (sem ler as fontes)."""
+		pares = self.textos("nomes_en_por_pt")
+		return NomesCanonicos(self.textos("nomes_pt"), self.textos("nomes_en"), en_por_pt=dict(zip(pares[::2], pares[1::2])))
+
+	def _conferir(self, prefixo: str, hashes: np.ndarray, alvos: list[bytes] | bytes, inicios, comprimentos) -> list[int]:
+		tabela = self._secoes[f"{prefixo}.hashes"]
+		if not len(tabela) or not len(hashes):
+			return []
+		posicoes = np.searchsorted(tabela, hashes)
+		validos = np.nonzero(posicoes < len(tabela))[0]
+		validos = validos[tabela[posicoes[validos]] == hashes[validos]]
+
+		ids = self._secoes[f"{prefixo}.ids"]
+		chave_offsets = self._secoes[f"{prefixo}.chave_offsets"]
+		chave_comprimentos = self._secoes[f"{prefixo}.chave_comprimentos"]
+		blob = self._secoes[f"{prefixo}.chave_blob"]
+		encontrados = []
+		for k in validos.tolist():
+			alvo = alvos[k] if isinstance(alvos, list) else alvos[inicios[k] : inicios[k] + comprimentos[k]]
+			p = int(posicoes[k])
+			# mesmas chaves (ou colisões) ficam vizinhas na tabela ordenada
+			while p < len(tabela) and tabela[p] == hashes[k]:
+				inicio = int(chave_offsets[p])
+				if blob[inicio : inicio + int(chave_comprimentos[p])].tobytes() == alvo:
+					encontrados.append(int(ids[p]))
+				p += 1
+		return encontrados
+
+	def substrings(self, prefixo: str, texto: str) -> list[int]:
+		"""Ids das chaves de `prefixo` que aparecem como substring de `texto`."""
+		dados = texto.encode("utf-8")
+		n = len(dados)
+		comprimentos_chave = self._secoes[f"{prefixo}.comprimentos"]
+		comprimentos_chave = comprimentos_chave[comprimentos_chave <= n]
+		if not n or not len(comprimentos_chave):
+			return []
+		prefixo_hash = _prefixos(np.frombuffer(dados, dtype=np.uint8))
+		inicios = np.concatenate([np.arange(n - c + 1, dtype=np.int64) for c in comprimentos_chave.tolist()])
+		comprimentos = np.repeat(comprimentos_chave, n - comprimentos_chave + 1)
+		hashes = _hashes_fatias(prefixo_hash, inicios, comprimentos)
+		return self._conferir(prefixo, hashes, dados, inicios.tolist(), comprimentos.tolist())
+
+	def consultar(self, prefixo: str, chaves: list[str]) -> list[int]:
+		"""Ids das entradas cuja chave é exatamente uma de `chaves`."""
+		codificadas = [c.encode("utf-8") for c in chaves if c]
+		if not codificadas:
+			return []
+		return self._conferir(prefixo, _hash_chaves(codificadas), codificadas, None, None)
+
+	def fechar(self) -> None:
+		self._secoes.clear()
+		self._mmap.close()
+
+
+def _mais_especifica(estruturas: EstruturasCompartilhadas, prefixo: str, ids: list[int]) -> str | None:
+	# mais longa (em caracteres) primeiro; em empate, a que vem antes na ordem de iteração
+	if not ids:
+		return None
+	caracteres = estruturas.secao(f"{prefixo}.caracteres")
+	melhor = min(ids, key=lambda i: (-int(caracteres[i]), i))
+	return estruturas.texto(prefixo, melhor)
+
+
+def encontrar_material_compartilhado(narrativa, estruturas: EstruturasCompartilhadas):
+	"""Mesmo contrato de `encontrar_material`, sobre as estruturas mapeadas."""
+	if not isinstance(narrativa, str) or not narrativa.strip():
+		return None
+	bloqueado = estruturas.secao("material.bloqueado")
+	ids = [i for i in estruturas.substrings("material.busca", narrativa.upper()) if not bloqueado[i]]
+	if ids:
+		return _mais_especifica(estruturas, "material", ids)
+
+	materiais = estruturas.textos("material")
+	melhor_material, pontuacao = process.extractOne(narrativa, materiais, scorer=fuzz.ratio)
+	if melhor_material and melhor_material.upper() in MATERIAIS_BLOQUEADOS:
+		return "material nao informado"
+	return melhor_material if pontuacao > 80 else None
+
+
+def encontrar_normas_compartilhado(narrativa, estruturas: EstruturasCompartilhadas):
+	"""Mesmo contrato de `encontrar_normas`, sobre as estruturas mapeadas."""
+	if not isinstance(narrativa, str) or not narrativa.strip():
+		return None
+	ids = estruturas.substrings("normas.busca", narrativa.upper())
+	if ids:
+		return _mais_especifica(estruturas, "normas", ids)
+	# o original cai no fuzzy, que sempre devolve um candidato -> "material nao informado"
+	return NAO_INFORMADO if estruturas.meta["entradas"]["normas"] else None
+
+
+def encontrar_size_dimension_compartilhado(narrativa, estruturas: EstruturasCompartilhadas):
+	"""Mesmo contrato de `encontrar_size_dimension_indexado` (com variantes), sobre as estruturas mapeadas."""
+	if not isinstance(narrativa, str) or not narrativa.strip():
+		return None
+	ids = estruturas.substrings("size_dimension.busca", narrativa.upper())
+	if not ids and estruturas.meta["max_tokens"]:
+		chaves = sorted(expressoes_canonicas(narrativa, estruturas.meta["max_tokens"]))
+		ids = estruturas.consultar("size_dimension.canonica", chaves)
+	if ids:
+		return _mais_especifica(estruturas, "size_dimension", ids)
+	return NAO_INFORMADO if estruturas.meta["entradas"]["size_dimension"] else None
+
+
+def encontrar_traducao_compartilhada(textos: list[str], estruturas: EstruturasCompartilhadas) -> dict | None:
+	"""Mesmo contrato de `encontrar_traducao`: primeiro termo (mais longo) no primeiro texto com match."""
+	for texto in textos:
+		texto_lower = re.sub(r"\s+", " ", str(texto).lower())
+		ids = estruturas.substrings("traducao.busca", texto_lower)
+		if ids:
+			return json.loads(estruturas.texto("traducao", min(ids)))
+	return None
+
+
+def main(argv: list[str] | None = None) -> int:
+	from carregar_fontes import carregar_dicionario_traducoes
+	from inserir_material import carregar_dicionario
+	from inserir_normas import carregar_dicionario_normas
+	from inserir_size_dimension import carregar_dicionario_size_dimension
+	from inserir_traducoes import carregar_termos_traducao
+	from normalizar_nomes import carregar_nomes
+
+	parser = argparse.ArgumentParser(description="Grava as estruturas dos matchers para uso compartilhado por workers.")
+	parser.add_argument("--saida", default=str(ESTRUTURAS_PADRAO))
+	parser.add_argument("--materiais", default=str(BASE_DIR / "dados/dicionario_materiais.csv"))
+	parser.add_argument("--normas", default=str(BASE_DIR / "dados/dicionario_normas.csv"))
+	parser.add_argument("--size-dimension", default=str(BASE_DIR / "dados/dicionario_size_dimension.csv"))
+	parser.add_argument("--traducoes", default=str(BASE_DIR / "dados/dicionario.xlsx"))
+	parser.add_argument("--nomes-pt", default=str(BASE_DIR / "dados/dicionario_nome_PT.csv"))
+	parser.add_argument("--nomes-en", default=str(BASE_DIR / "dados/nomedos_materiais_Ingles.csv"))
+	args = parser.parse_args(argv)
+
+	df_traducoes = carregar_dicionario_traducoes(args.traducoes)
+	resumo = construir_estruturas(
+		args.saida,
+		carregar_dicionario(args.materiais),
+		carregar_dicionario_normas(args.normas),
+		carregar_dicionario_size_dimension(args.size_dimension),
+		carregar_termos_traducao(df_traducoes),
+		NomesCanonicos(carregar_nomes(args.nomes_pt), carregar_nomes(args.nomes_en), df_traducoes),
+	)
+	print(json.dumps(resumo, ensure_ascii=False, indent=2))
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
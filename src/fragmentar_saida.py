@@ -0,0 +1,141 @@
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from planilha_trabalho import ler_planilha
+
+# Limite de linhas de uma planilha do Excel
+LIMITE_LINHAS_EXCEL = 1_048_576
+# Cada fragmento repete o cabeçalho (linha 1) e a linha descritiva (linha 2)
+LINHAS_FIXAS = 2
+MAX_ITENS_POR_ARQUIVO = LIMITE_LINHAS_EXCEL - LINHAS_FIXAS
+
+
+def _gravar_fragmento(caminho: str, df: pd.DataFrame) -> str:
+	df.to_excel(caminho, index=False)
+	return caminho
+
+
+def _faixas(linhas: list[int]) -> list[list[int]]:
+	"""Compacta números de linha em faixas contínuas [inicio, fim]."""
+	faixas: list[list[int]] = []
+	for linha in linhas:
+		if faixas and linha == faixas[-1][1] + 1:
+			faixas[-1][1] = linha
+		else:
+			faixas.append([linha, linha])
+	return faixas
+
+
+def _chave_grupo(valor: object) -> str | None:
+	"""Valor do grupo como gravado no manifesto (None para vazio)."""
+	if valor is None or (isinstance(valor, float) and pd.isna(valor)) or str(valor).strip() == "":
+		return None
+	return str(valor).strip()
+
+
+def _nome_grupo(grupo: str | None) -> str:
+	if grupo is None:
+		return "sem_valor"
+	return re.sub(r"[^0-9A-Za-z_-]+", "_", grupo).strip("_") or "sem_valor"
+
+
+def _nomes_arquivo_grupos(grupos: list[str | None]) -> dict[str | None, str]:
+	"""Nome de arquivo de cada grupo; grupos distintos que viram o mesmo nome ganham sufixo (_2, _3...)."""
+	nomes: dict[str | None, str] = {}
+	usados: set[str] = set()
+	for grupo in grupos:
+		base = nome = _nome_grupo(grupo)
+		repeticao = 1
+		while nome in usados:
+			repeticao += 1
+			nome = f"{base}_{repeticao}"
+		usados.add(nome)
+		nomes[grupo] = nome
+	return nomes
+
+
+def fragmentar_planilha(
+	caminho_planilha: str,
+	diretorio_saida: str,
+	linhas_por_arquivo: int = MAX_ITENS_POR_ARQUIVO,
+	agrupar_por: str | None = None,
+	max_workers: int | None = None,
+) -> dict:
+	"""Divide a planilha atualizada em vários arquivos, respeitando o limite de linhas.
+
+	- Cada fragmento mantém o cabeçalho e a linha descritiva (df index 0).
+	- `linhas_por_arquivo`: itens por arquivo (no máximo 1.048.574).
+	- `agrupar_por`: coluna usada para agrupar (ex.: "SAP6"); grupos maiores
+	  que o orçamento são divididos em mais de um arquivo.
+	- Os fragmentos são gravados em paralelo (processos) e um manifesto JSON
+	  lista os arquivos e as linhas de origem (numeração do Excel) de cada um.
+	"""
+	if not 0 < linhas_por_arquivo <= MAX_ITENS_POR_ARQUIVO:
+		raise ValueError(f"linhas_por_arquivo deve estar entre 1 e {MAX_ITENS_POR_ARQUIVO}.")
+
+	print("Fragmentando planilha de saída...")
+	df = ler_planilha(caminho_planilha)
+	linha_descritiva = df.iloc[[0]]
+	itens = df.iloc[1:]
+
+	if agrupar_por is not None:
+		if agrupar_por not in df.columns:
+			raise ValueError(f"Coluna '{agrupar_por}' não encontrada na planilha para agrupar os fragmentos.")
+		# posições de cada grupo; ordem dos grupos = ordem da primeira aparição (mantém a ordem original dos itens)
+		posicoes: dict[str | None, list[int]] = {}
+		for posicao, valor in enumerate(itens[agrupar_por]):
+			posicoes.setdefault(_chave_grupo(valor), []).append(posicao)
+		nomes_arquivo = _nomes_arquivo_grupos(list(posicoes))
+		grupos = [(grupo, nomes_arquivo[grupo], itens.iloc[p]) for grupo, p in posicoes.items()]
+	else:
+		grupos = [(None, None, itens)]
+
+	destino = Path(diretorio_saida)
+	destino.mkdir(parents=True, exist_ok=True)
+	base = Path(caminho_planilha).stem
+	caminho_manifesto = destino / f"{base}_manifesto.json"
+
+	# Remove os fragmentos da execução anterior (listados no manifesto antigo)
+	if caminho_manifesto.exists():
+		anterior = json.loads(caminho_manifesto.read_text(encoding="utf-8"))
+		for fragmento in anterior.get("fragmentos", []):
+			Path(fragmento["arquivo"]).unlink(missing_ok=True)
+
+	tarefas: list[tuple[str, pd.DataFrame]] = []
+	fragmentos: list[dict] = []
+	for grupo, nome_arquivo, df_grupo in grupos:
+		for inicio in range(0, len(df_grupo), linhas_por_arquivo):
+			parte = df_grupo.iloc[inicio:inicio + linhas_por_arquivo]
+			sufixo = f"{agrupar_por}_{nome_arquivo}_" if nome_arquivo is not None else ""
+			arquivo = destino / f"{base}_{sufixo}{len(fragmentos) + 1:03d}.xlsx"
+			tarefas.append((str(arquivo), pd.concat([linha_descritiva, parte])))
+			# df index i -> linha i + 2 no Excel (linha 1 = cabeçalho)
+			linhas_excel = [int(i) + 2 for i in parte.index]
+			fragmentos.append({
+				"arquivo": str(arquivo),
+				"grupo": grupo,
+				"linhas": len(parte),
+				"linhas_origem": _faixas(linhas_excel),
+			})
+
+	with ProcessPoolExecutor(max_workers=max_workers) as executor:
+		list(executor.map(_gravar_fragmento, [c for c, _ in tarefas], [d for _, d in tarefas]))
+
+	manifesto = {
+		"origem": str(caminho_planilha),
+		"gerado_em": datetime.now().astimezone().isoformat(timespec="seconds"),
+		"linhas_por_arquivo": linhas_por_arquivo,
+		"agrupar_por": agrupar_por,
+		"total_itens": int(len(itens)),
+		"fragmentos": fragmentos,
+	}
+	caminho_manifesto.write_text(json.dumps(manifesto, ensure_ascii=False, indent=2), encoding="utf-8")
+	manifesto["manifesto"] = str(caminho_manifesto)
+
+	print(f"Planilha fragmentada em {len(fragmentos)} arquivo(s); manifesto: {caminho_manifesto}")
+	return manifesto
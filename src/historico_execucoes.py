@@ -0,0 +1,153 @@
+"""Histórico de execuções do pipeline e detecção de regressões por etapa.
+
+Cada execução finalizada é anexada (uma linha JSON) ao histórico, com tamanhos
+das entradas, duração e métricas de preenchimento por etapa. A comparação usa a
+mediana de uma janela de execuções anteriores (apenas status "ok") como baseline.
+
+Só entram na comparação de preenchimento as contagens que a etapa declara em
+`metrics["preenchimento"]` (linhas preenchidas de uma coluna); tempos, tamanhos
+e demais números das métricas não são taxas por item e ficam de fora.
+"""
+
+import json
+from pathlib import Path
+from statistics import median
+
+# Etapas mais curtas que isso (ou com menos itens) têm throughput dominado por
+# custo fixo e ruído; não entram na comparação de linhas/s
+DURACAO_MINIMA_THROUGHPUT = 1.0
+ITENS_MINIMOS_THROUGHPUT = 100
+
+
+def resumir_execucao(report: dict) -> dict:
+	"""Extrai do relatório completo apenas o que interessa ao histórico."""
+	itens = int(report.get("entradas", {}).get("itens", 0) or 0)
+	etapas = {}
+	for step in report.get("steps", []):
+		duracao = float(step.get("duration_seconds", 0.0))
+		etapas[step["name"]] = {
+			"status": step.get("status"),
+			"duration_seconds": duracao,
+			"linhas_por_segundo": round(itens / duracao, 3) if itens and duracao > 0 else None,
+			"preenchimento": {
+				k: v for k, v in ((step.get("metrics") or {}).get("preenchimento") or {}).items()
+				if isinstance(v, (int, float)) and not isinstance(v, bool)
+			},
+		}
+	return {
+		"run_started_at": report.get("run_started_at"),
+		"run_finished_at": report.get("run_finished_at"),
+		"status": report.get("status"),
+		"duration_seconds": report.get("duration_seconds"),
+		"entradas": report.get("entradas", {}),
+		"fontes": report.get("fontes", {}),
+		"steps": etapas,
+	}
+
+
+def registrar_execucao(report: dict, caminho_historico: Path) -> None:
+	"""Anexa o resumo da execução ao histórico JSONL (cria o arquivo se preciso)."""
+	caminho_historico.parent.mkdir(parents=True, exist_ok=True)
+	with open(caminho_historico, "a", encoding="utf-8") as arquivo:
+		arquivo.write(json.dumps(resumir_execucao(report), ensure_ascii=False) + "\n")
+
+
+def carregar_historico(caminho_historico: Path) -> list[dict]:
+	if not caminho_historico.exists():
+		return []
+	execucoes = []
+	with open(caminho_historico, "r", encoding="utf-8") as arquivo:
+		for linha in arquivo:
+			if linha.strip():
+				execucoes.append(json.loads(linha))
+	return execucoes
+
+
+def _taxa_preenchimento(execucao: dict, valor: float) -> float | None:
+	# Contagens de preenchimento dependem do tamanho da entrada: compara a taxa por item
+	itens = execucao.get("entradas", {}).get("itens")
+	if not itens:
+		return None
+	return valor / itens
+
+
+def _throughput_comparavel(execucao: dict, etapa: dict, duracao_minima: float, itens_minimos: int) -> bool:
+	itens = execucao.get("entradas", {}).get("itens") or 0
+	return bool(etapa.get("linhas_por_segundo")) and itens >= itens_minimos and etapa.get("duration_seconds", 0.0) >= duracao_minima
+
+
+def comparar_com_baseline(
+	execucoes: list[dict],
+	janela: int = 5,
+	tolerancia: float = 0.2,
+	duracao_minima: float = DURACAO_MINIMA_THROUGHPUT,
+	itens_minimos: int = ITENS_MINIMOS_THROUGHPUT,
+) -> dict:
+	"""Compara a última execução com a mediana das `janela` execuções "ok" anteriores.
+
+	Sinaliza uma etapa quando:
+	- o throughput (linhas/s) cai mais que `tolerancia` (fração) em relação ao baseline;
+	  só etapas com pelo menos `duracao_minima` segundos e `itens_minimos` itens, na
+	  execução atual e nas do baseline;
+	- a taxa de alguma contagem de `preenchimento` (valor/itens) cai mais que `tolerancia`.
+	"""
+	if not execucoes:
+		raise ValueError("Histórico de execuções vazio.")
+
+	atual = execucoes[-1]
+	baseline = [e for e in execucoes[:-1] if e.get("status") == "ok"][-janela:]
+	regressoes: list[dict] = []
+
+	for nome, etapa in atual.get("steps", {}).items():
+		anteriores = [e["steps"][nome] for e in baseline if nome in e.get("steps", {})]
+		if not anteriores:
+			continue
+
+		throughputs = [
+			e["steps"][nome]["linhas_por_segundo"]
+			for e in baseline
+			if nome in e.get("steps", {}) and _throughput_comparavel(e, e["steps"][nome], duracao_minima, itens_minimos)
+		]
+		atual_throughput = etapa.get("linhas_por_segundo")
+		if throughputs and _throughput_comparavel(atual, etapa, duracao_minima, itens_minimos):
+			referencia = median(throughputs)
+			if atual_throughput < referencia * (1 - tolerancia):
+				regressoes.append({
+					"etapa": nome,
+					"tipo": "throughput",
+					"atual": atual_throughput,
+					"baseline": round(referencia, 3),
+					"variacao": round(atual_throughput / referencia - 1, 3),
+				})
+
+		# execuções gravadas antes de `preenchimento` não têm a seção e ficam de fora
+		for metrica, valor in etapa.get("preenchimento", {}).items():
+			taxa_atual = _taxa_preenchimento(atual, valor)
+			taxas = [
+				_taxa_preenchimento(e, e["steps"][nome]["preenchimento"][metrica])
+				for e in baseline
+				if metrica in e.get("steps", {}).get(nome, {}).get("preenchimento", {})
+			]
+			taxas = [t for t in taxas if t is not None]
+			if taxa_atual is None or not taxas:
+				continue
+			referencia = median(taxas)
+			if referencia > 0 and taxa_atual < referencia * (1 - tolerancia):
+				regressoes.append({
+					"etapa": nome,
+					"tipo": "preenchimento",
+					"metrica": metrica,
+					"atual": round(taxa_atual, 4),
+					"baseline": round(referencia, 4),
+					"variacao": round(taxa_atual / referencia - 1, 3),
+				})
+
+	return {
+		"execucao": atual.get("run_started_at"),
+		"execucoes_baseline": len(baseline),
+		"janela": janela,
+		"tolerancia": tolerancia,
+		"duracao_minima_throughput": duracao_minima,
+		"itens_minimos_throughput": itens_minimos,
+		"regressoes": regressoes,
+	}
@@ -1,5 +1,7 @@
 import pandas as pd
 
+from planilha_trabalho import gravar_planilha
+
 def gerar_planilha_com_codigos(
 	caminho_planilha_modelo: str,
 	caminho_csv_codigos: str,
@@ -45,5 +47,5 @@ def gerar_planilha_com_codigos(
 	df_final.columns = headers
 
 	# 5) Salvar a planilha sem duplicar o header como linha de dados
-	df_final.to_excel(caminho_saida, index=False, header=True)
+	gravar_planilha(df_final, caminho_saida)
 
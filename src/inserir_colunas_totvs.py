@@ -0,0 +1,161 @@
+import pandas as pd
+
+from planilha_trabalho import gravar_planilha, ler_planilha
+
+# Colunas da planilha preenchidas diretamente a partir da base TOTVS.
+# Para cada coluna de destino, a coluna de origem é localizada pelo nome:
+# - "exato": nomes aceitos (ignorando maiúsculas/minúsculas e espaços nas pontas);
+# - "contem": fallback por trecho contido no nome (primeira coluna que casar).
+# - "replicar_em": outras colunas da planilha que recebem o mesmo valor.
+# Incluir uma nova coluna aqui não custa leitura nem join adicionais.
+MAPEAMENTO_TOTVS: dict[str, dict] = {
+	"SAP123": {
+		"descricao": "narrativa",
+		"exato": (),
+		"contem": ("narrativa",),
+		"replicar_em": ("narrativa",),
+	},
+	"SAP6": {
+		"descricao": "Fam Coml / product group",
+		"exato": ("fam coml",),
+		"contem": ("product group", "fam"),
+	},
+	"SAP5": {
+		"descricao": "unidade (UN)",
+		"exato": ("un",),
+		"contem": ("unidade",),
+	},
+}
+
+
+def encontrar_coluna_item(df_base_totvs: pd.DataFrame):
+	"""Coluna de código na base TOTVS: "Item", senão algo com "código", senão a primeira."""
+	for c in df_base_totvs.columns:
+		if str(c).strip().lower() == "item":
+			return c
+	possiveis_codigos_base = [
+		c
+		for c in df_base_totvs.columns
+		if "codigo" in str(c).lower() or "código" in str(c).lower()
+	]
+	return possiveis_codigos_base[0] if possiveis_codigos_base else df_base_totvs.columns[0]
+
+
+def resolver_colunas_totvs(df_base_totvs: pd.DataFrame, mapeamento: dict[str, dict] = MAPEAMENTO_TOTVS) -> dict:
+	"""Resolve, para cada coluna de destino, a coluna de origem na base TOTVS."""
+	colunas = {}
+	for destino, regra in mapeamento.items():
+		origem = None
+		for c in df_base_totvs.columns:
+			if str(c).strip().lower() in regra.get("exato", ()):
+				origem = c
+				break
+		if origem is None:
+			for c in df_base_totvs.columns:
+				if any(trecho in str(c).lower() for trecho in regra.get("contem", ())):
+					origem = c
+					break
+		if origem is None:
+			raise ValueError(
+				f"Não foi encontrada nenhuma coluna de '{regra['descricao']}' (destino {destino}) "
+				"na baseDadosTOTVS.xlsx. Verifique o nome das colunas."
+			)
+		colunas[destino] = origem
+	return colunas
+
+
+def indexar_base_totvs(
+	df_base_totvs: pd.DataFrame,
+	mapeamento: dict[str, dict] = MAPEAMENTO_TOTVS,
+) -> tuple[pd.DataFrame, dict]:
+	"""Base TOTVS indexada pelo código (só as colunas de origem) e o mapa destino -> origem.
+
+	Códigos repetidos na base: vale a primeira ocorrência.
+	"""
+	col_item = encontrar_coluna_item(df_base_totvs)
+	colunas = resolver_colunas_totvs(df_base_totvs, mapeamento)
+	origens = list(dict.fromkeys(colunas.values()))
+
+	indice = (
+		df_base_totvs[[col_item, *origens]]
+		.drop_duplicates(subset=[col_item])
+		.set_index(col_item)
+	)
+	return indice, colunas
+
+
+def aplicar_mapeamento_totvs(
+	codigos: pd.Series,
+	df_base_totvs: pd.DataFrame,
+	mapeamento: dict[str, dict] = MAPEAMENTO_TOTVS,
+) -> pd.DataFrame:
+	"""Resolve todas as colunas do mapeamento com um único join código -> base TOTVS.
+
+	Retorna um DataFrame alinhado a `codigos` (mesmo índice), com uma coluna por destino.
+	Códigos repetidos na base: vale a primeira ocorrência.
+	"""
+	indice, colunas = indexar_base_totvs(df_base_totvs, mapeamento)
+	valores = indice.reindex(codigos.to_numpy())
+	return pd.DataFrame(
+		{destino: valores[origem].astype(object).to_numpy() for destino, origem in colunas.items()},
+		index=codigos.index,
+	)
+
+
+def inserir_colunas_totvs(
+	caminho_planilha_atualizada: str,
+	caminho_base_totvs: str,
+	df_base_totvs: pd.DataFrame | None = None,
+	mapeamento: dict[str, dict] = MAPEAMENTO_TOTVS,
+) -> None:
+	"""Preenche as colunas vindas da base TOTVS (SAP123, SAP6, SAP5) em uma única passada.
+
+	- Usa a primeira coluna da planilha atualizada como código e cruza com a coluna "Item" da base TOTVS.
+	- Todas as colunas de `mapeamento` saem do mesmo join (uma leitura, uma indexação).
+	- A base TOTVS pode vir já carregada em `df_base_totvs` (prefetch do pipeline).
+	"""
+	print(f"Inserindo colunas da base TOTVS ({', '.join(mapeamento)})...")
+
+	df_planilha_atualizada = ler_planilha(caminho_planilha_atualizada)
+	if df_base_totvs is None:
+		df_base_totvs = pd.read_excel(caminho_base_totvs, header=4)
+
+	if "SAP123" in mapeamento and "SAP123" not in df_planilha_atualizada.columns:
+		raise ValueError("A coluna 'SAP123' não foi encontrada na planilha atualizada.")
+
+	# Planilha gerada: linha 1 = cabeçalho; primeira linha de dados (índice 0) é descritiva.
+	# Itens começam a partir do índice 1.
+	primeira_linha_dados = 1
+	col_codigo_atualizada = df_planilha_atualizada.columns[0]
+
+	valores = aplicar_mapeamento_totvs(
+		df_planilha_atualizada.loc[primeira_linha_dados:, col_codigo_atualizada],
+		df_base_totvs,
+		mapeamento,
+	)
+
+	total_linhas = int(len(df_planilha_atualizada.index) - primeira_linha_dados)
+	resumo = []
+	for destino, regra in mapeamento.items():
+		alvos = [destino] + [
+			c for c in df_planilha_atualizada.columns
+			if str(c).strip().lower() in regra.get("replicar_em", ())
+		]
+		for col in alvos:
+			# Garante dtype compatível para strings
+			if col in df_planilha_atualizada.columns and df_planilha_atualizada[col].dtype != object:
+				df_planilha_atualizada[col] = df_planilha_atualizada[col].astype("object")
+			df_planilha_atualizada.loc[primeira_linha_dados:, col] = valores[destino]
+
+		# Estatísticas (considera vazio e 'nan' como não preenchido)
+		serie = df_planilha_atualizada.loc[primeira_linha_dados:, destino]
+		serie_txt = serie.astype(str).str.strip().str.lower()
+		preenchidas = int((serie.notna() & (serie_txt != "") & (serie_txt != "nan")).sum())
+		resumo.append(f"{destino}={preenchidas}")
+
+	# Garante que colunas auxiliares não fiquem no arquivo final
+	if "Num_Chars" in df_planilha_atualizada.columns:
+		df_planilha_atualizada = df_planilha_atualizada.drop(columns=["Num_Chars"])
+
+	gravar_planilha(df_planilha_atualizada, caminho_planilha_atualizada)
+	print(f"Colunas TOTVS inseridas ({total_linhas} linhas): {', '.join(resumo)}")
@@ -6,22 +6,28 @@ def carregar_dicionario(caminho_dicionario):
     """
     Carrega o dicionário de materiais a partir de um arquivo de texto.
     :param caminho_dicionario: Caminho para o arquivo de texto contendo os materiais.
-    :return: Um conjunto (set) com os materiais.
+    :return: Uma tupla ordenada com os materiais, sem repetições.
     """
     with open(caminho_dicionario, 'r', encoding='utf-8') as arquivo:
         materiais = {linha.strip() for linha in arquivo if linha.strip()}  # Remove linhas vazias e espaços extras
-    return materiais
+    # Ordem fixa: os desempates dos matchers (mais longo / primeiro encontrado) seguem a
+    # ordem de iteração, que num set dependeria do PYTHONHASHSEED de cada processo
+    return tuple(sorted(materiais))
 
 # Função para encontrar o melhor material correspondente
-def encontrar_material(narrativa, materiais):
+def encontrar_material(narrativa, materiais, contadores=None):
     """
     Encontra o material que melhor corresponde à narrativa.
     :param narrativa: A narrativa a ser comparada.
     :param materiais: O conjunto de materiais disponíveis.
+    :param contadores: (opcional) ContadoresMatcher que registra o caminho e o tempo da chamada.
     :return: O material correspondente ou None se a pontuação for baixa.
     """
+    inicio = contadores.iniciar() if contadores is not None else 0.0
     # Validar se narrativa é string válida
     if not isinstance(narrativa, str) or not narrativa.strip():
+        if contadores is not None:
+            contadores.registrar("entrada_vazia", inicio, narrativa)
         return None
 
     materiais_bloqueados = {"MOTOR", "SPECIAL"}
@@ -34,6 +40,8 @@ def encontrar_material(narrativa, materiais):
     for material in materiais:
         material_upper = material.upper()
         if material_upper in materiais_bloqueados:
+            if contadores is not None and material_upper in narrativa_upper:
+                contadores.incrementar("termos_bloqueados")
             continue
         if material_upper in narrativa_upper:
             materiais_encontrados.append(material)
@@ -41,11 +49,18 @@ def encontrar_material(narrativa, materiais):
     # Se encontrou materiais por substring, retornar o mais longo (mais específico)
     if materiais_encontrados:
         selecionado = max(materiais_encontrados, key=len)
+        if contadores is not None:
+            contadores.registrar("substring", inicio, narrativa)
         return selecionado
     
     # Se não encontrou por substring, usar fuzzy matching
     melhor_material, pontuacao = process.extractOne(narrativa, materiais, scorer=fuzz.ratio)
     if melhor_material and melhor_material.upper() in materiais_bloqueados:
+        if contadores is not None:
+            contadores.incrementar("termos_bloqueados")
+            contadores.registrar("fuzzy_bloqueado", inicio, narrativa)
         return "material nao informado"
+    if contadores is not None:
+        contadores.registrar("fuzzy_aceito" if pontuacao > 80 else "fuzzy_rejeitado", inicio, narrativa)
     return melhor_material if pontuacao > 80 else None  # Retorna o material se a pontuação for maior que 80
 
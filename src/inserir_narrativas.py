@@ -1,36 +1,35 @@
-from openpyxl import load_workbook
 import re
 
+from planilha_trabalho import gravar_planilha, ler_planilha
+
 def inserir_narrativa(
     caminho_planilha_modelo: str,
     caminho_saida: str,
+    progresso=None,
 ) -> None:
     """
     A partir da terceira linha, verifica o tamanho da coluna SAP123
     e, se for maior que 144 caracteres, escreve "see basic data text"
     na coluna Narrativa.
 
-    :param caminho_planilha_modelo: Caminho da planilha de entrada
+    :param caminho_planilha_modelo: Caminho da planilha de entrada (.xlsx ou intermediária .pkl)
     :param caminho_saida: Caminho onde a planilha será salva
+    :param progresso: Telemetria opcional do laço por linha (src/progresso.py)
     """
     print("Atualizando Narrativa por tamanho de SAP123...")
 
-    wb = load_workbook(caminho_planilha_modelo)
-    ws = wb.active
+    # df index 0 = linha descritiva = linha 2 do Excel
+    ws = ler_planilha(caminho_planilha_modelo)
 
     col_sap123 = None
     col_narrativa = None
 
-    for coluna in ws.iter_cols(min_row=1, max_row=1):
-        for celula in coluna:
-            valor = celula.value
-            if valor is None:
-                continue
-            nome = re.sub(r"\s+", "", str(valor)).upper()
-            if nome == "SAP123":
-                col_sap123 = celula.column
-            elif nome == "NARRATIVA":
-                col_narrativa = celula.column
+    for coluna in ws.columns:
+        nome = re.sub(r"\s+", "", str(coluna)).upper()
+        if nome == "SAP123":
+            col_sap123 = coluna
+        elif nome == "NARRATIVA":
+            col_narrativa = coluna
 
     if col_sap123 is None or col_narrativa is None:
         print("Aviso: colunas SAP123 ou Narrativa não encontradas no cabeçalho.")
@@ -38,15 +37,22 @@ def inserir_narrativa(
 
     alteradas = 0
     exemplos = []
-    for linha in range(3, ws.max_row + 1):
-        valor = ws.cell(row=linha, column=col_sap123).value
+    if progresso is not None:
+        progresso.fase("compute", total=max(len(ws) - 1, 0))
+    ws[col_narrativa] = ws[col_narrativa].astype(object)
+    for idx in range(1, len(ws)):
+        if progresso is not None:
+            progresso.avancar()
+        valor = ws.at[idx, col_sap123]
         if isinstance(valor, str) and len(valor) > 141:
-            ws.cell(row=linha, column=col_narrativa).value = "verificar internal comment"
+            ws.at[idx, col_narrativa] = "verificar internal comment"
             alteradas += 1
             if len(exemplos) < 5:
-                exemplos.append(linha)
+                exemplos.append(idx + 2)
 
-    wb.save(caminho_saida)
+    if progresso is not None:
+        progresso.fase("write")
+    gravar_planilha(ws, caminho_saida)
     print(f"Narrativa atualizada por tamanho: {alteradas} linhas")
 
 
@@ -6,22 +6,27 @@ def carregar_dicionario_normas(caminho_dicionario):
     """
     Carrega o dicionário de normas a partir de um arquivo de texto.
     :param caminho_dicionario: Caminho para o arquivo de texto contendo os materiais.
-    :return: Um conjunto (set) com os materiais.
+    :return: Uma tupla ordenada com os normas, sem repetições.
     """
     with open(caminho_dicionario, 'r', encoding='utf-8') as arquivo:
         materiais = {linha.strip() for linha in arquivo if linha.strip()}  # Remove linhas vazias e espaços extras
-    return materiais
+    # Ordem fixa, como em carregar_dicionario (inserir_material.py)
+    return tuple(sorted(materiais))
 
 # Função para encontrar a melhor norma correspondente
-def encontrar_normas(narrativa, normas):
+def encontrar_normas(narrativa, normas, contadores=None):
     """
     Encontra a norma que melhor corresponde à narrativa.
     :param narrativa: A narrativa a ser comparada.
     :param normas: O conjunto de normas disponíveis.
+    :param contadores: (opcional) ContadoresMatcher que registra o caminho e o tempo da chamada.
     :return: O material correspondente ou None se a pontuação for baixa.
     """
+    inicio = contadores.iniciar() if contadores is not None else 0.0
     # Validar se narrativa é string válida
     if not isinstance(narrativa, str) or not narrativa.strip():
+        if contadores is not None:
+            contadores.registrar("entrada_vazia", inicio, narrativa)
         return None
 
     # Converter narrativa para maiúsculas para comparação
@@ -37,12 +42,18 @@ def encontrar_normas(narrativa, normas):
     # Se encontrou normas por substring, retornar o mais longo (mais específico)
     if materiais_encontrados:
         selecionado = max(materiais_encontrados, key=len)
+        if contadores is not None:
+            contadores.registrar("substring", inicio, narrativa)
         return selecionado
     
     # Se não encontrou por substring, usar fuzzy matching
     melhor_material, pontuacao = process.extractOne(narrativa, normas, scorer=fuzz.ratio)
     if melhor_material and melhor_material.upper():
+        if contadores is not None:
+            contadores.registrar("fuzzy_nao_informado", inicio, narrativa)
         return "material nao informado"
+    if contadores is not None:
+        contadores.registrar("fuzzy_aceito" if pontuacao > 80 else "fuzzy_rejeitado", inicio, narrativa)
     return melhor_material if pontuacao > 80 else None  # Retorna o material se a pontuação for maior que 80
 
 
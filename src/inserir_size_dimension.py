@@ -6,11 +6,12 @@ def carregar_dicionario_size_dimension(caminho_dicionario):
     """
     Carrega o dicionário de size dimension a partir de um arquivo de texto.
     :param caminho_dicionario: Caminho para o arquivo de texto contendo os materiais.
-    :return: Um conjunto (set) com os materiais.
+    :return: Uma tupla ordenada com os size dimensions, sem repetições.
     """
     with open(caminho_dicionario, 'r', encoding='utf-8') as arquivo:
         materiais = {linha.strip() for linha in arquivo if linha.strip()}  # Remove linhas vazias e espaços extras
-    return materiais
+    # Ordem fixa, como em carregar_dicionario (inserir_material.py)
+    return tuple(sorted(materiais))
 
     # Função para encontrar a melhor norma correspondente
 def encontrar_size_dimension(narrativa, size_dimension):
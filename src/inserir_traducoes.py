@@ -1,11 +1,138 @@
 import pandas as pd
 import re
 
+from planilha_trabalho import gravar_planilha, ler_planilha
+
+# idioma do dicionário -> coluna de destino na planilha
+COLUNAS_TRADUCAO = {
+    "PORTUGUÊS": "SAP1",
+    "INGLÊS": "SAP2",
+    "ESPANHOL": "SAP3",
+    "ALEMÂO": "Coluna32",
+}
+
+
+def _norm_col_name(value: object) -> str:
+    return re.sub(r"\s+", "", str(value or "")).strip().upper()
+
+
+def _find_col(df: pd.DataFrame, wanted: str) -> str | None:
+    wanted_n = _norm_col_name(wanted)
+    for c in df.columns:
+        c_n = _norm_col_name(c)
+        if c_n == wanted_n:
+            return c
+    # fallback: alguns arquivos vêm com sufixos tipo _X000D_
+    for c in df.columns:
+        c_n = _norm_col_name(c)
+        if c_n.startswith(wanted_n):
+            return c
+    return None
+
+
+def carregar_termos_traducao(df_dicionario: pd.DataFrame) -> list[tuple[str, dict[str, object]]]:
+    """Monta a lista (termo em português normalizado, traduções), do termo mais longo ao mais curto."""
+    # português -> traduções
+    dicionario_traducoes: dict[str, dict[str, object]] = {}
+
+    col_pt = _find_col(df_dicionario, "PORTUGUÊS")
+    col_en = _find_col(df_dicionario, "INGLÊS")
+    col_es = _find_col(df_dicionario, "ESPANHOL")
+    col_de = _find_col(df_dicionario, "ALEMÂO") or _find_col(df_dicionario, "ALEMAO")
+    if col_pt is None:
+        raise ValueError("Coluna 'PORTUGUÊS' não encontrada no dicionário de traduções.")
+
+    for _, row in df_dicionario.iterrows():
+        palavra_pt = str(row[col_pt]).replace("\u00a0", " ").strip().lower()
+        palavra_pt = re.sub(r"\s+", " ", palavra_pt)
+        if not palavra_pt or palavra_pt == "nan":
+            continue
+        if palavra_pt in dicionario_traducoes:
+            continue
+        dicionario_traducoes[palavra_pt] = {
+            "PORTUGUÊS": row.get(col_pt),
+            "INGLÊS": row.get(col_en) if col_en is not None else None,
+            "ESPANHOL": row.get(col_es) if col_es is not None else None,
+            "ALEMÂO": row.get(col_de) if col_de is not None else None,
+        }
+
+    # Ordena por tamanho (mais específico primeiro)
+    return sorted(
+        dicionario_traducoes.items(),
+        key=lambda kv: len(kv[0]),
+        reverse=True,
+    )
+
+
+def carregar_descricoes_totvs(df_totvs: pd.DataFrame) -> dict[str, str]:
+    """Mapa código (coluna "Item", como texto) -> "Descrição" da base TOTVS.
+
+    Sem coluna de descrição retorna um mapa vazio (as traduções usam só SAP123).
+    """
+    col_item_totvs = _find_col(df_totvs, "Item")
+    col_desc_totvs = _find_col(df_totvs, "Descrição")
+    if col_item_totvs is None:
+        raise ValueError("Coluna 'Item' não encontrada na base TOTVS.")
+    if col_desc_totvs is None:
+        # fallback: tenta achar alguma coluna que pareça descrição
+        candidatas = [c for c in df_totvs.columns if "descr" in str(c).lower()]
+        col_desc_totvs = candidatas[0] if candidatas else None
+    if col_desc_totvs is None:
+        return {}
+    return dict(
+        zip(
+            df_totvs[col_item_totvs].astype(str).str.strip(),
+            df_totvs[col_desc_totvs].astype(str),
+        )
+    )
+
+
+def textos_para_traducao(codigo: object, mapa_descricoes: dict[str, str], sap123: object) -> list[str]:
+    """Textos tentados pelo matcher para um item: Descrição (TOTVS) e, em seguida, SAP123."""
+    codigo = str(codigo).strip()
+    if not codigo or codigo.lower() == "nan":
+        return []
+    candidatos_texto: list[str] = []
+    descricao = mapa_descricoes.get(codigo, "") if mapa_descricoes else ""
+    if descricao and str(descricao).lower() != "nan":
+        candidatos_texto.append(str(descricao))
+    if isinstance(sap123, str) and sap123.strip():
+        candidatos_texto.append(sap123)
+    return candidatos_texto
+
+
+def encontrar_traducao(
+    textos: list[str],
+    termos_ordenados: list[tuple[str, dict[str, object]]],
+    contadores=None,
+) -> dict[str, object] | None:
+    """Retorna as traduções do primeiro termo (mais longo) contido no primeiro texto que tiver match.
+
+    Os textos são tentados em ordem (ex.: Descrição do TOTVS e depois SAP123);
+    termos com até 5 caracteres são ignorados. `contadores` (opcional, ver
+    src/contadores_matchers.py) registra por qual texto saiu e o tempo da chamada.
+    """
+    inicio = contadores.iniciar() if contadores is not None else 0.0
+    for posicao, texto in enumerate(textos):
+        texto_lower = re.sub(r"\s+", " ", str(texto).lower())
+        for palavra_pt, traducoes in termos_ordenados:
+            if len(palavra_pt) > 5 and palavra_pt in texto_lower:
+                if contadores is not None:
+                    contadores.registrar("substring" if posicao == 0 else "substring_fallback", inicio, texto)
+                return traducoes
+    if contadores is not None:
+        contadores.registrar("sem_traducao", inicio, " | ".join(map(str, textos)))
+    return None
+
 
 def inserir_traducoes(
     caminho_planilha_atualizada: str,
     caminho_base_totvs: str,
     caminho_dicionario_traducoes: str,
+    df_totvs: pd.DataFrame | None = None,
+    df_dicionario: pd.DataFrame | None = None,
+    progresso=None,
+    contadores_matcher=None,
 ) -> None:
     """Preenche traduções (SAP1/SAP2/SAP3/Coluna32) a partir da Descrição (TOTVS).
 
@@ -18,37 +145,21 @@ def inserir_traducoes(
         - SAP3 = espanhol
         - Coluna32 = alemão
     - NÃO cria colunas novas: se alguma dessas colunas não existir na planilha, lança erro.
+    - `df_totvs`/`df_dicionario` podem vir já carregados (prefetch); caso contrário são lidos dos caminhos.
+    - `progresso` (opcional, ver src/progresso.py) recebe o avanço do laço por linha.
+    - `contadores_matcher` (opcional, ver src/contadores_matchers.py) recebe os caminhos do matcher.
     """
     print("Processando traduções das descrições de produtos...")
 
     # Não criar colunas novas: valida que as colunas de destino existem na planilha
-    colunas_destino = {
-        "PORTUGUÊS": "SAP1",
-        "INGLÊS": "SAP2",
-        "ESPANHOL": "SAP3",
-        "ALEMÂO": "Coluna32",
-    }
+    colunas_destino = COLUNAS_TRADUCAO
 
     try:
-        df_planilha = pd.read_excel(caminho_planilha_atualizada)
-        df_totvs = pd.read_excel(caminho_base_totvs, header=4)
-        df_dicionario = pd.read_excel(caminho_dicionario_traducoes)
-
-        def _norm_col_name(value: object) -> str:
-            return re.sub(r"\s+", "", str(value or "")).strip().upper()
-
-        def _find_col(df: pd.DataFrame, wanted: str) -> str | None:
-            wanted_n = _norm_col_name(wanted)
-            for c in df.columns:
-                c_n = _norm_col_name(c)
-                if c_n == wanted_n:
-                    return c
-            # fallback: alguns arquivos vêm com sufixos tipo _X000D_
-            for c in df.columns:
-                c_n = _norm_col_name(c)
-                if c_n.startswith(wanted_n):
-                    return c
-            return None
+        df_planilha = ler_planilha(caminho_planilha_atualizada)
+        if df_totvs is None:
+            df_totvs = pd.read_excel(caminho_base_totvs, header=4)
+        if df_dicionario is None:
+            df_dicionario = pd.read_excel(caminho_dicionario_traducoes)
 
         faltando = [col for col in colunas_destino.values() if col not in df_planilha.columns]
         if faltando:
@@ -59,85 +170,29 @@ def inserir_traducoes(
             )
 
         # item -> descrição (TOTVS)
-        col_item_totvs = _find_col(df_totvs, "Item")
-        col_desc_totvs = _find_col(df_totvs, "Descrição")
-        if col_item_totvs is None:
-            raise ValueError("Coluna 'Item' não encontrada na base TOTVS.")
-        if col_desc_totvs is None:
-            # fallback: tenta achar alguma coluna que pareça descrição
-            candidatas = [c for c in df_totvs.columns if "descr" in str(c).lower()]
-            col_desc_totvs = candidatas[0] if candidatas else None
-        mapa_descricoes: dict[str, str] = {}
-        if col_desc_totvs is not None:
-            mapa_descricoes = dict(
-                zip(
-                    df_totvs[col_item_totvs].astype(str).str.strip(),
-                    df_totvs[col_desc_totvs].astype(str),
-                )
-            )
-
-        # português -> traduções
-        dicionario_traducoes: dict[str, dict[str, object]] = {}
+        mapa_descricoes = carregar_descricoes_totvs(df_totvs)
 
-        col_pt = _find_col(df_dicionario, "PORTUGUÊS")
-        col_en = _find_col(df_dicionario, "INGLÊS")
-        col_es = _find_col(df_dicionario, "ESPANHOL")
-        col_de = _find_col(df_dicionario, "ALEMÂO") or _find_col(df_dicionario, "ALEMAO")
-        if col_pt is None:
-            raise ValueError("Coluna 'PORTUGUÊS' não encontrada no dicionário de traduções.")
-
-        for _, row in df_dicionario.iterrows():
-            palavra_pt = str(row[col_pt]).replace("\u00a0", " ").strip().lower()
-            palavra_pt = re.sub(r"\s+", " ", palavra_pt)
-            if not palavra_pt or palavra_pt == "nan":
-                continue
-            if palavra_pt in dicionario_traducoes:
-                continue
-            dicionario_traducoes[palavra_pt] = {
-                "PORTUGUÊS": row.get(col_pt),
-                "INGLÊS": row.get(col_en) if col_en is not None else None,
-                "ESPANHOL": row.get(col_es) if col_es is not None else None,
-                "ALEMÂO": row.get(col_de) if col_de is not None else None,
-            }
-
-        # Ordena por tamanho (mais específico primeiro)
-        termos_ordenados = sorted(
-            dicionario_traducoes.items(),
-            key=lambda kv: len(kv[0]),
-            reverse=True,
-        )
+        termos_ordenados = carregar_termos_traducao(df_dicionario)
 
         col_codigo = df_planilha.columns[0]
         col_sap123 = "SAP123" if "SAP123" in df_planilha.columns else None
 
-        for idx in range(1, len(df_planilha)):
-            codigo = str(df_planilha.loc[idx, col_codigo]).strip()
-            if not codigo or codigo.lower() == "nan":
-                continue
+        if progresso is not None:
+            progresso.fase("compute", total=len(df_planilha) - 1)
 
+        for idx in range(1, len(df_planilha)):
+            if progresso is not None:
+                progresso.avancar()
             # Fonte do match: tenta Descrição (TOTVS) e faz fallback para SAP123 (texto longo)
-            candidatos_texto: list[str] = []
-            descricao = mapa_descricoes.get(codigo, "") if mapa_descricoes else ""
-            if descricao and str(descricao).lower() != "nan":
-                candidatos_texto.append(str(descricao))
-            if col_sap123 is not None:
-                sap123 = df_planilha.loc[idx, col_sap123]
-                if isinstance(sap123, str) and sap123.strip():
-                    candidatos_texto.append(sap123)
-
+            candidatos_texto = textos_para_traducao(
+                df_planilha.loc[idx, col_codigo],
+                mapa_descricoes,
+                df_planilha.loc[idx, col_sap123] if col_sap123 is not None else None,
+            )
             if not candidatos_texto:
                 continue
 
-            traducoes_encontradas = None
-            for texto in candidatos_texto:
-                texto_lower = re.sub(r"\s+", " ", str(texto).lower())
-                for palavra_pt, traducoes in termos_ordenados:
-                    if len(palavra_pt) > 5 and palavra_pt in texto_lower:
-                        traducoes_encontradas = traducoes
-                        break
-                if traducoes_encontradas:
-                    break
-
+            traducoes_encontradas = encontrar_traducao(candidatos_texto, termos_ordenados, contadores_matcher)
             if not traducoes_encontradas:
                 continue
 
@@ -149,7 +204,9 @@ def inserir_traducoes(
             idioma: int(df_planilha.loc[1:, col].notna().sum())
             for idioma, col in colunas_destino.items()
         }
-        df_planilha.to_excel(caminho_planilha_atualizada, index=False)
+        if progresso is not None:
+            progresso.fase("write")
+        gravar_planilha(df_planilha, caminho_planilha_atualizada)
 
         print(f"Traduções preenchidas: {contadores}")
         print("Traduções processadas e salvas na planilha.")
@@ -1,56 +1,56 @@
-from openpyxl import load_workbook
+import pandas as pd
+
+from planilha_trabalho import gravar_planilha, ler_planilha
 
 def inserir_valores_fixos(
     caminho_planilha_modelo: str,
     caminho_saida: str,
+    progresso=None,
 ) -> None:
     """
     Insere valores fixos nas colunas SAP10 e SAP14
     - SAP10: valor "10" em linhas com código na primeira coluna
     - SAP14: valor "NDB" em linhas com código na primeira coluna
     
-    :param caminho_planilha_modelo: Caminho da planilha de entrada
+    :param caminho_planilha_modelo: Caminho da planilha de entrada (.xlsx ou intermediária .pkl)
     :param caminho_saida: Caminho onde a planilha será salva
+    :param progresso: Telemetria opcional do laço por linha (src/progresso.py)
     """
     print("Inserindo valores fixos em SAP10/SAP14...")
 
-    # Carrega a planilha
-    workbook = load_workbook(caminho_planilha_modelo)
-    planilha = workbook.active
-    
-    # Encontra o índice das colunas SAP10 e SAP14
-    col_sap10 = None
-    col_sap1 = None
-    
-    # Percorre o cabeçalho (primeira linha) para encontrar as colunas
-    for coluna in planilha.iter_cols(min_row=1, max_row=1):
-        for celula in coluna:
-            if celula.value == 'SAP10':
-                col_sap10 = celula.column
-            elif celula.value == 'SAP14':
-                col_sap1 = celula.column
+    # Carrega a planilha (df index 0 = linha descritiva = linha 2 do Excel)
+    planilha = ler_planilha(caminho_planilha_modelo)
     
     # Se as colunas não existem, aborta com aviso
-    if col_sap10 is None or col_sap1 is None:
+    if 'SAP10' not in planilha.columns or 'SAP14' not in planilha.columns:
         print("Aviso: colunas SAP10 ou SAP1 não encontradas no cabeçalho.")
         return
+    planilha['SAP10'] = planilha['SAP10'].astype(object)
+    planilha['SAP14'] = planilha['SAP14'].astype(object)
+    col_codigo = planilha.columns[0]
     
     alteradas = 0
     exemplos = []
-    # Percorre as linhas a partir da terceira linha (pulando cabeçalhos)
-    for linha_num in range(3, planilha.max_row + 1):
+    if progresso is not None:
+        progresso.fase("compute", total=max(len(planilha) - 1, 0))
+    # Percorre as linhas a partir da terceira linha do Excel (pulando a linha descritiva)
+    for idx in range(1, len(planilha)):
+        if progresso is not None:
+            progresso.avancar()
         # Verifica se há código na primeira coluna (coluna A)
-        codigo = planilha[f'A{linha_num}'].value
+        codigo = planilha.at[idx, col_codigo]
         
-        if codigo is not None and codigo != '':  # Se tem código
+        if pd.notna(codigo) and codigo != '':  # Se tem código
             # Insere "10" na coluna SAP10
-            planilha.cell(row=linha_num, column=col_sap10).value = '10'
+            planilha.at[idx, 'SAP10'] = '10'
             # Insere "NDB" na coluna SAP14
-            planilha.cell(row=linha_num, column=col_sap1).value = 'NDB'
+            planilha.at[idx, 'SAP14'] = 'NDB'
             alteradas += 1
             if len(exemplos) < 5:
-                exemplos.append(linha_num)
+                exemplos.append(idx + 2)
     
     # Salva a planilha
-    workbook.save(caminho_saida)
+    if progresso is not None:
+        progresso.fase("write")
+    gravar_planilha(planilha, caminho_saida)
     print(f"Valores fixos aplicados: {alteradas} linhas")
\ No newline at end of file
@@ -0,0 +1,321 @@
+"""Join ordenado externo (sort-merge) da base TOTVS com a lista de códigos.
+
+Para exportações TOTVS maiores que a memória da máquina: em vez de carregar a
+base inteira, as linhas são lidas em streaming do .xlsx, acumuladas até o
+orçamento de memória, ordenadas pelo código normalizado e despejadas em
+arquivos temporários ("corridas"). A lista de códigos passa pelo mesmo
+processo. As corridas são então intercaladas (`heapq.merge`) e juntadas: só as
+linhas TOTVS cujo código foi pedido chegam às etapas de enriquecimento, como
+um DataFrame pequeno com as mesmas colunas e tipos da base completa.
+
+Equivalência com `pd.read_excel(..., header=4)`:
+- o código é comparado por texto e, quando numérico, também pelo valor
+  (`"00123"`, `123` e `123.0` casam), de modo que toda linha que o join das
+  etapas casaria está no resultado (linhas a mais são inofensivas);
+- as linhas saem na ordem da base (repetições incluídas), então "vale a
+  primeira ocorrência" continua valendo;
+- o tipo de cada coluna é inferido por lote durante o streaming e combinado
+  como o pandas faria na base inteira (ex.: inteiros com uma célula vazia em
+  qualquer ponto da base viram float).
+
+O orçamento limita as linhas acumuladas antes de cada despejo; a tabela de
+strings compartilhadas do .xlsx e as linhas casadas ficam fora dele.
+"""
+
+import heapq
+import math
+import os
+import pickle
+import sys
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from carregar_fontes import CarregadorFontes, combinar_fragmentos_totvs, resolver_fragmentos_totvs
+from inserir_colunas_totvs import encontrar_coluna_item
+from leitor_xlsx_paralelo import iterar_linhas_xlsx
+
+MEMORIA_PADRAO_MB = 256
+# Cabeçalho real da base TOTVS (header=4 no pd.read_excel)
+LINHA_CABECALHO_TOTVS = 5
+# Códigos lidos por vez do CSV
+CODIGOS_POR_LOTE_CSV = 50_000
+
+_TIPO_VAZIA = "vazia"
+
+
+def chaves_codigo(valor: object) -> tuple[str, ...]:
+	"""Chaves de join de um código: o texto sem espaços nas pontas e, se numérico, o número canônico."""
+	if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+		return ()
+	if isinstance(valor, bool):
+		return (str(valor),)
+	if isinstance(valor, (int, float)):
+		numero = float(valor)
+		texto = str(valor)
+	else:
+		texto = str(valor).strip()
+		if not texto:
+			return ()
+		try:
+			numero = float(texto)
+		except ValueError:
+			return (texto,)
+	if not math.isfinite(numero):
+		return (texto,)
+	canonico = str(int(numero)) if numero.is_integer() else repr(numero)
+	return (texto,) if canonico == texto else (texto, canonico)
+
+
+def _tamanho(celulas: list) -> int:
+	return 64 + sum(sys.getsizeof(c) for c in celulas)
+
+
+class CorridasOrdenadas:
+	"""Registros (chave, ...) acumulados até `orcamento_bytes` e despejados em corridas ordenadas."""
+
+	def __init__(self, diretorio: str, orcamento_bytes: int):
+		self.diretorio = diretorio
+		self.orcamento_bytes = orcamento_bytes
+		self.corridas: list[str] = []
+		self.registros = 0
+		self.bytes_despejados = 0
+		self._buffer: list[tuple] = []
+		self._bytes_buffer = 0
+
+	def adicionar(self, registro: tuple, tamanho: int) -> bool:
+		"""Acumula um registro; retorna True se o orçamento estourou e o buffer foi despejado."""
+		self._buffer.append(registro)
+		self._bytes_buffer += tamanho
+		self.registros += 1
+		if self._bytes_buffer >= self.orcamento_bytes:
+			self.despejar()
+			return True
+		return False
+
+	def despejar(self) -> None:
+		if not self._buffer:
+			return
+		self._buffer.sort()
+		descritor, caminho = tempfile.mkstemp(suffix=".corrida", dir=self.diretorio)
+		with os.fdopen(descritor, "wb") as f:
+			for registro in self._buffer:
+				pickle.dump(registro, f, protocol=pickle.HIGHEST_PROTOCOL)
+			self.bytes_despejados += f.tell()
+		self.corridas.append(caminho)
+		self._buffer = []
+		self._bytes_buffer = 0
+
+	@staticmethod
+	def _ler_corrida(caminho: str) -> Iterator[tuple]:
+		with open(caminho, "rb") as f:
+			while True:
+				try:
+					yield pickle.load(f)
+				except EOFError:
+					return
+
+	def intercalar(self) -> Iterator[tuple]:
+		"""Todos os registros em ordem (corridas em disco + o que restou no buffer)."""
+		self._buffer.sort()
+		return heapq.merge(*(self._ler_corrida(c) for c in self.corridas), self._buffer)
+
+
+def _tipo_coluna(serie: pd.Series) -> str:
+	if serie.isna().all():
+		return _TIPO_VAZIA
+	if isinstance(serie.dtype, pd.StringDtype):
+		return "T"
+	return serie.dtype.kind
+
+
+def _combinar_tipos(a: str | None, b: str) -> str:
+	"""Tipo da coluna na base inteira a partir dos tipos de dois lotes (regras de inferência do pandas)."""
+	if a is None or a == b:
+		return b
+	if _TIPO_VAZIA in (a, b):
+		outro = b if a == _TIPO_VAZIA else a
+		# booleanos e inteiros com célula vazia viram float
+		return "f" if outro in ("i", "u", "b") else outro
+	if {a, b} <= {"i", "u", "b"}:
+		return "i"
+	if {a, b} <= {"i", "u", "b", "f"}:
+		return "f"
+	return "O"
+
+
+def _tabela(cabecalho: list, linhas: list[list], largura: int, **kwargs) -> pd.DataFrame:
+	dados = [linha + [""] * (largura - len(linha)) for linha in [cabecalho, *linhas]]
+	return TextParser(dados, header=0, skip_blank_lines=False, **kwargs).read()
+
+
+def _codigos(caminho_codigos: str) -> Iterator[object]:
+	"""Códigos em streaming: CSV sem cabeçalho (primeira coluna) ou planilha gerada (coluna A, itens)."""
+	if str(caminho_codigos).lower().endswith(".xlsx"):
+		for numero, celulas in iterar_linhas_xlsx(str(caminho_codigos)):
+			if numero >= 3 and celulas:
+				yield celulas[0]
+		return
+	for lote in pd.read_csv(caminho_codigos, header=None, usecols=[0], dtype=str, chunksize=CODIGOS_POR_LOTE_CSV):
+		yield from lote[0].tolist()
+
+
+def juntar_base_totvs_externa(
+	caminho_totvs: str,
+	caminho_codigos: str,
+	memoria_mb: float = MEMORIA_PADRAO_MB,
+	diretorio_temporario: str | None = None,
+) -> pd.DataFrame:
+	"""Linhas da base TOTVS cujos códigos estão em `caminho_codigos`, com as colunas/tipos da base inteira.
+
+	`memoria_mb` é dividido entre as linhas TOTVS (3/4) e os códigos (1/4).
+	As estatísticas do join ficam em `df.attrs["juncao_externa"]`.
+	"""
+	orcamento = int(memoria_mb * 1024 * 1024)
+	with tempfile.TemporaryDirectory(prefix="juncao_totvs_", dir=diretorio_temporario) as diretorio:
+		codigos = CorridasOrdenadas(diretorio, orcamento // 4)
+		for codigo in _codigos(caminho_codigos):
+			for chave in chaves_codigo(codigo):
+				codigos.adicionar((chave,), 64 + sys.getsizeof(chave))
+
+		linhas_totvs = CorridasOrdenadas(diretorio, orcamento - orcamento // 4)
+		cabecalho: list | None = None
+		coluna_item = 0
+		tipos: list[str | None] = []
+		dtypes: list[dict] = []
+		lote: list[list] = []
+		bytes_lote = 0
+		largura = largura_minima = 0
+		anterior = LINHA_CABECALHO_TOTVS
+		vazias_pendentes = False
+
+		def inferir_lote() -> None:
+			# tipos do lote pelo mesmo parser do pd.read_excel, combinados com os anteriores
+			nonlocal bytes_lote
+			if lote:
+				df_lote = _tabela(cabecalho, lote, largura)
+				for j, coluna in enumerate(df_lote.columns):
+					tipo = _tipo_coluna(df_lote[coluna])
+					tipos[j] = _combinar_tipos(tipos[j], tipo)
+					dtypes[j].setdefault(tipo, df_lote[coluna].dtype)
+			lote.clear()
+			bytes_lote = 0
+
+		for numero, celulas in iterar_linhas_xlsx(caminho_totvs):
+			if numero < LINHA_CABECALHO_TOTVS:
+				continue
+			if cabecalho is None:
+				if numero != LINHA_CABECALHO_TOTVS or not celulas:
+					raise ValueError(f"Cabeçalho da base TOTVS (linha {LINHA_CABECALHO_TOTVS}) vazio: {caminho_totvs}")
+				cabecalho = celulas
+				colunas = _tabela(cabecalho, [], len(cabecalho)).columns
+				coluna_item = list(colunas).index(encontrar_coluna_item(pd.DataFrame(columns=colunas)))
+				largura = largura_minima = len(cabecalho)
+				tipos = [None] * largura
+				dtypes = [{} for _ in range(largura)]
+				continue
+
+			# linhas ausentes ou vazias só contam se houver linha com dados depois (o pandas descarta as finais)
+			vazias_pendentes = vazias_pendentes or numero > anterior + 1
+			anterior = numero
+			if not celulas:
+				vazias_pendentes = True
+				continue
+			if vazias_pendentes:
+				lote.append([])
+				vazias_pendentes = False
+			if len(celulas) > largura:
+				tipos.extend([None] * (len(celulas) - largura))
+				dtypes.extend({} for _ in range(len(celulas) - largura))
+				largura = len(celulas)
+			largura_minima = min(largura_minima, len(celulas))
+			lote.append(celulas)
+
+			tamanho = _tamanho(celulas)
+			bytes_lote += tamanho
+			despejou = False
+			item = celulas[coluna_item] if coluna_item < len(celulas) else None
+			for chave in chaves_codigo(item):
+				despejou = linhas_totvs.adicionar((chave, numero, celulas), tamanho) or despejou
+			if despejou or bytes_lote >= linhas_totvs.orcamento_bytes:
+				inferir_lote()
+		if cabecalho is None:
+			return pd.DataFrame()
+		inferir_lote()
+		for j in range(largura_minima, largura):
+			# linhas mais curtas que a base têm célula vazia nessas colunas
+			tipos[j] = _combinar_tipos(tipos[j], _TIPO_VAZIA)
+
+		# Merge-join das duas sequências ordenadas por chave
+		casadas: dict[int, list] = {}
+		totvs = linhas_totvs.intercalar()
+		atual = next(totvs, None)
+		for (chave,) in codigos.intercalar():
+			while atual is not None and atual[0] < chave:
+				atual = next(totvs, None)
+			while atual is not None and atual[0] == chave:
+				casadas[atual[1]] = atual[2]
+				atual = next(totvs, None)
+
+		estatisticas = {
+			"linhas_totvs": linhas_totvs.registros,
+			"codigos": codigos.registros,
+			"linhas_casadas": len(casadas),
+			"corridas": len(linhas_totvs.corridas) + len(codigos.corridas),
+			"bytes_despejados": linhas_totvs.bytes_despejados + codigos.bytes_despejados,
+			"memoria_mb": memoria_mb,
+		}
+
+	linhas = [casadas[o] for o in sorted(casadas)]
+	padrao = _tabela(cabecalho, linhas, largura)
+	brutos = _tabela(cabecalho, linhas, largura, dtype=object)
+	for j, coluna in enumerate(padrao.columns):
+		tipo = tipos[j] if j < len(tipos) else None
+		if tipo is None:
+			continue
+		if tipo == "O":
+			padrao[coluna] = brutos[coluna]
+			continue
+		# as linhas casadas podem não ter o valor que definiu o tipo na base inteira
+		alvo = {"f": "float64", _TIPO_VAZIA: "float64", "i": "int64"}.get(tipo) or dtypes[j][tipo]
+		if padrao[coluna].dtype != alvo:
+			padrao[coluna] = padrao[coluna].astype(alvo)
+	padrao.attrs["juncao_externa"] = estatisticas
+	return padrao
+
+
+def _combinar_juncoes(partes: list[pd.DataFrame]) -> tuple[pd.DataFrame, dict]:
+	estatisticas = [p.attrs.get("juncao_externa", {}) for p in partes]
+	if len(partes) > 1:
+		base, info = combinar_fragmentos_totvs(partes)
+	else:
+		base, info = partes[0], {}
+	info["juncao_externa"] = {
+		chave: sum(e.get(chave, 0) for e in estatisticas)
+		for chave in ("linhas_totvs", "codigos", "linhas_casadas", "corridas", "bytes_despejados")
+	}
+	return base, info
+
+
+def agendar_base_totvs_externa(
+	fontes: CarregadorFontes,
+	base_totvs: str,
+	caminho_codigos: str | Path,
+	memoria_mb: float = MEMORIA_PADRAO_MB,
+) -> None:
+	"""Agenda em `fontes` a base TOTVS já reduzida aos códigos pedidos (um join por fragmento).
+
+	Os fragmentos são juntados em paralelo, então o orçamento é dividido entre eles.
+	"""
+	fragmentos = resolver_fragmentos_totvs(base_totvs)
+	memoria_por_fragmento = memoria_mb / len(fragmentos)
+	fontes.agendar_fragmentos(
+		"base_totvs",
+		juntar_base_totvs_externa,
+		argumentos=[(str(f), str(caminho_codigos), memoria_por_fragmento) for f in fragmentos],
+		rotulos=[str(f) for f in fragmentos],
+		combinar=_combinar_juncoes,
+	)
@@ -0,0 +1,113 @@
+"""Leitura direta (sem openpyxl/pandas) de arquivos .xlsx.
+
+Um .xlsx é um zip com XMLs: a planilha (`xl/worksheets/sheetN.xml`) guarda as
+células e, para textos, apenas o índice na tabela de strings compartilhadas
+(`xl/sharedStrings.xml`). Aqui ambos são lidos em streaming, parando assim que
+o necessário foi encontrado — útil para ler só o cabeçalho de bases grandes.
+"""
+
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+_REF_CELULA = re.compile(r"([A-Z]+)(\d+)")
+
+
+def indice_coluna(letras: str) -> int:
+	"""Converte a letra da coluna (A, B, ..., AA) para índice base 0."""
+	indice = 0
+	for letra in letras:
+		indice = indice * 26 + (ord(letra) - 64)
+	return indice - 1
+
+
+def caminho_primeira_planilha(zf: zipfile.ZipFile) -> str:
+	"""Caminho, dentro do zip, da primeira planilha (a mesma que o pandas lê por padrão)."""
+	workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+	planilha = workbook.find(f"{NS_MAIN}sheets/{NS_MAIN}sheet")
+	if planilha is None:
+		raise ValueError("Arquivo .xlsx sem planilhas.")
+	rid = planilha.get(f"{NS_REL}id")
+	relacoes = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+	for rel in relacoes:
+		if rel.get("Id") == rid:
+			alvo = rel.get("Target")
+			return alvo.lstrip("/") if alvo.startswith("/") else f"xl/{alvo}"
+	raise ValueError(f"Relacionamento da planilha não encontrado: {rid}")
+
+
+def texto_si(elemento: ET.Element) -> str:
+	"""Texto de um item de string compartilhada (inclui trechos com formatação rica).
+
+	Como no openpyxl, só contam `<t>` direto e `<r><t>`; a guia fonética (`<rPh>`) é ignorada.
+	"""
+	partes = []
+	for filho in elemento:
+		if filho.tag == f"{NS_MAIN}t":
+			partes.append(filho.text or "")
+		elif filho.tag == f"{NS_MAIN}r":
+			t = filho.find(f"{NS_MAIN}t")
+			if t is not None:
+				partes.append(t.text or "")
+	return "".join(partes)
+
+
+def ler_strings_compartilhadas(zf: zipfile.ZipFile, ate_indice: int | None = None) -> list[str]:
+	"""Lê a tabela de strings compartilhadas (opcionalmente só até `ate_indice`)."""
+	if "xl/sharedStrings.xml" not in zf.namelist():
+		return []
+	strings: list[str] = []
+	with zf.open("xl/sharedStrings.xml") as arquivo:
+		for _, elemento in ET.iterparse(arquivo, events=("end",)):
+			if elemento.tag != f"{NS_MAIN}si":
+				continue
+			strings.append(texto_si(elemento))
+			elemento.clear()
+			if ate_indice is not None and len(strings) > ate_indice:
+				break
+	return strings
+
+
+def ler_linha_xlsx(caminho: str, numero_linha: int) -> list[object]:
+	"""Lê apenas a linha `numero_linha` (base 1, como no Excel) da primeira planilha.
+
+	Textos vêm como str, números como o texto original da célula; células
+	ausentes no meio da linha viram None.
+	"""
+	with zipfile.ZipFile(caminho) as zf:
+		caminho_planilha = caminho_primeira_planilha(zf)
+		celulas: dict[int, tuple[str | None, str | None]] = {}
+		linha_atual = 0
+		with zf.open(caminho_planilha) as arquivo:
+			for _, elemento in ET.iterparse(arquivo, events=("end",)):
+				if elemento.tag != f"{NS_MAIN}row":
+					continue
+				linha_atual = int(elemento.get("r") or linha_atual + 1)
+				if linha_atual == numero_linha:
+					for posicao, c in enumerate(elemento.iter(f"{NS_MAIN}c")):
+						ref = _REF_CELULA.match(c.get("r") or "")
+						coluna = indice_coluna(ref.group(1)) if ref else posicao
+						tipo = c.get("t")
+						if tipo == "inlineStr":
+							texto = c.find(f"{NS_MAIN}is")
+							celulas[coluna] = ("str", texto_si(texto) if texto is not None else "")
+						else:
+							v = c.find(f"{NS_MAIN}v")
+							celulas[coluna] = (tipo, v.text if v is not None else None)
+				elemento.clear()
+				if linha_atual >= numero_linha:
+					break
+
+		if not celulas:
+			return []
+
+		indices = [int(valor) for tipo, valor in celulas.values() if tipo == "s" and valor is not None]
+		strings = ler_strings_compartilhadas(zf, max(indices)) if indices else []
+
+	linha: list[object] = [None] * (max(celulas) + 1)
+	for coluna, (tipo, valor) in celulas.items():
+		linha[coluna] = strings[int(valor)] if tipo == "s" and valor is not None else valor
+	return linha
@@ -0,0 +1,212 @@
+"""Leitura paralela de planilhas .xlsx grandes (ex.: exportação da base TOTVS).
+
+O XML da planilha é descompactado uma vez e dividido em faixas de bytes, sempre
+no início de um `<row`. Cada faixa é envolvida pelo início e pelo fim do
+documento original (para continuar sendo um XML válido) e convertida em linhas
+por um processo; a tabela de strings compartilhadas e os estilos de data são
+lidos por cada processo ao iniciar. As linhas voltam na ordem original e são
+entregues ao mesmo `TextParser` que o `pd.read_excel` usa — com as mesmas
+conversões de célula do leitor openpyxl — de modo que o DataFrame (inclusive
+`header=4` da base TOTVS) sai igual ao de `pd.read_excel`.
+"""
+
+import io
+import os
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from openpyxl.styles.stylesheet import Stylesheet
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+from pandas.io.parsers import TextParser
+
+from leitor_xlsx import NS_MAIN, caminho_primeira_planilha, indice_coluna, ler_strings_compartilhadas, texto_si
+
+# Abaixo disso a planilha é lida no próprio processo (subir o pool custa mais que ganha)
+BYTES_MINIMOS_PARALELO = 8 * 1024 * 1024
+
+_INICIO_LINHA = re.compile(rb"<(?:[A-Za-z_][\w.-]*:)?row[\s>/]")
+_FIM_SHEETDATA = re.compile(rb"</(?:[A-Za-z_][\w.-]*:)?sheetData>")
+_REF_CELULA = re.compile(r"([A-Z]+)(\d+)")
+
+# Estado de cada processo de leitura (preenchido por `_iniciar_leitor`)
+_ESTADO: dict = {}
+
+
+def _epoca(zf: zipfile.ZipFile):
+	propriedades = ET.fromstring(zf.read("xl/workbook.xml")).find(f"{NS_MAIN}workbookPr")
+	date1904 = propriedades is not None and propriedades.get("date1904") in ("1", "true")
+	return CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+
+
+def ler_formatos_data(zf: zipfile.ZipFile) -> tuple[set[int], set[int]]:
+	"""Índices de estilo (atributo `s` da célula) com formato de data e de duração."""
+	if "xl/styles.xml" not in zf.namelist():
+		return set(), set()
+	estilos = Stylesheet.from_tree(ET.fromstring(zf.read("xl/styles.xml")))
+	return estilos.date_formats, estilos.timedelta_formats
+
+
+def _iniciar_leitor(caminho: str) -> None:
+	with zipfile.ZipFile(caminho) as zf:
+		datas, duracoes = ler_formatos_data(zf)
+		_ESTADO.update(
+			strings=ler_strings_compartilhadas(zf),
+			datas=datas,
+			duracoes=duracoes,
+			epoca=_epoca(zf),
+		)
+
+
+def fatiar_linhas(xml: bytes, partes: int) -> tuple[bytes, list[tuple[int, int]], bytes]:
+	"""Divide `<sheetData>` em até `partes` faixas de bytes que começam em um `<row`.
+
+	Retorna (cabeça, faixas, cauda): cabeça + xml[inicio:fim] + cauda é um XML válido.
+	"""
+	primeira = _INICIO_LINHA.search(xml)
+	fim_dados = _FIM_SHEETDATA.search(xml, primeira.start() if primeira else 0)
+	if primeira is None or fim_dados is None:
+		return xml, [], b""
+
+	inicio, fim = primeira.start(), fim_dados.start()
+	cortes = [inicio]
+	tamanho = (fim - inicio) / max(1, partes)
+	for i in range(1, partes):
+		proxima = _INICIO_LINHA.search(xml, max(cortes[-1] + 1, inicio + int(i * tamanho)), fim)
+		if proxima is None:
+			break
+		cortes.append(proxima.start())
+	cortes.append(fim)
+	return xml[:inicio], list(zip(cortes, cortes[1:])), xml[fim:]
+
+
+def _converter_celula(c: ET.Element) -> object:
+	# Mesmas regras do openpyxl (modo read_only, data_only) + `_convert_cell` do pandas
+	tipo = c.get("t", "n")
+	if tipo == "inlineStr":
+		filho = c.find(f"{NS_MAIN}is")
+		return texto_si(filho) if filho is not None else ""
+	valor = c.findtext(f"{NS_MAIN}v") or None
+	if valor is None:
+		return ""
+	if tipo == "n":
+		numero = float(valor) if ("." in valor or "E" in valor or "e" in valor) else int(valor)
+		estilo = int(c.get("s") or 0)
+		if estilo in _ESTADO["datas"]:
+			try:
+				return from_excel(numero, _ESTADO["epoca"], timedelta=estilo in _ESTADO["duracoes"])
+			except (OverflowError, ValueError):
+				return np.nan
+		inteiro = int(numero)
+		return inteiro if inteiro == numero else float(numero)
+	if tipo == "s":
+		return _ESTADO["strings"][int(valor)]
+	if tipo == "b":
+		return bool(int(valor))
+	if tipo == "e":
+		return np.nan
+	if tipo == "d":
+		return from_ISO8601(valor)
+	return valor
+
+
+def _iterar_linhas(origem) -> Iterator[tuple[int | None, list[object]]]:
+	"""(número da linha, células) de cada `<row>` de um XML de planilha (bytes ou arquivo)."""
+	for _, elemento in ET.iterparse(origem, events=("end",)):
+		if elemento.tag != f"{NS_MAIN}row":
+			continue
+		r = elemento.get("r")
+		celulas: list[object] = []
+		for c in elemento.iter(f"{NS_MAIN}c"):
+			ref = _REF_CELULA.match(c.get("r") or "")
+			coluna = indice_coluna(ref.group(1)) if ref else len(celulas)
+			if coluna > len(celulas):
+				celulas.extend([""] * (coluna - len(celulas)))
+			valor = _converter_celula(c)
+			if coluna < len(celulas):
+				celulas[coluna] = valor
+			else:
+				celulas.append(valor)
+		while celulas and celulas[-1] == "":
+			celulas.pop()
+		yield int(float(r)) if r else None, celulas
+		elemento.clear()
+
+
+def _ler_faixa(documento: bytes) -> list[tuple[int | None, list[object]]]:
+	"""Converte as linhas de um documento (cabeça + faixa + cauda) em (número da linha, células)."""
+	return list(_iterar_linhas(io.BytesIO(documento)))
+
+
+def iterar_linhas_xlsx(caminho: str) -> Iterator[tuple[int, list[object]]]:
+	"""Linhas da primeira planilha em streaming, com as mesmas conversões de `ler_planilha_paralela`.
+
+	Retorna (número da linha, células) só das linhas presentes no XML; o XML é
+	lido direto do .xlsx, sem ser descompactado inteiro em memória (a tabela de
+	strings compartilhadas, essa sim, é carregada).
+	"""
+	_iniciar_leitor(caminho)
+	anterior = 0
+	with zipfile.ZipFile(caminho) as zf, zf.open(caminho_primeira_planilha(zf)) as xml:
+		for numero, celulas in _iterar_linhas(xml):
+			anterior = numero or anterior + 1
+			yield anterior, celulas
+
+
+def _montar_linhas(faixas: list[list[tuple[int | None, list[object]]]]) -> list[list[object]]:
+	"""Junta as faixas em ordem, preenchendo linhas ausentes (como o openpyxl em read_only)."""
+	dados: list[list[object]] = []
+	for faixa in faixas:
+		for numero, celulas in faixa:
+			numero = numero or len(dados) + 1
+			while len(dados) < numero - 1:
+				dados.append([])
+			dados.append(celulas)
+
+	# mesmo acabamento de `get_sheet_data` do pandas
+	while dados and not dados[-1]:
+		dados.pop()
+	if dados:
+		largura = max(len(linha) for linha in dados)
+		dados = [linha + [""] * (largura - len(linha)) for linha in dados]
+	return dados
+
+
+def ler_planilha_paralela(
+	caminho: str,
+	header: int = 0,
+	max_workers: int | None = None,
+	bytes_minimos: int = BYTES_MINIMOS_PARALELO,
+) -> pd.DataFrame:
+	"""Equivalente a `pd.read_excel(caminho, header=header)` para a primeira planilha, em paralelo.
+
+	- O número de faixas é o número de processos (`max_workers`, padrão: núcleos da máquina).
+	- Planilhas com XML menor que `bytes_minimos` são lidas no próprio processo.
+	"""
+	with zipfile.ZipFile(caminho) as zf:
+		xml = zf.read(caminho_primeira_planilha(zf))
+
+	processos = max_workers or os.cpu_count() or 1
+	if len(xml) < bytes_minimos:
+		processos = 1
+	cabeca, faixas, cauda = fatiar_linhas(xml, processos)
+	documentos = [cabeca + xml[inicio:fim] + cauda for inicio, fim in faixas]
+	del xml
+
+	if len(documentos) <= 1:
+		_iniciar_leitor(caminho)
+		lidas = [_ler_faixa(d) for d in documentos]
+	else:
+		with ProcessPoolExecutor(
+			max_workers=len(documentos), initializer=_iniciar_leitor, initargs=(caminho,),
+		) as executor:
+			lidas = list(executor.map(_ler_faixa, documentos))
+
+	dados = _montar_linhas(lidas)
+	if not dados:
+		return pd.DataFrame()
+	return TextParser(dados, header=header, skip_blank_lines=False).read()
@@ -0,0 +1,95 @@
+"""Implementações de referência (congeladas) dos matchers por narrativa.
+
+Cópias fiéis de `encontrar_material`, `encontrar_normas`,
+`encontrar_size_dimension` e do laço de `inserir_traducoes`, incluindo suas
+peculiaridades (ex.: normas/size dimension retornam "material nao informado"
+sempre que o fuzzy devolve algum candidato). NÃO alterar: qualquer matcher
+novo deve produzir exatamente as mesmas respostas (ver src/comparar_matchers.py).
+"""
+
+import re
+
+from thefuzz import process, fuzz
+
+
+def referencia_encontrar_material(narrativa, materiais):
+    if not isinstance(narrativa, str) or not narrativa.strip():
+        return None
+
+    materiais_bloqueados = {"MOTOR", "SPECIAL"}
+
+    narrativa_upper = narrativa.upper()
+
+    materiais_encontrados = []
+    for material in materiais:
+        material_upper = material.upper()
+        if material_upper in materiais_bloqueados:
+            continue
+        if material_upper in narrativa_upper:
+            materiais_encontrados.append(material)
+
+    if materiais_encontrados:
+        selecionado = max(materiais_encontrados, key=len)
+        return selecionado
+
+    melhor_material, pontuacao = process.extractOne(narrativa, materiais, scorer=fuzz.ratio)
+    if melhor_material and melhor_material.upper() in materiais_bloqueados:
+        return "material nao informado"
+    return melhor_material if pontuacao > 80 else None
+
+
+def referencia_encontrar_normas(narrativa, normas):
+    if not isinstance(narrativa, str) or not narrativa.strip():
+        return None
+
+    narrativa_upper = narrativa.upper()
+
+    materiais_encontrados = []
+    for material in normas:
+        material_upper = material.upper()
+        if material_upper in narrativa_upper:
+            materiais_encontrados.append(material)
+
+    if materiais_encontrados:
+        selecionado = max(materiais_encontrados, key=len)
+        return selecionado
+
+    melhor_material, pontuacao = process.extractOne(narrativa, normas, scorer=fuzz.ratio)
+    if melhor_material and melhor_material.upper():
+        return "material nao informado"
+    return melhor_material if pontuacao > 80 else None
+
+
+def referencia_encontrar_size_dimension(narrativa, size_dimension):
+    if not isinstance(narrativa, str) or not narrativa.strip():
+        return None
+
+    narrativa_upper = narrativa.upper()
+
+    materiais_encontrados = []
+    for material in size_dimension:
+        material_upper = material.upper()
+        if material_upper in narrativa_upper:
+            materiais_encontrados.append(material)
+
+    if materiais_encontrados:
+        selecionado = max(materiais_encontrados, key=len)
+        return selecionado
+
+    melhor_material, pontuacao = process.extractOne(narrativa, size_dimension, scorer=fuzz.ratio)
+    if melhor_material and melhor_material.upper():
+        return "material nao informado"
+    return melhor_material if pontuacao > 80 else None
+
+
+def referencia_encontrar_traducao(textos, termos_ordenados):
+    traducoes_encontradas = None
+    for texto in textos:
+        texto_lower = re.sub(r"\s+", " ", str(texto).lower())
+        for palavra_pt, traducoes in termos_ordenados:
+            if len(palavra_pt) > 5 and palavra_pt in texto_lower:
+                traducoes_encontradas = traducoes
+                break
+        if traducoes_encontradas:
+            break
+    return traducoes_encontradas
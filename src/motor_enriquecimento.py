@@ -0,0 +1,257 @@
+"""Enriquecimento em memória, para uso embutido em outros serviços Python.
+
+`MotorEnriquecimento` carrega as fontes uma única vez (base TOTVS, dicionário de
+traduções, dicionários de materiais/normas/size dimension e listas de nomes de
+itens) e aplica as mesmas
+regras do pipeline de `main/app.py` a uma lista de códigos, sem ler nem gravar
+planilhas:
+
+    from motor_enriquecimento import MotorEnriquecimento
+
+    motor = MotorEnriquecimento.carregar("planilhas/base_dados_TOTVS.xlsx")
+    df = motor.enriquecer(["NDB0001", "NDB0002"])
+    registros = motor.enriquecer(codigos, como_registros=True)
+
+Depois de construído, o motor só é lido: `enriquecer` pode ser chamado de
+várias threads ao mesmo tempo. Com vários processos na mesma máquina, passe
+`estruturas` (arquivo gerado por src/estruturas_compartilhadas.py): os
+matchers passam a consultar o arquivo mapeado em memória, compartilhado entre
+os processos, em vez de cada um carregar os dicionários (os nomes canônicos
+também vêm do arquivo; cada processo só reconstrói as árvores de nomes).
+"""
+
+from pathlib import Path
+
+import pandas as pd
+
+from analisar_dimensoes import construir_indice_size_dimension, encontrar_size_dimension_indexado
+from carregar_fontes import CarregadorFontes, agendar_base_totvs, carregar_dicionario_traducoes
+from estruturas_compartilhadas import (
+	EstruturasCompartilhadas,
+	encontrar_material_compartilhado,
+	encontrar_normas_compartilhado,
+	encontrar_size_dimension_compartilhado,
+	encontrar_traducao_compartilhada,
+)
+from inserir_colunas_totvs import MAPEAMENTO_TOTVS, indexar_base_totvs
+from inserir_material import carregar_dicionario, encontrar_material
+from inserir_normas import carregar_dicionario_normas, encontrar_normas
+from inserir_size_dimension import carregar_dicionario_size_dimension
+from inserir_traducoes import (
+	COLUNAS_TRADUCAO,
+	carregar_descricoes_totvs,
+	carregar_termos_traducao,
+	encontrar_traducao,
+	textos_para_traducao,
+)
+from juncao_externa import agendar_base_totvs_externa
+from leitor_xlsx import ler_linha_xlsx
+from normalizar_nomes import NomesCanonicos, carregar_nomes
+from validar_entradas import COLUNAS_MODELO
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Mesmas fontes padrão do pipeline
+DICIONARIO_TRADUCOES = BASE_DIR / "dados/dicionario.xlsx"
+DICIONARIO_MATERIAIS = BASE_DIR / "dados/dicionario_materiais.csv"
+DICIONARIO_NORMAS = BASE_DIR / "dados/dicionario_normas.csv"
+DICIONARIO_SIZE_DIMENSION = BASE_DIR / "dados/dicionario_size_dimension.csv"
+DICIONARIO_NOMES_PT = BASE_DIR / "dados/dicionario_nome_PT.csv"
+DICIONARIO_NOMES_EN = BASE_DIR / "dados/nomedos_materiais_Ingles.csv"
+PLANILHA_MODELO = BASE_DIR / "planilhas/planilha_padrao.xlsx"
+
+COLUNA_CODIGO_PADRAO = "item(table) + it-codigo(field)"
+# Regras fixas do pipeline (src/inserir_valores_fixos.py e src/inserir_narrativas.py)
+VALORES_FIXOS = {"SAP10": "10", "SAP14": "NDB"}
+LIMITE_NARRATIVA = 141
+MARCA_NARRATIVA = "verificar internal comment"
+
+
+def _tem_codigo(codigo: object) -> bool:
+	return codigo is not None and codigo != "" and not (isinstance(codigo, float) and pd.isna(codigo))
+
+
+class MotorEnriquecimento:
+	"""Fontes carregadas + regras do pipeline aplicadas em memória a lotes de códigos."""
+
+	def __init__(
+		self,
+		df_base_totvs: pd.DataFrame,
+		df_dicionario_traducoes: pd.DataFrame,
+		materiais,
+		normas,
+		size_dimensions,
+		colunas: list[str] | None = None,
+		estruturas: EstruturasCompartilhadas | None = None,
+		nomes: NomesCanonicos | None = None,
+	):
+		"""`colunas`: colunas da saída, na ordem do modelo (a primeira é o código).
+
+		Com `estruturas`, os dicionários (`df_dicionario_traducoes`, `materiais`,
+		`normas`, `size_dimensions`) não são usados e podem ser None.
+		`nomes`: índices de nomes canônicos (SAP1/SAP2 vazias); sem eles, a etapa
+		de nomes não é aplicada.
+		"""
+		self.colunas = list(colunas) if colunas else [COLUNA_CODIGO_PADRAO, *COLUNAS_MODELO]
+		self.coluna_codigo = self.colunas[0]
+
+		# Join TOTVS como dicionário código -> valores (consultas sem estado compartilhado do pandas)
+		indice, origens = indexar_base_totvs(df_base_totvs, MAPEAMENTO_TOTVS)
+		self._destinos = list(origens)
+		valores = indice[[origens[d] for d in self._destinos]].astype(object)
+		self._totvs = dict(zip(indice.index, valores.itertuples(index=False, name=None)))
+		# colunas que recebem cópia de um destino (ex.: Narrativa <- SAP123)
+		self._replicas = {
+			destino: [c for c in self.colunas if str(c).strip().lower() in regra.get("replicar_em", ())]
+			for destino, regra in MAPEAMENTO_TOTVS.items()
+		}
+		self._colunas_narrativa = self._replicas.get("SAP123", [])
+
+		self._descricoes = carregar_descricoes_totvs(df_base_totvs)
+		self._estruturas = estruturas
+		self._nomes = nomes
+		if estruturas is None:
+			self._termos_traducao = carregar_termos_traducao(df_dicionario_traducoes)
+			self._materiais = materiais
+			self._normas = normas
+			self._indice_size_dimension = construir_indice_size_dimension(size_dimensions)
+
+	@classmethod
+	def carregar(
+		cls,
+		base_totvs: str,
+		dicionario_traducoes: str | Path = DICIONARIO_TRADUCOES,
+		dicionario_materiais: str | Path = DICIONARIO_MATERIAIS,
+		dicionario_normas: str | Path = DICIONARIO_NORMAS,
+		dicionario_size_dimension: str | Path = DICIONARIO_SIZE_DIMENSION,
+		dicionario_nomes_pt: str | Path = DICIONARIO_NOMES_PT,
+		dicionario_nomes_en: str | Path = DICIONARIO_NOMES_EN,
+		modelo: str | Path | None = PLANILHA_MODELO,
+		compactar: bool = False,
+		leitor_paralelo: bool = False,
+		estruturas: str | Path | None = None,
+		memoria_join_mb: float | None = None,
+		caminho_codigos: str | Path | None = None,
+	) -> "MotorEnriquecimento":
+		"""Carrega as fontes em paralelo (como o prefetch do pipeline) e constrói o motor.
+
+		`base_totvs` aceita arquivo, diretório ou glob de fragmentos. Sem `modelo`
+		(ou se ele não existir), as colunas da saída são as do modelo padrão.
+		Com `estruturas` (caminho do arquivo de src/estruturas_compartilhadas.py),
+		nenhum dicionário é lido (nem as listas de nomes e o dicionário de
+		traduções, que vêm do arquivo): só a base TOTVS é carregada por processo.
+		Com `memoria_join_mb`, a base TOTVS não é carregada inteira: o join externo
+		(src/juncao_externa.py) traz só as linhas dos códigos de `caminho_codigos`
+		(CSV de códigos ou planilha gerada), e o motor só atende esses códigos.
+		"""
+		if memoria_join_mb and caminho_codigos is None:
+			raise ValueError("`memoria_join_mb` exige `caminho_codigos` (os códigos a buscar na base TOTVS).")
+		fontes = CarregadorFontes(compactar=compactar)
+		try:
+			if memoria_join_mb:
+				agendar_base_totvs_externa(fontes, base_totvs, caminho_codigos, memoria_join_mb)
+			else:
+				agendar_base_totvs(fontes, base_totvs, leitor_paralelo)
+			if estruturas is None:
+				fontes.agendar("dicionario_traducoes", carregar_dicionario_traducoes, str(dicionario_traducoes))
+				fontes.agendar("dicionario_nomes_pt", carregar_nomes, str(dicionario_nomes_pt))
+				fontes.agendar("dicionario_nomes_en", carregar_nomes, str(dicionario_nomes_en))
+				fontes.agendar("dicionario_materiais", carregar_dicionario, str(dicionario_materiais))
+				fontes.agendar("dicionario_normas", carregar_dicionario_normas, str(dicionario_normas))
+				fontes.agendar("dicionario_size_dimension", carregar_dicionario_size_dimension, str(dicionario_size_dimension))
+
+			colunas = None
+			if modelo is not None and Path(modelo).exists():
+				colunas = [c for c in ler_linha_xlsx(str(modelo), 1) if c is not None]
+
+			if estruturas is not None:
+				mapeadas = EstruturasCompartilhadas(estruturas)
+				return cls(
+					fontes.obter("base_totvs"), None, None, None, None,
+					colunas=colunas,
+					estruturas=mapeadas,
+					nomes=mapeadas.nomes_canonicos(),
+				)
+			nomes = NomesCanonicos(
+				fontes.obter("dicionario_nomes_pt"),
+				fontes.obter("dicionario_nomes_en"),
+				fontes.obter("dicionario_traducoes"),
+			)
+			return cls(
+				fontes.obter("base_totvs"),
+				fontes.obter("dicionario_traducoes"),
+				fontes.obter("dicionario_materiais"),
+				fontes.obter("dicionario_normas"),
+				fontes.obter("dicionario_size_dimension"),
+				colunas=colunas,
+				nomes=nomes,
+			)
+		finally:
+			fontes.encerrar()
+
+	def codigos_totvs(self) -> list:
+		"""Códigos da base TOTVS (primeira ocorrência de cada um), na ordem da base."""
+		return list(self._totvs)
+
+	def textos_com_descricao(self) -> list[str]:
+		"""Códigos (como texto, sem espaços nas pontas) com Descrição na base TOTVS.
+
+		As traduções buscam a Descrição por esse texto, então um código fora do
+		join (ex.: com espaços) ainda pode ter Descrição.
+		"""
+		return list(self._descricoes)
+
+	def entradas_codigo(self, codigo: object) -> tuple:
+		"""Valores da base TOTVS de que a linha do código depende (colunas mapeadas e Descrição)."""
+		return self._totvs.get(codigo), self._descricoes.get(str(codigo).strip())
+
+	def enriquecer_codigo(self, codigo: object) -> dict:
+		"""Linha enriquecida de um código (todas as colunas da saída)."""
+		linha: dict = dict.fromkeys(self.colunas)
+		linha[self.coluna_codigo] = codigo
+
+		# Colunas da base TOTVS (SAP123, SAP6, SAP5) e réplicas
+		valores = self._totvs.get(codigo)
+		for posicao, destino in enumerate(self._destinos):
+			valor = valores[posicao] if valores is not None else float("nan")
+			for coluna in [destino, *self._replicas.get(destino, ())]:
+				if coluna in linha:
+					linha[coluna] = valor
+
+		narrativa = linha.get("SAP123")
+		textos = textos_para_traducao(codigo, self._descricoes, narrativa)
+		if self._estruturas is not None:
+			linha["Coluna4"] = encontrar_material_compartilhado(narrativa, self._estruturas)
+			linha["SAP17"] = encontrar_normas_compartilhado(narrativa, self._estruturas)
+			linha["SAP15"] = encontrar_size_dimension_compartilhado(narrativa, self._estruturas)
+			traducoes = encontrar_traducao_compartilhada(textos, self._estruturas) if textos else None
+		else:
+			linha["Coluna4"] = encontrar_material(narrativa, self._materiais)
+			linha["SAP17"] = encontrar_normas(narrativa, self._normas)
+			linha["SAP15"] = encontrar_size_dimension_indexado(narrativa, self._indice_size_dimension)
+			traducoes = encontrar_traducao(textos, self._termos_traducao) if textos else None
+		if traducoes:
+			for idioma, coluna in COLUNAS_TRADUCAO.items():
+				linha[coluna] = traducoes.get(idioma)
+		# nome canônico onde a tradução não preencheu SAP1/SAP2 (etapa normalizar_nomes do pipeline)
+		if self._nomes is not None:
+			self._nomes.completar(linha, textos)
+
+		# como no pipeline, só com as duas colunas presentes no modelo
+		if _tem_codigo(codigo) and all(c in linha for c in VALORES_FIXOS):
+			linha.update(VALORES_FIXOS)
+		if isinstance(narrativa, str) and len(narrativa) > LIMITE_NARRATIVA:
+			for coluna in self._colunas_narrativa:
+				linha[coluna] = MARCA_NARRATIVA
+		return linha
+
+	def enriquecer(self, codigos, como_registros: bool = False) -> pd.DataFrame | list[dict]:
+		"""Enriquece um lote de códigos, na ordem recebida.
+
+		Retorna um DataFrame com as colunas do modelo (sem a linha descritiva) ou,
+		com `como_registros=True`, uma lista de dicts (um por código).
+		"""
+		linhas = [self.enriquecer_codigo(codigo) for codigo in codigos]
+		if como_registros:
+			return linhas
+		return pd.DataFrame(linhas, columns=self.colunas)
@@ -0,0 +1,304 @@
+"""Nome canônico do item (PT e EN) a partir da Descrição TOTVS / SAP123.
+
+Usa as listas de nomes do projeto (`dados/dicionario_nome_PT.csv` e
+`dados/nomedos_materiais_Ingles.csv`, um nome por linha; `abreviação=nome`
+declara um sinônimo). Cada lista vira uma árvore de tokens construída uma vez:
+os nomes são normalizados (maiúsculas, sem acentos) e quebrados em tokens, e
+cada nome é um caminho na árvore; tokens abreviados no dicionário (`Estacio.`)
+são arestas de prefixo. A partir de cada token do texto, a árvore é descida
+só enquanto há nomes com aquele começo, em vez de comparar o texto com todos
+os nomes.
+
+Regras:
+- Vence o nome com mais tokens; no empate, o que aparece antes no texto e,
+  depois, o que vem antes na lista.
+- Os textos são tentados em ordem (Descrição do TOTVS e depois SAP123), como
+  nas traduções.
+- O nome em inglês é a tradução do nome PT em `dados/dicionario.xlsx`, na
+  grafia da lista EN; sem ela, o nome da lista EN encontrado no próprio texto.
+- A etapa só preenche SAP1/SAP2 que ficaram vazias após as traduções.
+"""
+
+import re
+import time
+import unicodedata
+from collections.abc import Iterable
+
+import pandas as pd
+
+from inserir_traducoes import carregar_descricoes_totvs, carregar_termos_traducao, textos_para_traducao
+from planilha_trabalho import gravar_planilha, ler_planilha
+
+# Tokens: palavras/números, inclusive compostos como NTZ400*180DT50 e 3-1/2
+_TOKEN = re.compile(r"[A-Z0-9]+(?:[*./-][A-Z0-9]+)*\.?")
+# Colunas preenchidas pela etapa: nome em português e em inglês
+COLUNAS_NOME = ("SAP1", "SAP2")
+# Abreviações mais curtas que isso no dicionário são tratadas como token exato
+TAM_MIN_ABREVIACAO = 3
+
+
+def carregar_nomes(caminho: str) -> list[str]:
+	"""Nomes de um dicionário de nomes (um por linha), na ordem do arquivo."""
+	with open(caminho, "r", encoding="utf-8") as arquivo:
+		return [linha.strip() for linha in arquivo if linha.strip()]
+
+
+def normalizar_texto(texto: object) -> str:
+	"""Maiúsculas e sem acentos."""
+	# só letras/dígitos ASCII formam tokens: descartar o que não é ASCII remove os acentos decompostos
+	return unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode("ascii").upper()
+
+
+def tokenizar(texto: object) -> list[str]:
+	return _TOKEN.findall(normalizar_texto(texto))
+
+
+def _chave(texto: object) -> tuple[str, ...]:
+	return tuple(t.rstrip(".") for t in tokenizar(texto))
+
+
+class _No:
+	"""Nó da árvore de tokens: filhos por token exato, filhos abreviados (pelos primeiros
+	caracteres do radical) e o nome que termina aqui."""
+
+	__slots__ = ("filhos", "abreviados", "nome")
+
+	def __init__(self):
+		self.filhos: dict[str, _No] = {}
+		self.abreviados: dict[str, list[tuple[str, _No]]] = {}
+		self.nome: int | None = None
+
+
+class IndiceNomes:
+	"""Árvore de tokens dos nomes de uma lista: cada texto é percorrido uma vez por posição."""
+
+	def __init__(self, nomes: Iterable[str]):
+		t0 = time.perf_counter()
+		self._canonicos: list[str] = []
+		self._por_chave: dict[tuple[str, ...], str] = {}
+		self._raiz = _No()
+
+		for nome in nomes:
+			variante, _, canonico = str(nome).partition("=")
+			canonico = " ".join((canonico or variante).split())
+			for texto in dict.fromkeys((variante, canonico)):
+				tokens = tokenizar(texto)
+				chave = tuple(t.rstrip(".") for t in tokens)
+				if not chave or chave in self._por_chave:
+					continue
+				self._por_chave[chave] = canonico
+				self._canonicos.append(canonico)
+				no = self._raiz
+				for token, radical in zip(tokens, chave):
+					# token terminado em "." no dicionário é abreviação: casa qualquer token que comece por ele
+					if token.endswith(".") and len(radical) >= TAM_MIN_ABREVIACAO:
+						irmaos = no.abreviados.setdefault(radical[:TAM_MIN_ABREVIACAO], [])
+						proximo = next((filho for r, filho in irmaos if r == radical), None)
+						if proximo is None:
+							proximo = _No()
+							irmaos.append((radical, proximo))
+					else:
+						proximo = no.filhos.setdefault(radical, _No())
+					no = proximo
+				if no.nome is None:
+					no.nome = len(self._canonicos) - 1
+		self.construcao_seconds = time.perf_counter() - t0
+
+	def __len__(self) -> int:
+		return len(self._canonicos)
+
+	def canonicos(self) -> list[str]:
+		return list(self._canonicos)
+
+	def canonico_exato(self, texto: object) -> str | None:
+		"""Nome canônico cujo texto inteiro é `texto` (ignorando caixa, acentos e pontuação)."""
+		if not isinstance(texto, str) or not texto.strip():
+			return None
+		return self._por_chave.get(_chave(texto))
+
+	def _mais_longo(self, tokens: tuple[str, ...], inicio: int) -> tuple[int, int] | None:
+		"""(nº de tokens, posição na lista) do nome mais longo que começa em `tokens[inicio]`."""
+		melhor = None
+		pendentes = [(self._raiz, inicio)]
+		while pendentes:
+			no, posicao = pendentes.pop()
+			if no.nome is not None:
+				candidato = (posicao - inicio, -no.nome)
+				if melhor is None or candidato > melhor:
+					melhor = candidato
+			if posicao == len(tokens):
+				continue
+			token = tokens[posicao]
+			filho = no.filhos.get(token)
+			if filho is not None:
+				pendentes.append((filho, posicao + 1))
+			for radical, filho in no.abreviados.get(token[:TAM_MIN_ABREVIACAO], ()):
+				if token.startswith(radical):
+					pendentes.append((filho, posicao + 1))
+		return (melhor[0], -melhor[1]) if melhor is not None else None
+
+	def encontrar(self, texto: object) -> str | None:
+		"""Nome canônico contido em `texto` (mais tokens; no empate, o primeiro no texto e na lista)."""
+		if not isinstance(texto, str) or not texto.strip():
+			return None
+		tokens = _chave(texto)
+		raiz = self._raiz
+		melhor: tuple[int, int, int] | None = None
+		for inicio, token in enumerate(tokens):
+			if token not in raiz.filhos and token[:TAM_MIN_ABREVIACAO] not in raiz.abreviados:
+				continue
+			encontrado = self._mais_longo(tokens, inicio)
+			if encontrado is not None:
+				tamanho, indice = encontrado
+				if melhor is None or (tamanho, -inicio, -indice) > (melhor[0], -melhor[1], -melhor[2]):
+					melhor = (tamanho, inicio, indice)
+		return self._canonicos[melhor[2]] if melhor is not None else None
+
+
+def traducoes_nomes(df_dicionario: pd.DataFrame) -> dict[tuple[str, ...], object]:
+	"""Termo em português (normalizado como os nomes) -> inglês, do dicionário de traduções."""
+	traducoes: dict[tuple[str, ...], object] = {}
+	for palavra_pt, traducao in carregar_termos_traducao(df_dicionario):
+		traducoes.setdefault(_chave(palavra_pt), traducao.get("INGLÊS"))
+	return traducoes
+
+
+def _vazia(valor: object) -> bool:
+	return valor is None or (isinstance(valor, float) and pd.isna(valor)) or not str(valor).strip()
+
+
+class NomesCanonicos:
+	"""Índices das listas PT/EN e traduções dos nomes, construídos uma vez e só lidos depois.
+
+	A tradução de cada nome PT vem de `df_dicionario` ou, já resolvida na grafia
+	da lista EN, de `en_por_pt` (ver `pares_en`; é o que vai para o arquivo de
+	src/estruturas_compartilhadas.py, sem precisar do dicionário de traduções).
+	"""
+
+	def __init__(
+		self,
+		nomes_pt: Iterable[str],
+		nomes_en: Iterable[str],
+		df_dicionario: pd.DataFrame | None = None,
+		en_por_pt: dict[str, str] | None = None,
+	):
+		if (df_dicionario is None) == (en_por_pt is None):
+			raise ValueError("Informe `df_dicionario` ou `en_por_pt` (exatamente um dos dois).")
+		self.nomes_pt = list(nomes_pt)
+		self.nomes_en = list(nomes_en)
+		self.indice_pt = IndiceNomes(self.nomes_pt)
+		self.indice_en = IndiceNomes(self.nomes_en)
+		if en_por_pt is None:
+			traducoes = traducoes_nomes(df_dicionario)
+			en_por_pt = {}
+			for nome_pt in dict.fromkeys(self.indice_pt.canonicos()):
+				nome_en = self.indice_en.canonico_exato(traducoes.get(_chave(nome_pt)))
+				if nome_en is not None:
+					en_por_pt[nome_pt] = nome_en
+		self._en_por_pt = en_por_pt
+		self.construcao_seconds = self.indice_pt.construcao_seconds + self.indice_en.construcao_seconds
+
+	def pares_en(self) -> dict[str, str]:
+		"""Nome PT canônico -> nome EN canônico (só os que têm tradução na lista EN)."""
+		return dict(self._en_por_pt)
+
+	def encontrar(self, textos: list[str], contadores=None) -> tuple[str | None, str | None]:
+		"""(nome PT, nome EN) canônicos do item; `textos` como em `textos_para_traducao`."""
+		inicio = contadores.iniciar() if contadores is not None else 0.0
+		nome_pt = None
+		caminho = "sem_nome"
+		for posicao, texto in enumerate(textos):
+			nome_pt = self.indice_pt.encontrar(texto)
+			if nome_pt is not None:
+				caminho = "descricao" if posicao == 0 else "narrativa"
+				break
+
+		nome_en = self._en_por_pt.get(nome_pt) if nome_pt is not None else None
+		if nome_en is not None:
+			if contadores is not None:
+				contadores.incrementar("en_por_traducao")
+		else:
+			for texto in textos:
+				nome_en = self.indice_en.encontrar(texto)
+				if nome_en is not None:
+					if contadores is not None:
+						contadores.incrementar("en_no_texto")
+					break
+		if contadores is not None:
+			contadores.registrar(caminho, inicio, " | ".join(map(str, textos)))
+		return nome_pt, nome_en
+
+	def completar(self, valores: dict, textos: list[str], contadores=None) -> list[str]:
+		"""Preenche SAP1/SAP2 vazias de `valores` (em lugar); retorna as colunas preenchidas."""
+		vazias = [c for c in COLUNAS_NOME if c in valores and _vazia(valores[c])]
+		if not vazias or not textos:
+			return []
+		nomes = dict(zip(COLUNAS_NOME, self.encontrar(textos, contadores)))
+		preenchidas = [c for c in vazias if nomes[c] is not None]
+		for coluna in preenchidas:
+			valores[coluna] = nomes[coluna]
+		return preenchidas
+
+
+def inserir_nomes_canonicos(
+	caminho_planilha_atualizada: str,
+	df_totvs: pd.DataFrame,
+	df_dicionario: pd.DataFrame,
+	nomes_pt: Iterable[str],
+	nomes_en: Iterable[str],
+	progresso=None,
+	contadores_matcher=None,
+	pesos: list[int] | None = None,
+) -> dict:
+	"""Preenche SAP1 (PT) e SAP2 (EN) vazias com o nome canônico do item.
+
+	Retorna `preenchimento` (linhas que a etapa preencheu, por coluna) e
+	`detalhes` (vazias antes da etapa, tamanho das listas e tempo de construção
+	dos índices).
+	`progresso`/`contadores_matcher` como em `inserir_traducoes`; `pesos`: quantas
+	linhas cada item representa nas contagens (ver src/colapsar_codigos.py).
+	"""
+	print("Normalizando nomes de itens (SAP1/SAP2 vazias)...")
+	df_planilha = ler_planilha(caminho_planilha_atualizada)
+	faltando = [c for c in COLUNAS_NOME if c not in df_planilha.columns]
+	if faltando:
+		raise ValueError(f"A planilha atualizada não contém as colunas {faltando} (não serão criadas automaticamente).")
+
+	nomes = NomesCanonicos(nomes_pt, nomes_en, df_dicionario)
+	mapa_descricoes = carregar_descricoes_totvs(df_totvs)
+	col_codigo = df_planilha.columns[0]
+	col_sap123 = "SAP123" if "SAP123" in df_planilha.columns else None
+
+	vazias = {"sap1_vazias": 0, "sap2_vazias": 0}
+	preenchidas = {"sap1_preenchidas": 0, "sap2_preenchidas": 0}
+	if progresso is not None:
+		progresso.fase("compute", total=len(df_planilha) - 1)
+	for idx in range(1, len(df_planilha)):
+		if progresso is not None:
+			progresso.avancar()
+		peso = pesos[idx - 1] if pesos is not None else 1
+		valores = {c: df_planilha.at[idx, c] for c in COLUNAS_NOME}
+		for coluna, valor in valores.items():
+			vazias[f"{coluna.lower()}_vazias"] += peso * _vazia(valor)
+		textos = textos_para_traducao(
+			df_planilha.at[idx, col_codigo],
+			mapa_descricoes,
+			df_planilha.at[idx, col_sap123] if col_sap123 is not None else None,
+		)
+		for coluna in nomes.completar(valores, textos, contadores_matcher):
+			df_planilha.at[idx, coluna] = valores[coluna]
+			preenchidas[f"{coluna.lower()}_preenchidas"] += peso
+
+	if progresso is not None:
+		progresso.fase("write")
+	gravar_planilha(df_planilha, caminho_planilha_atualizada)
+	print(f"Nomes canônicos preenchidos: SAP1={preenchidas['sap1_preenchidas']}, SAP2={preenchidas['sap2_preenchidas']}")
+	return {
+		"preenchimento": preenchidas,
+		"detalhes": {
+			**vazias,
+			"indices_seconds": round(nomes.construcao_seconds, 4),
+			"nomes_pt": len(nomes.indice_pt),
+			"nomes_en": len(nomes.indice_en),
+		},
+	}
@@ -0,0 +1,38 @@
+"""Leitura e gravação da planilha de trabalho do pipeline.
+
+As etapas leem e regravam a planilha inteira a cada passo. Até o limite de
+linhas do Excel, a planilha de trabalho é a própria saída `.xlsx`; acima dele
+o `.xlsx` não pode ser gravado, então a planilha de trabalho passa a ser um
+arquivo intermediário `.pkl` (pickle do DataFrame) e só os fragmentos finais
+(src/fragmentar_saida.py) são gravados em Excel.
+
+O intermediário reproduz o que a ida e volta pelo Excel faz com os valores
+que as etapas observam: textos vazios voltam como ausentes (NaN).
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Extensão da planilha de trabalho acima do limite do Excel
+EXTENSAO_INTERMEDIARIA = ".pkl"
+
+
+def intermediaria(caminho: str | Path) -> bool:
+	return Path(caminho).suffix == EXTENSAO_INTERMEDIARIA
+
+
+def ler_planilha(caminho: str | Path) -> pd.DataFrame:
+	"""Equivalente a `pd.read_excel(caminho)` para a planilha de trabalho (`.xlsx` ou `.pkl`)."""
+	if intermediaria(caminho):
+		return pd.read_pickle(caminho)
+	return pd.read_excel(caminho)
+
+
+def gravar_planilha(df: pd.DataFrame, caminho: str | Path) -> None:
+	"""Equivalente a `df.to_excel(caminho, index=False)` para a planilha de trabalho (`.xlsx` ou `.pkl`)."""
+	if intermediaria(caminho):
+		df.replace("", np.nan).reset_index(drop=True).to_pickle(caminho)
+	else:
+		df.to_excel(caminho, index=False)
@@ -0,0 +1,101 @@
+"""Telemetria de progresso para os laços por linha das etapas longas.
+
+Os laços chamam `avancar()` a cada linha; o custo é um incremento e uma
+comparação de inteiros. O relógio só é consultado a cada `passo` linhas, e o
+passo se ajusta à taxa observada para que a amostragem ocorra poucas vezes por
+intervalo. A cada intervalo, o estado (linhas feitas, linhas/s, ETA e fase)
+é impresso no console e, opcionalmente, gravado em um arquivo JSON que pode
+ser consultado por um agendador.
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+class Progresso:
+	"""Progresso de uma etapa: fases `load` / `compute` / `write` e contagem de linhas."""
+
+	def __init__(
+		self,
+		etapa: str,
+		arquivo: str | Path | None = None,
+		intervalo_seconds: float = 5.0,
+	):
+		self.etapa = etapa
+		self.arquivo = Path(arquivo) if arquivo else None
+		self.intervalo_seconds = intervalo_seconds
+		self.fase_atual = "load"
+		self.total = 0
+		self.feitos = 0
+		self._inicio_fase = time.monotonic()
+		self._ultima_emissao = self._inicio_fase
+		self._passo = 1
+		self._proxima_verificacao = 1
+		self._gravar()
+
+	def fase(self, nome: str, total: int | None = None) -> None:
+		"""Muda de fase (load/compute/write); `total` reinicia a contagem de linhas."""
+		self.fase_atual = nome
+		self._inicio_fase = time.monotonic()
+		if total is not None:
+			self.total = int(total)
+			self.feitos = 0
+			self._passo = 1
+			self._proxima_verificacao = 1
+		self._gravar()
+
+	def avancar(self, n: int = 1) -> None:
+		self.feitos += n
+		if self.feitos < self._proxima_verificacao:
+			return
+		agora = time.monotonic()
+		decorrido = agora - self._inicio_fase
+		taxa = self.feitos / decorrido if decorrido > 0 else 0.0
+		# ~10 consultas ao relógio por intervalo, independente da velocidade do laço;
+		# o passo no máximo dobra a cada consulta (as primeiras linhas podem ser atípicas)
+		self._passo = min(max(1, int(taxa * self.intervalo_seconds / 10)), self._passo * 2)
+		self._proxima_verificacao = self.feitos + self._passo
+		if agora - self._ultima_emissao >= self.intervalo_seconds:
+			self._ultima_emissao = agora
+			self._emitir()
+
+	def concluir(self) -> None:
+		self.fase_atual = "done"
+		self._gravar()
+
+	def estado(self) -> dict:
+		decorrido = time.monotonic() - self._inicio_fase
+		taxa = self.feitos / decorrido if decorrido > 0 else 0.0
+		restantes = max(self.total - self.feitos, 0)
+		return {
+			"etapa": self.etapa,
+			"fase": self.fase_atual,
+			"feitos": self.feitos,
+			"total": self.total,
+			"linhas_por_segundo": round(taxa, 1),
+			"eta_seconds": round(restantes / taxa, 1) if taxa > 0 else None,
+			"atualizado_em": datetime.now().astimezone().isoformat(timespec="seconds"),
+			"pid": os.getpid(),
+		}
+
+	def _emitir(self) -> None:
+		estado = self.estado()
+		eta = f"{estado['eta_seconds']:.0f}s" if estado["eta_seconds"] is not None else "?"
+		print(
+			f"[{self.etapa}] {self.fase_atual}: {self.feitos}/{self.total} linhas "
+			f"({estado['linhas_por_segundo']:.1f} linhas/s, ETA {eta})"
+		)
+		self._gravar(estado)
+
+	def _gravar(self, estado: dict | None = None) -> None:
+		if self.arquivo is None:
+			return
+		estado = estado or self.estado()
+		self.arquivo.parent.mkdir(parents=True, exist_ok=True)
+		# escrita atômica: o agendador nunca lê um JSON pela metade
+		temporario = self.arquivo.with_name(self.arquivo.name + ".tmp")
+		temporario.write_text(json.dumps(estado, ensure_ascii=False), encoding="utf-8")
+		os.replace(temporario, self.arquivo)
@@ -0,0 +1,340 @@
+"""Tabela materializada com o enriquecimento de todos os itens da base TOTVS.
+
+Tudo o que o pipeline calcula por código (colunas TOTVS, materiais, normas,
+size dimension, traduções, valores fixos e a marca da narrativa) depende só da
+linha TOTVS do item e dos dicionários. Este módulo enriquece todos os itens da
+base uma vez (ex.: à noite, em paralelo) e grava o resultado em uma tabela
+SQLite indexada pelo código; `main/app.py --tabela-enriquecimento` preenche a
+planilha por consulta, calculando ao vivo apenas o que mudou:
+
+- a tabela guarda a impressão digital (SHA-256) de cada fonte e a versão das
+  regras; se um dicionário, as regras ou as colunas do modelo mudaram, a tabela
+  não é usada (o pipeline roda completo);
+- com a base TOTVS inalterada, todos os códigos saem da tabela (inclusive os
+  que não existem na base), exceto os fora do join cujo texto tem Descrição na
+  base (ex.: código com espaços nas pontas), calculados ao vivo;
+- com a base TOTVS alterada, cada código é conferido pela assinatura da sua
+  linha TOTVS: só os códigos novos ou alterados são calculados ao vivo.
+
+Uso (a partir da raiz do projeto):
+
+    python src/tabela_enriquecimento.py --saida cache/tabela_enriquecimento.sqlite
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from carregar_fontes import resolver_fragmentos_totvs
+from motor_enriquecimento import MotorEnriquecimento
+from planilha_trabalho import gravar_planilha, ler_planilha
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+TABELA_PADRAO = BASE_DIR / "cache/tabela_enriquecimento.sqlite"
+
+# Incrementar quando alguma regra de preenchimento mudar (invalida tabelas antigas)
+VERSAO_REGRAS = 3
+# Códigos por tarefa no cálculo paralelo e por consulta `IN (...)` no SQLite
+CODIGOS_POR_LOTE = 2000
+CODIGOS_POR_CONSULTA = 500
+# Código inexistente na base, usado para gravar a linha de "item sem cadastro"
+CODIGO_SEM_CADASTRO = "\x00sem_cadastro"
+
+# Estado de cada processo do cálculo paralelo (preenchido por `_iniciar_trabalhador`)
+_MOTOR: dict = {}
+
+
+def impressao_arquivo(caminho: str | Path) -> str:
+	"""SHA-256 do conteúdo do arquivo."""
+	h = hashlib.sha256()
+	with open(caminho, "rb") as f:
+		for bloco in iter(lambda: f.read(1024 * 1024), b""):
+			h.update(bloco)
+	return h.hexdigest()
+
+
+def impressoes_fontes(
+	base_totvs: str,
+	dicionario_traducoes: str | Path,
+	dicionario_materiais: str | Path,
+	dicionario_normas: str | Path,
+	dicionario_size_dimension: str | Path,
+	dicionario_nomes_pt: str | Path,
+	dicionario_nomes_en: str | Path,
+) -> dict[str, str]:
+	"""Impressão digital de cada fonte (a base TOTVS fragmentada vira uma só, na ordem dos fragmentos)."""
+	fragmentos = resolver_fragmentos_totvs(str(base_totvs))
+	totvs = hashlib.sha256("\n".join(impressao_arquivo(f) for f in fragmentos).encode()).hexdigest()
+	return {
+		"base_totvs": totvs,
+		"dicionario_traducoes": impressao_arquivo(dicionario_traducoes),
+		"dicionario_materiais": impressao_arquivo(dicionario_materiais),
+		"dicionario_normas": impressao_arquivo(dicionario_normas),
+		"dicionario_size_dimension": impressao_arquivo(dicionario_size_dimension),
+		"dicionario_nomes_pt": impressao_arquivo(dicionario_nomes_pt),
+		"dicionario_nomes_en": impressao_arquivo(dicionario_nomes_en),
+	}
+
+
+def _para_json(valor: object) -> object:
+	if isinstance(valor, np.generic):
+		return valor.item()
+	if isinstance(valor, pd.Timestamp):
+		return valor.isoformat()
+	return valor
+
+
+def chave_codigo(codigo: object) -> str:
+	"""Chave do código na tabela (preserva o tipo: "123" e 123 são códigos diferentes, como no join)."""
+	return json.dumps(_para_json(codigo), ensure_ascii=False, default=str)
+
+
+def assinatura_entradas(entradas: tuple) -> str:
+	"""Assinatura da linha TOTVS de um código (ver `MotorEnriquecimento.entradas_codigo`)."""
+	texto = json.dumps(entradas, ensure_ascii=False, default=_para_json)
+	return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+def _registro(motor: MotorEnriquecimento, codigo: object) -> tuple[str, str, str]:
+	linha = motor.enriquecer_codigo(codigo)
+	valores = [_para_json(linha[c]) for c in motor.colunas[1:]]
+	return (
+		chave_codigo(codigo),
+		assinatura_entradas(motor.entradas_codigo(codigo)),
+		json.dumps(valores, ensure_ascii=False, default=str),
+	)
+
+
+def _iniciar_trabalhador(motor: MotorEnriquecimento) -> None:
+	_MOTOR["motor"] = motor
+
+
+def _enriquecer_lote(codigos: list) -> list[tuple[str, str, str]]:
+	motor = _MOTOR["motor"]
+	return [_registro(motor, codigo) for codigo in codigos]
+
+
+def construir_tabela(
+	caminho: str | Path,
+	motor: MotorEnriquecimento,
+	impressoes: dict[str, str],
+	max_workers: int | None = None,
+) -> dict:
+	"""Enriquece todos os códigos da base TOTVS do `motor` e grava a tabela em `caminho`.
+
+	O motor é copiado uma vez para cada processo (`max_workers`, padrão: núcleos
+	da máquina); a gravação é atômica (arquivo temporário + troca).
+	"""
+	t0 = time.perf_counter()
+	caminho = Path(caminho)
+	caminho.parent.mkdir(parents=True, exist_ok=True)
+	temporario = caminho.with_name(caminho.name + ".tmp")
+	temporario.unlink(missing_ok=True)
+
+	codigos = motor.codigos_totvs()
+	lotes = [codigos[i : i + CODIGOS_POR_LOTE] for i in range(0, len(codigos), CODIGOS_POR_LOTE)]
+	processos = min(max_workers or os.cpu_count() or 1, max(1, len(lotes)))
+
+	conexao = sqlite3.connect(temporario)
+	try:
+		conexao.execute("CREATE TABLE meta (chave TEXT PRIMARY KEY, valor TEXT NOT NULL)")
+		conexao.execute(
+			"CREATE TABLE enriquecimento (codigo TEXT PRIMARY KEY, assinatura TEXT NOT NULL, valores TEXT NOT NULL)"
+			" WITHOUT ROWID"
+		)
+		conexao.execute("CREATE TABLE descricoes (texto TEXT PRIMARY KEY) WITHOUT ROWID")
+		conexao.executemany("INSERT OR IGNORE INTO descricoes VALUES (?)", [(t,) for t in motor.textos_com_descricao()])
+		inserir = "INSERT OR IGNORE INTO enriquecimento VALUES (?, ?, ?)"
+		if processos <= 1:
+			for lote in lotes:
+				conexao.executemany(inserir, [_registro(motor, c) for c in lote])
+		else:
+			with ProcessPoolExecutor(
+				max_workers=processos, initializer=_iniciar_trabalhador, initargs=(motor,),
+			) as executor:
+				for registros in executor.map(_enriquecer_lote, lotes):
+					conexao.executemany(inserir, registros)
+
+		meta = {
+			"versao_regras": VERSAO_REGRAS,
+			"fontes": impressoes,
+			"colunas": [str(c) for c in motor.colunas],
+			# linhas de códigos fora da base TOTVS (dependem só de haver código)
+			"sem_cadastro": json.loads(_registro(motor, CODIGO_SEM_CADASTRO)[2]),
+			"sem_codigo": json.loads(_registro(motor, None)[2]),
+			"itens": len(codigos),
+			"construida_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+		}
+		conexao.executemany(
+			"INSERT INTO meta VALUES (?, ?)",
+			[(chave, json.dumps(valor, ensure_ascii=False)) for chave, valor in meta.items()],
+		)
+		conexao.commit()
+	finally:
+		conexao.close()
+	os.replace(temporario, caminho)
+
+	return {
+		"tabela": str(caminho),
+		"itens": len(codigos),
+		"processos": processos,
+		"bytes": caminho.stat().st_size,
+		"duracao_seconds": round(time.perf_counter() - t0, 3),
+	}
+
+
+class TabelaEnriquecimento:
+	"""Tabela gravada por `construir_tabela`, aberta somente para leitura."""
+
+	def __init__(self, caminho: str | Path = TABELA_PADRAO):
+		if not Path(caminho).exists():
+			raise FileNotFoundError(f"Tabela de enriquecimento não encontrada: {caminho}")
+		self.caminho = Path(caminho)
+		self._conexao = sqlite3.connect(f"{self.caminho.resolve().as_uri()}?mode=ro", uri=True)
+		self.meta = {
+			chave: json.loads(valor) for chave, valor in self._conexao.execute("SELECT chave, valor FROM meta")
+		}
+		self.colunas: list[str] = self.meta["colunas"]
+
+	def invalidacoes(self, impressoes: dict[str, str], colunas: list) -> list[str]:
+		"""O que mudou desde a construção e impede o uso da tabela (fora a base TOTVS)."""
+		motivos = []
+		if self.meta.get("versao_regras") != VERSAO_REGRAS:
+			motivos.append("versao_regras")
+		if [str(c) for c in colunas] != self.colunas:
+			motivos.append("colunas_modelo")
+		fontes = self.meta.get("fontes", {})
+		motivos.extend(nome for nome, valor in impressoes.items() if nome != "base_totvs" and fontes.get(nome) != valor)
+		return motivos
+
+	def totvs_inalterada(self, impressoes: dict[str, str]) -> bool:
+		return self.meta.get("fontes", {}).get("base_totvs") == impressoes.get("base_totvs")
+
+	def consultar(self, codigos) -> dict[str, tuple[str, list]]:
+		"""Chave do código -> (assinatura, valores das colunas após o código), para os códigos gravados."""
+		chaves = list(dict.fromkeys(chave_codigo(c) for c in codigos))
+		encontrados: dict[str, tuple[str, list]] = {}
+		for i in range(0, len(chaves), CODIGOS_POR_CONSULTA):
+			lote = chaves[i : i + CODIGOS_POR_CONSULTA]
+			consulta = (
+				"SELECT codigo, assinatura, valores FROM enriquecimento "
+				f"WHERE codigo IN ({', '.join('?' * len(lote))})"
+			)
+			for chave, assinatura, valores in self._conexao.execute(consulta, lote):
+				encontrados[chave] = (assinatura, json.loads(valores))
+		return encontrados
+
+	def com_descricao(self, codigos) -> set[str]:
+		"""Textos (sem espaços nas pontas) dos `codigos` que têm Descrição na base TOTVS da construção."""
+		textos = [t for t in dict.fromkeys(str(c).strip() for c in codigos) if t and t.lower() != "nan"]
+		encontrados: set[str] = set()
+		for i in range(0, len(textos), CODIGOS_POR_CONSULTA):
+			lote = textos[i : i + CODIGOS_POR_CONSULTA]
+			consulta = f"SELECT texto FROM descricoes WHERE texto IN ({', '.join('?' * len(lote))})"
+			encontrados.update(texto for (texto,) in self._conexao.execute(consulta, lote))
+		return encontrados
+
+	def linha_fora_da_base(self, codigo: object) -> list:
+		"""Valores de um código que não existe na base TOTVS da construção."""
+		tem_codigo = codigo is not None and codigo != "" and not (isinstance(codigo, float) and pd.isna(codigo))
+		return self.meta["sem_cadastro"] if tem_codigo else self.meta["sem_codigo"]
+
+	def fechar(self) -> None:
+		self._conexao.close()
+
+
+def preencher_planilha(caminho_planilha: str | Path, tabela: TabelaEnriquecimento, impressoes: dict[str, str], carregar_motor) -> dict:
+	"""Preenche a planilha gerada (códigos + linha descritiva) a partir da tabela.
+
+	`carregar_motor()` só é chamado se algum código precisar de cálculo ao vivo
+	(base TOTVS alterada ou código fora do join com Descrição). Se a tabela estiver inválida, a planilha não é
+	alterada e o resultado traz `usada=False` e os motivos.
+	"""
+	df = ler_planilha(caminho_planilha)
+	motivos = tabela.invalidacoes(impressoes, list(df.columns))
+	if motivos:
+		return {"usada": False, "motivos": motivos, "da_tabela": 0, "ao_vivo": 0}
+
+	codigos = df.iloc[1:, 0].tolist()
+	gravados = tabela.consultar(codigos)
+	totvs_inalterada = tabela.totvs_inalterada(impressoes)
+	com_descricao = tabela.com_descricao(c for c in codigos if chave_codigo(c) not in gravados)
+	motor = None
+
+	def obter_motor() -> MotorEnriquecimento:
+		nonlocal motor
+		if motor is None:
+			motor = carregar_motor()
+		return motor
+
+	linhas = [df.iloc[0].tolist()]
+	ao_vivo = 0
+	for codigo in codigos:
+		gravado = gravados.get(chave_codigo(codigo))
+		if gravado is None and totvs_inalterada and str(codigo).strip() not in com_descricao:
+			valores = tabela.linha_fora_da_base(codigo)
+		elif gravado is not None and (
+			totvs_inalterada or gravado[0] == assinatura_entradas(obter_motor().entradas_codigo(codigo))
+		):
+			valores = gravado[1]
+		else:
+			linha = obter_motor().enriquecer_codigo(codigo)
+			valores = [linha[c] for c in motor.colunas[1:]]
+			ao_vivo += 1
+		linhas.append([codigo, *valores])
+
+	gravar_planilha(pd.DataFrame(linhas, columns=df.columns), caminho_planilha)
+	return {
+		"usada": True,
+		"motivos": [] if totvs_inalterada else ["base_totvs"],
+		"da_tabela": len(codigos) - ao_vivo,
+		"ao_vivo": ao_vivo,
+	}
+
+
+def main(argv: list[str] | None = None) -> int:
+	parser = argparse.ArgumentParser(description="Enriquece todos os itens da base TOTVS e grava a tabela materializada.")
+	parser.add_argument("--saida", default=str(TABELA_PADRAO))
+	parser.add_argument("--base-totvs", default=str(BASE_DIR / "planilhas/base_dados_TOTVS.xlsx"))
+	parser.add_argument("--traducoes", default=str(BASE_DIR / "dados/dicionario.xlsx"))
+	parser.add_argument("--materiais", default=str(BASE_DIR / "dados/dicionario_materiais.csv"))
+	parser.add_argument("--normas", default=str(BASE_DIR / "dados/dicionario_normas.csv"))
+	parser.add_argument("--size-dimension", default=str(BASE_DIR / "dados/dicionario_size_dimension.csv"))
+	parser.add_argument("--nomes-pt", default=str(BASE_DIR / "dados/dicionario_nome_PT.csv"))
+	parser.add_argument("--nomes-en", default=str(BASE_DIR / "dados/nomedos_materiais_Ingles.csv"))
+	parser.add_argument("--modelo", default=str(BASE_DIR / "planilhas/planilha_padrao.xlsx"))
+	parser.add_argument("--workers", type=int, default=None, help="Processos do cálculo (padrão: núcleos da máquina).")
+	parser.add_argument("--leitor-paralelo", action="store_true", help="Lê a base TOTVS em faixas paralelas.")
+	args = parser.parse_args(argv)
+
+	# impressões antes da carga: uma fonte alterada durante a construção invalida a tabela
+	impressoes = impressoes_fontes(
+		args.base_totvs, args.traducoes, args.materiais, args.normas, args.size_dimension, args.nomes_pt, args.nomes_en,
+	)
+	motor = MotorEnriquecimento.carregar(
+		args.base_totvs,
+		dicionario_traducoes=args.traducoes,
+		dicionario_materiais=args.materiais,
+		dicionario_normas=args.normas,
+		dicionario_size_dimension=args.size_dimension,
+		dicionario_nomes_pt=args.nomes_pt,
+		dicionario_nomes_en=args.nomes_en,
+		modelo=args.modelo,
+		leitor_paralelo=args.leitor_paralelo,
+	)
+	resumo = construir_tabela(args.saida, motor, impressoes, max_workers=args.workers)
+	print(json.dumps(resumo, ensure_ascii=False, indent=2))
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
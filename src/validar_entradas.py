@@ -0,0 +1,144 @@
+"""Validação rápida (pre-flight) das entradas do pipeline.
+
+Lê apenas os cabeçalhos das planilhas (em streaming, via src/leitor_xlsx.py)
+e verifica a codificação dos CSVs, para que colunas ausentes ou arquivos
+ilegíveis sejam apontados antes de qualquer etapa pesada.
+"""
+
+import re
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from inserir_colunas_totvs import MAPEAMENTO_TOTVS, resolver_colunas_totvs
+from leitor_xlsx import ler_linha_xlsx
+
+# Colunas que o pipeline preenche na planilha (modelo, linha 1)
+COLUNAS_MODELO = (
+	"SAP10", "SAP5", "SAP14", "SAP1", "SAP2", "SAP3", "Coluna32",
+	"SAP6", "SAP15", "Coluna4", "SAP17", "SAP123", "Narrativa",
+)
+# Sem estas a execução falha (SAP123 alimenta os matchers; SAP1/2/3/Coluna32, as
+# traduções). A falta das demais é aviso: as etapas que as preenchem só avisam
+# (valores fixos, narrativas) ou criam a coluna (TOTVS, matchers).
+COLUNAS_MODELO_OBRIGATORIAS = ("SAP123", "SAP1", "SAP2", "SAP3", "Coluna32")
+# Linha do cabeçalho real na base TOTVS (header=4 no pandas)
+LINHA_CABECALHO_TOTVS = 5
+
+
+def _norm(valor: object) -> str:
+	return re.sub(r"\s+", "", str(valor or "")).upper()
+
+
+def _problema(fonte: str, nivel: str, mensagem: str) -> dict:
+	return {"fonte": fonte, "nivel": nivel, "mensagem": mensagem}
+
+
+def validar_cabecalho_modelo(caminho: Path) -> list[dict]:
+	cabecalho = {_norm(c) for c in ler_linha_xlsx(str(caminho), 1) if c is not None}
+	faltando = [c for c in COLUNAS_MODELO if _norm(c) not in cabecalho]
+	problemas = []
+	for nivel, colunas in (
+		("erro", [c for c in faltando if c in COLUNAS_MODELO_OBRIGATORIAS]),
+		("aviso", [c for c in faltando if c not in COLUNAS_MODELO_OBRIGATORIAS]),
+	):
+		if colunas:
+			problemas.append(_problema(str(caminho), nivel, f"Colunas ausentes na linha 1: {colunas}"))
+	return problemas
+
+
+def validar_cabecalho_totvs(caminho: Path) -> list[dict]:
+	problemas = []
+	cabecalho = [c for c in ler_linha_xlsx(str(caminho), LINHA_CABECALHO_TOTVS) if c is not None]
+	if not cabecalho:
+		return [_problema(str(caminho), "erro", f"Linha {LINHA_CABECALHO_TOTVS} (cabeçalho TOTVS) vazia.")]
+
+	# mesmas regras de resolução usadas pelo join, aplicadas a um DataFrame vazio
+	vazio = pd.DataFrame(columns=cabecalho)
+	if not any(str(c).strip().lower() == "item" for c in cabecalho):
+		problemas.append(_problema(str(caminho), "aviso", "Coluna 'Item' não encontrada; será usado fallback por nome."))
+	for destino, regra in MAPEAMENTO_TOTVS.items():
+		try:
+			resolver_colunas_totvs(vazio, {destino: regra})
+		except ValueError as exc:
+			problemas.append(_problema(str(caminho), "erro", str(exc)))
+	if not any("descr" in str(c).lower() for c in cabecalho):
+		problemas.append(_problema(
+			str(caminho), "aviso", "Coluna 'Descrição' não encontrada; traduções usarão apenas SAP123.",
+		))
+	return problemas
+
+
+def validar_cabecalho_traducoes(caminho: Path) -> list[dict]:
+	problemas = []
+	cabecalho = [_norm(c) for c in ler_linha_xlsx(str(caminho), 1) if c is not None]
+	for coluna, nivel in (("PORTUGUÊS", "erro"), ("INGLÊS", "aviso"), ("ESPANHOL", "aviso"), ("ALEMÂO", "aviso")):
+		# alguns arquivos vêm com sufixos tipo _X000D_
+		if not any(c.startswith(_norm(coluna)) for c in cabecalho):
+			problemas.append(_problema(str(caminho), nivel, f"Coluna '{coluna}' não encontrada no cabeçalho."))
+	return problemas
+
+
+def validar_csv(caminho: Path) -> list[dict]:
+	"""Verifica se o CSV é UTF-8 válido (codificação usada pelos carregadores)."""
+	conteudo = caminho.read_bytes()
+	if conteudo.startswith(b"\xef\xbb\xbf"):
+		return [_problema(str(caminho), "aviso", "Arquivo com BOM UTF-8; o primeiro termo terá um caractere invisível.")]
+	try:
+		texto = conteudo.decode("utf-8")
+	except UnicodeDecodeError as exc:
+		linha = conteudo[: exc.start].count(b"\n") + 1
+		return [_problema(str(caminho), "erro", f"Codificação não é UTF-8 (byte inválido na linha {linha}).")]
+	if not texto.strip():
+		return [_problema(str(caminho), "erro", "Arquivo vazio.")]
+	return []
+
+
+def validar_entradas(
+	modelo: Path,
+	csv_codigos: Path,
+	saida: Path,
+	fragmentos_totvs: list[Path],
+	dicionario_traducoes: Path,
+	dicionarios_csv: list[Path],
+) -> dict:
+	"""Executa todas as verificações e retorna {"problemas": [...], "erros": n, "duracao_seconds": s}."""
+	t0 = time.perf_counter()
+	problemas: list[dict] = []
+
+	def verificar(caminho: Path, fn) -> None:
+		if not caminho.exists():
+			problemas.append(_problema(str(caminho), "erro", "Arquivo não encontrado."))
+			return
+		try:
+			problemas.extend(fn(caminho))
+		except Exception as exc:
+			problemas.append(_problema(str(caminho), "erro", f"Falha ao ler: {type(exc).__name__}: {exc}"))
+
+	# Sem modelo/CSV o pipeline reaproveita a planilha de trabalho existente
+	if modelo.exists() and csv_codigos.exists():
+		verificar(modelo, validar_cabecalho_modelo)
+		verificar(csv_codigos, validar_csv)
+	elif saida.exists():
+		problemas.append(_problema(
+			str(modelo), "aviso", "Modelo ou CSV de códigos ausente; será usada a planilha de trabalho existente.",
+		))
+		verificar(saida, validar_cabecalho_modelo)
+	else:
+		for caminho in (modelo, csv_codigos):
+			if not caminho.exists():
+				problemas.append(_problema(str(caminho), "erro", "Arquivo não encontrado."))
+
+	for fragmento in fragmentos_totvs:
+		verificar(fragmento, validar_cabecalho_totvs)
+	verificar(dicionario_traducoes, validar_cabecalho_traducoes)
+	for caminho in dicionarios_csv:
+		verificar(caminho, validar_csv)
+
+	return {
+		"problemas": problemas,
+		"erros": sum(1 for p in problemas if p["nivel"] == "erro"),
+		"avisos": sum(1 for p in problemas if p["nivel"] == "aviso"),
+		"duracao_seconds": round(time.perf_counter() - t0, 3),
+	}
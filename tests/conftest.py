@@ -0,0 +1,8 @@
+"""Configuração dos testes: os módulos do pipeline ficam em src/ (mesmo esquema de main/app.py)."""
+
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+if str(SRC_DIR) not in sys.path:
+	sys.path.insert(0, str(SRC_DIR))
@@ -0,0 +1,97 @@
+"""`--atualizar-colunas` depois de editar um dicionário == execução completa com o dicionário editado.
+
+Cada execução roda `main/app.py` em uma cópia do projeto (os caminhos do
+pipeline são relativos à raiz), com os dados mínimos de tests/dados/atualizacao.
+"""
+
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+RAIZ = Path(__file__).resolve().parent.parent
+DADOS = Path(__file__).resolve().parent / "dados" / "atualizacao"
+
+# Base TOTVS: linhas 1-4 de capa, cabeçalho na linha 5
+BASE_TOTVS = [
+	("Item", "Descrição", "UN", "Fam Coml", "Narrativa Item"),
+	("PRF001", "Parafuso Sextavado", "PC", "FIX-A", "PARAFUSO M10 x 30 AISI 304 DIN 933 A2"),
+	("ARR002", "Arruela Lisa", "PC", "FIX-A", "ARRUELA M12 ACO CARBONO DIN 125"),
+	("VED003", "Anel de Vedação", "UN", "VED-B", "ANEL 10,00 / x 2,00mm LATAO NBR 5422"),
+	("PRF004", "Parafuso Sextavado", "KG", "FIX-A", "PARAFUSO ISO 4017 AISI 316"),
+]
+TRADUCOES = [
+	("PORTUGUÊS", "INGLÊS", "ESPANHOL", "ALEMÂO"),
+	("Parafuso Sextavado", "Hex Screw", "Tornillo Hexagonal", "Sechskantschraube"),
+	("Arruela Lisa", "Flat Washer", "Arandela Plana", "Unterlegscheibe"),
+]
+
+
+def _xlsx(caminho: Path, linhas, linhas_capa: int = 0) -> None:
+	wb = Workbook()
+	ws = wb.active
+	for _ in range(linhas_capa):
+		ws.append(["Relatório de itens"])
+	for linha in linhas:
+		ws.append(list(linha))
+	wb.save(caminho)
+
+
+def _projeto(destino: Path) -> Path:
+	shutil.copytree(RAIZ / "main", destino / "main", ignore=shutil.ignore_patterns("__pycache__"))
+	shutil.copytree(RAIZ / "src", destino / "src", ignore=shutil.ignore_patterns("__pycache__"))
+	(destino / "planilhas").mkdir()
+	shutil.copy(RAIZ / "planilhas/planilha_padrao.xlsx", destino / "planilhas/planilha_padrao.xlsx")
+	_xlsx(destino / "planilhas/base_dados_TOTVS.xlsx", BASE_TOTVS, linhas_capa=4)
+
+	dados = destino / "dados"
+	dados.mkdir()
+	shutil.copy(DADOS / "codigos.csv", dados / "dados_teste.csv")
+	for nome in (
+		"dicionario_materiais.csv",
+		"dicionario_normas.csv",
+		"dicionario_size_dimension.csv",
+		"dicionario_nome_PT.csv",
+		"nomedos_materiais_Ingles.csv",
+	):
+		shutil.copy(DADOS / nome, dados / nome)
+	_xlsx(dados / "dicionario.xlsx", TRADUCOES)
+	return destino
+
+
+def _executar(projeto: Path, *argumentos: str) -> None:
+	resultado = subprocess.run(
+		[sys.executable, "main/app.py", *argumentos], cwd=projeto, capture_output=True, text=True, timeout=300,
+	)
+	assert resultado.returncode == 0, resultado.stdout[-2000:] + resultado.stderr[-2000:]
+
+
+def _planilha(projeto: Path) -> pd.DataFrame:
+	return pd.read_excel(projeto / "planilhas/planilha_atualizada.xlsx")
+
+
+@pytest.mark.parametrize(
+	("fonte", "coluna"), [("dicionario_normas.csv", "SAP17"), ("dicionario_materiais.csv", "Coluna4")],
+)
+def test_atualizacao_parcial_igual_a_execucao_completa(tmp_path, fonte, coluna):
+	atualizado = _projeto(tmp_path / "atualizado")
+	_executar(atualizado)
+	antes = _planilha(atualizado)
+
+	editado = DADOS / fonte.replace(".csv", "_editado.csv")
+	shutil.copy(editado, atualizado / "dados" / fonte)
+	_executar(atualizado, "--atualizar-colunas")
+
+	completo = _projeto(tmp_path / "completo")
+	shutil.copy(editado, completo / "dados" / fonte)
+	_executar(completo)
+
+	depois = _planilha(atualizado)
+	pd.testing.assert_frame_equal(depois, _planilha(completo))
+	# a edição mudou a coluna da fonte (senão o teste não provaria nada), e só ela
+	alteradas = [c for c in antes.columns if not antes[c].equals(depois[c])]
+	assert alteradas == [coluna]
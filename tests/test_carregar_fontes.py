@@ -0,0 +1,52 @@
+"""Modo compacto: a representação muda, o resultado das etapas não."""
+
+import pickle
+
+import pandas as pd
+
+from carregar_fontes import TermosCompactos, compactar_dataframe, compactar_fonte, medir_memoria
+from inserir_colunas_totvs import aplicar_mapeamento_totvs
+from inserir_material import encontrar_material
+
+
+def test_codigo_inteiro_continua_sem_casar_com_texto():
+	# base lida do Excel: um código numérico vira int, os demais ficam str
+	base = pd.DataFrame({
+		"Item": [123456, "NOP0248", "NOP0261", "NOP0262"],
+		"UN": ["PC", "PC", "KG", "PC"],
+		"Fam Coml": ["PCP-P", "PCP-P", "PCP-P", "PCP-Q"],
+		"Narrativa Item": ["TUBO A", "TUBO B", "TUBO C", "TUBO D"],
+	})
+	codigos = pd.Series(["123456", "NOP0248", "NOP0262"])
+
+	compacta = compactar_dataframe(base)
+
+	assert compacta["Item"].tolist() == base["Item"].tolist()
+	assert isinstance(compacta["UN"].dtype, pd.CategoricalDtype)
+	pd.testing.assert_frame_equal(aplicar_mapeamento_totvs(codigos, compacta), aplicar_mapeamento_totvs(codigos, base))
+
+
+def test_coluna_mista_nao_vira_texto():
+	df = pd.DataFrame({"Item": ["A", "B", "C"], "Peso": [1, "2 kg", "3 kg"]})
+	assert compactar_dataframe(df)["Peso"].tolist() == [1, "2 kg", "3 kg"]
+
+
+def test_termos_compactos_preservam_ordem_e_conteudo():
+	termos = ("AÇO INOX", "BRONZE", "", "LATÃO", "AÇO")
+	compactos = compactar_fonte(termos)
+
+	assert isinstance(compactos, TermosCompactos)
+	assert list(compactos) == list(termos)
+	assert len(compactos) == len(termos)
+	assert compactos[0] == "AÇO INOX" and compactos[-1] == "AÇO"
+	assert compactos[1:3] == ["BRONZE", ""]
+	assert list(pickle.loads(pickle.dumps(compactos))) == list(termos)
+
+
+def test_termos_compactos_ocupam_menos_e_casam_igual():
+	materiais = tuple(sorted({f"MATERIAL {i:05d}" for i in range(2000)} | {"AÇO INOX", "INOX", "MOTOR"}))
+	compactos = compactar_fonte(materiais)
+
+	assert medir_memoria(compactos) < medir_memoria(materiais) / 2
+	for narrativa in ("TUBO AÇO INOX 304", "MATERIAL 01234 X", "EIXO DO MOTOR", "MATERAL 01234", "", None):
+		assert encontrar_material(narrativa, compactos) == encontrar_material(narrativa, materiais)
@@ -0,0 +1,62 @@
+"""Colapsar, enriquecer e expandir dá a mesma planilha que enriquecer todas as linhas."""
+
+import shutil
+
+import pandas as pd
+import pytest
+
+from colapsar_codigos import colapsar_planilha, expandir_planilha
+from inserir_colunas_totvs import inserir_colunas_totvs
+from planilha_trabalho import gravar_planilha, ler_planilha
+
+# Itens na ordem da lista de códigos: repetições intercaladas, e "123" (texto) e
+# 123 (número) são códigos diferentes, como no join com a base TOTVS
+CODIGOS = ["B2", "A1", "B2", 123, "123", "A1", "SEMCAD", "B2", 123]
+
+BASE_TOTVS = pd.DataFrame({
+	"Item": ["A1", "B2", 123, "123"],
+	"Descrição": ["Arruela", "Parafuso", "Porca", "Porca (texto)"],
+	"UN": ["PC", "KG", "UN", "CX"],
+	"Fam Coml": ["FIX-A", "FIX-B", "FIX-C", "FIX-D"],
+	"Narrativa Item": ["ARRUELA M12", "PARAFUSO M10", "PORCA M8", "PORCA M8 TEXTO"],
+})
+
+
+@pytest.fixture(params=[".xlsx", ".pkl"])
+def planilha(request, tmp_path):
+	df = pd.DataFrame(
+		[["Material", "MEINS", "Product group", "Internal comment", None]] + [[c, None, None, None, None] for c in CODIGOS],
+		columns=["item(table) + it-codigo(field)", "SAP5", "SAP6", "SAP123", "Narrativa"],
+	)
+	caminho = tmp_path / f"planilha_atualizada{request.param}"
+	gravar_planilha(df, caminho)
+	return caminho
+
+
+def test_colapsar_e_expandir_igual_a_sem_colapso(planilha, tmp_path):
+	sem_colapso = tmp_path / f"sem_colapso{planilha.suffix}"
+	shutil.copy(planilha, sem_colapso)
+	inserir_colunas_totvs(str(sem_colapso), "", df_base_totvs=BASE_TOTVS)
+
+	colapso = colapsar_planilha(planilha)
+	colapsada = ler_planilha(planilha)
+	assert colapsada.iloc[1:, 0].tolist() == ["B2", "A1", 123, "123", "SEMCAD"]
+	inserir_colunas_totvs(str(planilha), "", df_base_totvs=BASE_TOTVS)
+	expandir_planilha(planilha, colapso)
+
+	expandida = ler_planilha(planilha)
+	assert expandida.iloc[1:, 0].tolist() == CODIGOS
+	assert expandida.loc[1:, "SAP5"].fillna("").tolist() == ["KG", "PC", "KG", "UN", "CX", "PC", "", "KG", "UN"]
+	pd.testing.assert_frame_equal(expandida, ler_planilha(sem_colapso))
+
+
+def test_sem_repeticoes_planilha_intocada(tmp_path):
+	caminho = tmp_path / "planilha_atualizada.xlsx"
+	gravar_planilha(pd.DataFrame({"codigo": ["Material", "A1", "B2", 123]}), caminho)
+	conteudo = caminho.read_bytes()
+
+	colapso = colapsar_planilha(caminho)
+	expandir_planilha(caminho, colapso)
+
+	assert colapso["codigos_distintos"] == colapso["linhas"] == 3
+	assert caminho.read_bytes() == conteudo
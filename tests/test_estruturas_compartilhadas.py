@@ -0,0 +1,68 @@
+"""Matcher de materiais sobre o arquivo mapeado, inclusive o fallback fuzzy."""
+
+import gc
+import tracemalloc
+
+import pytest
+
+from estruturas_compartilhadas import EstruturasCompartilhadas, construir_estruturas, encontrar_material_compartilhado
+from inserir_material import encontrar_material
+from normalizar_nomes import NomesCanonicos
+
+MATERIAIS = tuple(sorted({
+	"AÇO INOX", "AÇO CARBONO", "INOX", "BRONZE", "LATÃO", "POLIPROPILENO", "NITRILICA", "MOTOR", "SPECIAL",
+} | {f"LIGA ESPECIAL {i:05d}" for i in range(20000)}))
+
+NARRATIVAS = (
+	"TUBO AÇO INOX 304",  # substring, vence o mais longo
+	"ANEL DE BRONZE",  # substring
+	"EIXO DO MOTOR",  # só o termo bloqueado casa: cai no fuzzy
+	"POLIPROPILENOO",  # fuzzy aceito
+	"NITRILICAS",  # fuzzy aceito
+	"MOTORR",  # fuzzy devolve termo bloqueado
+	"SPECIALL",  # idem
+	"XYZ 123 QWERTY",  # fuzzy rejeitado
+	"LIGA ESPECIAL 0123",  # fuzzy entre entradas parecidas (desempate pela ordem)
+	"",
+	None,
+)
+
+
+@pytest.fixture(scope="module")
+def arquivo_estruturas(tmp_path_factory):
+	caminho = tmp_path_factory.mktemp("estruturas") / "estruturas.bin"
+	construir_estruturas(caminho, MATERIAIS, (), (), [], NomesCanonicos([], [], en_por_pt={}))
+	return caminho
+
+
+@pytest.fixture
+def estruturas(arquivo_estruturas):
+	estruturas = EstruturasCompartilhadas(arquivo_estruturas)
+	yield estruturas
+	estruturas.fechar()
+
+
+@pytest.mark.parametrize("narrativa", NARRATIVAS)
+def test_mesma_resposta_do_matcher_em_processo(estruturas, narrativa):
+	assert encontrar_material_compartilhado(narrativa, estruturas) == encontrar_material(narrativa, MATERIAIS)
+
+
+def test_lista_mapeada_igual_a_carregada(estruturas):
+	assert list(estruturas.textos("material")) == list(MATERIAIS)
+
+
+def test_fallback_fuzzy_nao_copia_a_lista(estruturas):
+	# instância recém-aberta: a primeira chamada ao fuzzy é a que decodificaria a lista
+	decodificada = sum(len(m.encode("utf-8")) + 49 for m in MATERIAIS)
+	gc.collect()
+	tracemalloc.start()
+	try:
+		for narrativa in ("XYZ 123 QWERTY", "POLIPROPILENOO", "MOTORR"):
+			encontrar_material_compartilhado(narrativa, estruturas)
+		gc.collect()
+		retida, pico = tracemalloc.get_traced_memory()
+	finally:
+		tracemalloc.stop()
+	# nada fica guardado no worker, e nenhuma chamada decodifica a lista inteira de uma vez
+	assert retida < 64 * 1024
+	assert pico < decodificada / 4
@@ -0,0 +1,62 @@
+"""Join ordenado externo == join em memória sobre a base TOTVS inteira."""
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from inserir_colunas_totvs import aplicar_mapeamento_totvs
+from juncao_externa import juntar_base_totvs_externa
+
+
+@pytest.fixture(scope="module")
+def base_totvs(tmp_path_factory):
+	"""Base pequena com o que costuma quebrar joins: códigos int/str, repetidos, espaços e colunas com vazios."""
+	wb = Workbook()
+	ws = wb.active
+	for linha in (["Relatório"], [], ["Filial 01"], []):
+		ws.append(linha)
+	ws.append(["Item", "Descrição", "UN", "Fam Coml", "Peso", "Narrativa Item"])
+	for i in range(300):
+		codigo = 100000 + i if i % 3 == 0 else f"PRF{i:04d}"
+		peso = None if i == 250 else i * 10
+		ws.append([codigo, f"Item {i}", "PC" if i % 2 else "KG", f"FAM-{i % 7}", peso, f"NARRATIVA {i}"])
+	ws.append(["PRF0005", "Repetido", "UN", "FAM-X", 1, "SEGUNDA OCORRENCIA"])
+	ws.append([" PRF0007 ", "Com espaços", "CX", "FAM-Y", 2, "CODIGO COM ESPACOS"])
+	ws.append([])
+	ws.append(["PRF9999", "Depois de linha vazia", "PC", "FAM-Z", 3, "FINAL"])
+	caminho = tmp_path_factory.mktemp("totvs") / "base_dados_TOTVS.xlsx"
+	wb.save(caminho)
+	return caminho
+
+
+@pytest.fixture(scope="module")
+def codigos(tmp_path_factory):
+	"""Planilha de trabalho (cabeçalho, linha descritiva, itens): os códigos numéricos chegam como int."""
+	wb = Workbook()
+	ws = wb.active
+	ws.append(["item(table) + it-codigo(field)", "SAP5"])
+	ws.append(["Material", "MEINS"])
+	for codigo in ("PRF0005", 100000, "100003", 100003, "PRF0007", "PRF9999", "INEXISTENTE", "PRF0250", "PRF0005", 100249):
+		ws.append([codigo])
+	caminho = tmp_path_factory.mktemp("codigos") / "planilha_atualizada.xlsx"
+	wb.save(caminho)
+	return caminho, pd.read_excel(caminho).iloc[1:, 0]
+
+
+# orçamento de ~1 KB força dezenas de corridas em disco; 64 MB cabe tudo em memória
+@pytest.mark.parametrize("memoria_mb", [0.001, 64])
+def test_join_externo_igual_ao_join_em_memoria(base_totvs, codigos, memoria_mb, tmp_path):
+	caminho_codigos, serie_codigos = codigos
+	completa = pd.read_excel(base_totvs, header=4)
+
+	reduzida = juntar_base_totvs_externa(str(base_totvs), str(caminho_codigos), memoria_mb, str(tmp_path))
+
+	assert list(reduzida.columns) == list(completa.columns)
+	assert reduzida.dtypes.equals(completa.dtypes)
+	esperado = aplicar_mapeamento_totvs(serie_codigos, completa)
+	pd.testing.assert_frame_equal(aplicar_mapeamento_totvs(serie_codigos, reduzida), esperado)
+	assert esperado["SAP5"].notna().sum() == 8
+	estatisticas = reduzida.attrs["juncao_externa"]
+	assert estatisticas["linhas_totvs"] == len(completa.dropna(how="all"))
+	if memoria_mb < 1:
+		assert estatisticas["corridas"] > 2
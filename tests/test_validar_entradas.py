@@ -0,0 +1,32 @@
+"""Pre-flight do modelo: só as colunas sem as quais a execução falha são erro."""
+
+from openpyxl import Workbook
+
+from validar_entradas import COLUNAS_MODELO, validar_cabecalho_modelo
+
+
+def _modelo(caminho, colunas):
+	wb = Workbook()
+	wb.active.append(["item(table) + it-codigo(field)", *colunas])
+	wb.save(caminho)
+	return caminho
+
+
+def test_modelo_completo_sem_problemas(tmp_path):
+	assert validar_cabecalho_modelo(_modelo(tmp_path / "modelo.xlsx", COLUNAS_MODELO)) == []
+
+
+def test_colunas_opcionais_ausentes_sao_aviso(tmp_path):
+	colunas = [c for c in COLUNAS_MODELO if c not in ("SAP10", "SAP6", "Narrativa")]
+	problemas = validar_cabecalho_modelo(_modelo(tmp_path / "modelo.xlsx", colunas))
+	assert [p["nivel"] for p in problemas] == ["aviso"]
+	assert "['SAP10', 'SAP6', 'Narrativa']" in problemas[0]["mensagem"]
+
+
+def test_colunas_obrigatorias_ausentes_sao_erro(tmp_path):
+	colunas = [c for c in COLUNAS_MODELO if c not in ("SAP2", "Coluna32", "SAP17")]
+	problemas = validar_cabecalho_modelo(_modelo(tmp_path / "modelo.xlsx", colunas))
+	assert [(p["nivel"], p["mensagem"]) for p in problemas] == [
+		("erro", "Colunas ausentes na linha 1: ['SAP2', 'Coluna32']"),
+		("aviso", "Colunas ausentes na linha 1: ['SAP17']"),
+	]